@@ -0,0 +1,255 @@
+"""
+Write-behind persistence for audit records (symptom analyses, doctor notifications).
+
+The response never depends on these inserts, so they are queued in-process and
+flushed in batches with insert_many instead of being awaited on the request path.
+
+Modes (AUDIT_WRITE_MODE):
+- "sync":         await every insert inline (previous behaviour)
+- "write_behind": queue inserts; when the queue is full, write inline instead of dropping
+- "best_effort":  queue inserts; when the queue is full, drop the record and count it
+
+Records that other requests read straight back (doctor notifications, which
+are pushed to the doctor immediately) are written with sync=True regardless
+of the mode.
+
+A batch that still fails after AUDIT_MAX_RETRIES is appended to the
+AUDIT_DEAD_LETTER_PATH file (extended JSON, one record per line) and
+re-inserted by the next start() of any worker; records are only lost, and
+counted in "failed", if that spill fails too. The queue is drained on shutdown via stop().
+"""
+
+import asyncio
+import glob
+import logging
+import os
+import sys
+import time
+import uuid
+from typing import Dict, List
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+sys.path.append(os.path.dirname(__file__))
+from config import get_settings
+
+logger = logging.getLogger("ayumitra.audit")
+settings = get_settings()
+
+WRITE_MODES = ("sync", "write_behind", "best_effort")
+
+_DUPLICATE_KEY = 11000
+
+
+class AuditWriter:
+    """Bounded in-process queue that batches audit inserts per collection."""
+
+    def __init__(self, db, mode: str = None, max_queue_size: int = None,
+                 batch_size: int = None, flush_interval_ms: int = None, max_retries: int = None):
+        mode = mode or settings.AUDIT_WRITE_MODE
+        if mode not in WRITE_MODES:
+            raise ValueError(f"AUDIT_WRITE_MODE must be one of {WRITE_MODES}, got {mode!r}")
+        self.db = db
+        self.mode = mode
+        self.batch_size = batch_size or settings.AUDIT_BATCH_SIZE
+        self.flush_interval = (flush_interval_ms or settings.AUDIT_FLUSH_INTERVAL_MS) / 1000
+        self.max_retries = settings.AUDIT_MAX_RETRIES if max_retries is None else max_retries
+        self.dead_letter_path = settings.AUDIT_DEAD_LETTER_PATH
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size or settings.AUDIT_QUEUE_MAX_SIZE)
+        self._worker = None
+        self._metrics = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "overflow_sync_writes": 0,
+            "overflow_dropped": 0,
+            "dead_lettered": 0,
+            "dead_letter_replayed": 0,
+            "failed": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self):
+        await self.replay_dead_letters()
+        if self.mode != "sync" and not self.running:
+            self._worker = asyncio.create_task(self._run())
+            logger.info("Audit write-behind started (mode=%s, batch=%d)", self.mode, self.batch_size)
+
+    async def stop(self, timeout: float = 10.0):
+        """Flush everything still queued, then stop the worker."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("Audit flush timed out with %d records queued", self._queue.qsize())
+        self._worker.cancel()
+        self._worker = None
+
+    async def write(self, collection: str, doc: dict, sync: bool = False):
+        await self.write_many(collection, [doc], sync=sync)
+
+    async def write_many(self, collection: str, docs: List[dict], sync: bool = False):
+        """Persist docs according to the write mode; sync=True always inserts inline."""
+        if not docs:
+            return
+        if sync or self.mode == "sync" or not self.running:
+            await self.db[collection].insert_many(docs, ordered=False)
+            self._metrics["written"] += len(docs)
+            return
+
+        overflow = []
+        for doc in docs:
+            try:
+                self._queue.put_nowait((collection, doc))
+                self._metrics["enqueued"] += 1
+            except asyncio.QueueFull:
+                overflow.append(doc)
+        if not overflow:
+            return
+
+        if self.mode == "best_effort":
+            self._metrics["overflow_dropped"] += len(overflow)
+            logger.warning("Audit queue full, dropped %d %s records", len(overflow), collection)
+        else:
+            self._metrics["overflow_sync_writes"] += len(overflow)
+            await self.db[collection].insert_many(overflow, ordered=False)
+            self._metrics["written"] += len(overflow)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "running": self.running,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            **self._metrics,
+        }
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            if self._queue.qsize() < self.batch_size - 1:
+                # Linger briefly so bursts coalesce into one insert_many
+                await asyncio.sleep(self.flush_interval)
+            batch = [first]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[tuple]):
+        started = time.perf_counter()
+        by_collection: Dict[str, List[dict]] = {}
+        for collection, doc in batch:
+            by_collection.setdefault(collection, []).append(doc)
+
+        for collection, docs in by_collection.items():
+            error = await self._insert_with_retries(collection, docs)
+            if error is None:
+                self._metrics["written"] += len(docs)
+            elif await asyncio.to_thread(self._dead_letter, collection, docs):
+                self._metrics["dead_lettered"] += len(docs)
+                logger.error("Audit flush to %s failed, %d records spilled to %s: %s",
+                             collection, len(docs), self.dead_letter_path, error)
+            else:
+                self._metrics["failed"] += len(docs)
+                logger.error("Audit flush to %s failed, %d records lost: %s", collection, len(docs), error)
+
+        self._metrics["batches"] += 1
+        self._metrics["last_flush_ms"] = (time.perf_counter() - started) * 1000
+
+    async def _insert_with_retries(self, collection: str, docs: List[dict]):
+        """insert_many with backoff; returns the last error, or None once the docs are stored."""
+        error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.db[collection].insert_many(docs, ordered=False)
+                return None
+            except BulkWriteError as exc:
+                # Duplicates mean an earlier attempt already landed those documents
+                if all(err.get("code") == _DUPLICATE_KEY for err in exc.details.get("writeErrors", [])):
+                    return None
+                error = exc
+            except Exception as exc:
+                error = exc
+            if attempt < self.max_retries:
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        return error
+
+    def _dead_letter(self, collection: str, docs: List[dict]) -> bool:
+        if not self.dead_letter_path:
+            return False
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                for doc in docs:
+                    f.write(json_util.dumps({"collection": collection, "doc": doc}) + "\n")
+            return True
+        except OSError as exc:
+            logger.error("Audit dead-letter write to %s failed: %s", self.dead_letter_path, exc)
+            return False
+
+    async def replay_dead_letters(self):
+        """
+        Re-insert records spilled by earlier failed flushes; keeps whatever still fails.
+        Each file is claimed by an atomic rename to a name unique to this call, so
+        workers starting together never replay the same file; files left claimed by
+        a replay that crashed midway are picked up again (duplicates are ignored).
+        """
+        if not self.dead_letter_path:
+            return
+        leftovers = await asyncio.to_thread(glob.glob, glob.escape(self.dead_letter_path) + ".replaying.*")
+        for candidate in [self.dead_letter_path, *leftovers]:
+            claimed = await asyncio.to_thread(self._claim_dead_letters, candidate)
+            if claimed is not None:
+                await self._replay_file(claimed)
+
+    def _claim_dead_letters(self, path: str):
+        claimed = f"{self.dead_letter_path}.replaying.{uuid.uuid4().hex}"
+        try:
+            os.replace(path, claimed)
+        except FileNotFoundError:
+            return None  # Nothing spilled, or another worker claimed it first
+        return claimed
+
+    @staticmethod
+    def _read_dead_letters(path: str) -> Dict[str, List[dict]]:
+        by_collection: Dict[str, List[dict]] = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json_util.loads(line)
+                except ValueError:
+                    # A line cut short by a crash while spilling
+                    logger.warning("Skipping unreadable dead-letter line in %s", path)
+                    continue
+                by_collection.setdefault(record["collection"], []).append(record["doc"])
+        return by_collection
+
+    async def _replay_file(self, path: str):
+        by_collection = await asyncio.to_thread(self._read_dead_letters, path)
+        replayed = 0
+        for collection, docs in by_collection.items():
+            error = await self._insert_with_retries(collection, docs)
+            if error is None:
+                replayed += len(docs)
+            elif not await asyncio.to_thread(self._dead_letter, collection, docs):
+                self._metrics["failed"] += len(docs)
+            else:
+                logger.warning("Replaying %d dead-lettered %s records failed again: %s",
+                               len(docs), collection, error)
+        self._metrics["dead_letter_replayed"] += replayed
+        try:
+            await asyncio.to_thread(os.remove, path)
+        except FileNotFoundError:
+            pass
+        logger.info("Replayed %d dead-lettered audit records from %s", replayed, path)
@@ -0,0 +1,228 @@
+"""
+Offline benchmark of the web doctor scraper against a recorded Firecrawl corpus.
+
+Measures, without an API key or network (see firecrawl_replay.py):
+- parse:  DoctorScraper._parse_doctors_from_content over every recorded
+          search result page, in pages/sec and MB/sec
+- dedup:  dedupe_doctors over the extracted doctors, repeated to --dedup-size
+- search: end-to-end DoctorScraper latency per recorded query; "live" is a
+          full search + parse + dedup (what a cache miss costs), "cached" is a
+          repeat search answered by the in-memory search cache
+
+The doctors extracted from every page (name, mobile, designation,
+experience) are saved with --output too, and --baseline reports every page
+whose extraction changed, so a faster parser cannot silently pair a doctor
+with a different phone number.
+
+The local doctor index and the Mongo search cache tier are bypassed, so only
+the scraper itself is timed. Compare against a previous run to catch parser
+regressions before deploying:
+
+    python benchmark_scraper.py --synthesize                 # no recordings yet
+    python benchmark_scraper.py --output bench.json
+    python benchmark_scraper.py --baseline bench.json --max-regression 0.2
+    python benchmark_scraper.py --baseline bench.json --allow-extraction-changes  # intended parser change
+
+Record a real corpus by running the backend (or web_doctor_index.py) once
+with FIRECRAWL_MODE=record.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+os.environ["WEB_SEARCH_CACHE_PERSIST"] = "false"
+sys.path.append(os.path.dirname(__file__))
+from config import get_settings
+from doctor_extraction import dedupe_doctors, shutdown_pool
+from doctor_scraper import DoctorScraper
+from firecrawl_replay import ReplayFirecrawlApp, synthesize_corpus
+from web_doctor_index import ingestion_combinations
+
+settings = get_settings()
+
+QUERY_LOCATION = " doctors in "
+# Higher is better for these; for the rest (latencies) lower is better
+THROUGHPUT_METRICS = ("parse.pages_per_sec", "parse.mb_per_sec")
+EXTRACTION_FIELDS = ("name", "mobile", "designation", "experience")
+
+
+def _percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _split_query(query: str) -> tuple:
+    """(specialty, location) back out of a DoctorScraper search query."""
+    specialty, _, rest = query.partition(QUERY_LOCATION)
+    return specialty, rest.split(" site:", 1)[0]
+
+
+def bench_parse(scraper: DoctorScraper, app: ReplayFirecrawlApp, rounds: int) -> tuple:
+    pages = []
+    for query, results in app.searches.items():
+        location = _split_query(query)[1]
+        for r in results:
+            content = f"{r.get('title', '')}\n{r.get('description', '')}\n{r.get('markdown', '')}\n"
+            pages.append((content, location, r.get("url", "")))
+    total_bytes = sum(len(content.encode()) for content, _, _ in pages)
+
+    per_page = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        per_page = [scraper._parse_doctors_from_content(content, "", location, url)
+                    for content, location, url in pages]
+    seconds = time.perf_counter() - started
+    doctors = [doctor for found in per_page for doctor in found]
+    extraction = [
+        {"link": url, "doctors": [[doctor[field] for field in EXTRACTION_FIELDS] for doctor in found]}
+        for (_, _, url), found in zip(pages, per_page)
+    ]
+    return {
+        "pages": len(pages),
+        "mb": round(total_bytes / 1e6, 2),
+        "doctors_per_page": round(len(doctors) / len(pages), 1) if pages else 0.0,
+        "pages_per_sec": round(len(pages) * rounds / seconds, 1),
+        "mb_per_sec": round(total_bytes * rounds / 1e6 / seconds, 2),
+    }, doctors, extraction
+
+
+def bench_dedup(doctors: list, size: int, rounds: int) -> dict:
+    if not doctors:
+        return {"doctors": 0, "unique": 0, "ms": 0.0}
+    # Repeat the extracted doctors up to size; copies keep the realistic duplicate ratio
+    pool = (doctors * (size // len(doctors) + 1))[:size]
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        unique = dedupe_doctors(pool)
+        timings.append(time.perf_counter() - started)
+    return {"doctors": len(pool), "unique": len(unique), "ms": round(statistics.median(timings) * 1000, 3)}
+
+
+async def bench_search(scraper: DoctorScraper, app: ReplayFirecrawlApp, limit: int) -> dict:
+    live, cached = [], []
+    for query in app.searches:
+        specialty, location = _split_query(query)
+        started = time.perf_counter()
+        await scraper._search_doctors_live(specialty, location, limit)
+        live.append(time.perf_counter() - started)
+        await scraper.search_doctors(specialty, location, limit)  # fills the search cache
+        started = time.perf_counter()
+        await scraper.search_doctors(specialty, location, limit)
+        cached.append(time.perf_counter() - started)
+    if not live:
+        return {}
+    return {
+        "queries": len(live),
+        "latency_ms": app.latency * 1000,
+        "live_p50_ms": round(_percentile(live, 50) * 1000, 2),
+        "live_p95_ms": round(_percentile(live, 95) * 1000, 2),
+        "cached_p50_ms": round(_percentile(cached, 50) * 1000, 3),
+    }
+
+
+def extraction_changes(extraction: list, baseline: list) -> list:
+    """Pages whose extracted doctors differ from the baseline run over the same corpus."""
+    if len(extraction) != len(baseline):
+        return [f"page count {len(baseline)} -> {len(extraction)} (different corpus?)"]
+    found = []
+    for index, (new, old) in enumerate(zip(extraction, baseline)):
+        if new["doctors"] == old["doctors"]:
+            continue
+        changes = []
+        for new_doctor, old_doctor in zip(new["doctors"], old["doctors"]):
+            changes.extend(f"{field} {old_value!r} -> {new_value!r}"
+                           for field, old_value, new_value in zip(EXTRACTION_FIELDS, old_doctor, new_doctor)
+                           if old_value != new_value)
+        if len(new["doctors"]) != len(old["doctors"]):
+            changes.append(f"{len(old['doctors'])} -> {len(new['doctors'])} doctors")
+        found.append(f"page {index} ({new['link']}): " + "; ".join(changes))
+    return found
+
+
+def regressions(results: dict, baseline: dict, max_regression: float) -> list:
+    """Metrics more than max_regression (a fraction) worse than the baseline."""
+    found = []
+    for section, metric in (("parse", "pages_per_sec"), ("parse", "mb_per_sec"),
+                            ("dedup", "ms"), ("search", "live_p50_ms"), ("search", "live_p95_ms")):
+        old, new = baseline.get(section, {}).get(metric), results.get(section, {}).get(metric)
+        if not old or new is None:
+            continue
+        change = (old - new) / old if f"{section}.{metric}" in THROUGHPUT_METRICS else (new - old) / old
+        if change > max_regression:
+            found.append(f"{section}.{metric}: {old} -> {new} ({change:.0%} worse)")
+    return found
+
+
+async def main(args) -> int:
+    if args.synthesize:
+        written = synthesize_corpus(args.corpus, ingestion_combinations())
+        print(f"  Synthesized {written['searches']} searches and {written['pages']} profile pages "
+              f"into {args.corpus}")
+    app = ReplayFirecrawlApp(args.corpus, latency_ms=args.latency_ms)
+    scraper = DoctorScraper(app=app, index=None)
+
+    # The scraper logs every page with print(); keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        parse, doctors, extraction = bench_parse(scraper, app, args.rounds)
+        results = {
+            "parse": parse,
+            "dedup": bench_dedup(doctors, args.dedup_size, args.rounds),
+            "search": await bench_search(scraper, app, args.limit),
+        }
+    shutdown_pool()
+
+    p, d, s = results["parse"], results["dedup"], results["search"]
+    print(f"  parse:  {p['pages']} pages ({p['mb']} MB), {p['doctors_per_page']} doctors/page: "
+          f"{p['pages_per_sec']:,} pages/sec, {p['mb_per_sec']} MB/sec")
+    print(f"  dedup:  {d['doctors']:,} doctors -> {d['unique']:,} unique in {d['ms']} ms")
+    if s:
+        print(f"  search: {s['queries']} queries (+{s['latency_ms']:.0f} ms simulated Firecrawl latency): "
+              f"live p50 {s['live_p50_ms']} ms, p95 {s['live_p95_ms']} ms; cached p50 {s['cached_p50_ms']} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({**results, "extraction": extraction}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.max_regression)
+        for line in found:
+            print(f"  REGRESSION {line}")
+        changed = extraction_changes(extraction, baseline["extraction"]) if "extraction" in baseline else []
+        for line in changed[:20]:
+            print(f"  EXTRACTION CHANGED {line}")
+        if changed:
+            print(f"  {len(changed)} of {len(extraction)} pages extract differently from the baseline")
+        return 1 if found or (changed and not args.allow_extraction_changes) else 0
+    return 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the web doctor scraper offline.")
+    parser.add_argument("--corpus", default=settings.FIRECRAWL_CORPUS_DIR, help="Recorded Firecrawl corpus")
+    parser.add_argument("--synthesize", action="store_true",
+                        help="Write a synthetic corpus for the ingestion specialties x cities first")
+    parser.add_argument("--rounds", type=int, default=5, help="Passes over the corpus for parse/dedup")
+    parser.add_argument("--dedup-size", type=int, default=10000, help="Doctors to deduplicate")
+    parser.add_argument("--limit", type=int, default=5, help="Doctors per search")
+    parser.add_argument("--latency-ms", type=float, default=settings.FIRECRAWL_REPLAY_LATENCY_MS,
+                        help="Simulated Firecrawl response time")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Fail if worse than this earlier --output")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed slowdown against the baseline, as a fraction")
+    parser.add_argument("--allow-extraction-changes", action="store_true",
+                        help="Report, but do not fail on, pages that extract differently from the baseline")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
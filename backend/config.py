@@ -8,6 +8,15 @@ BACKEND_DIR = Path(__file__).parent
 class Settings(BaseSettings):
     MONGO_URL: str
     DB_NAME: str
+    # MongoDB client tuning (one shared pool per process, see db.py)
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 300000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 5000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SOCKET_TIMEOUT_MS: int = 30000
+    MONGO_WRITE_CONCERN: str = "majority"
     CORS_ORIGINS: str = "http://localhost:3000"
     GOOGLE_GEMINI_API_KEY: str = ""
     GOOGLE_API_KEY: str = ""  # For the new google-genai library
@@ -22,8 +31,105 @@ class Settings(BaseSettings):
     LANGCHAIN_TRACING_V2: str = "true"
     LANGSMITH_ENDPOINT: str = "https://api.smith.langchain.com"
     FIRECRAWL_API_KEY: str = ""
+    # Firecrawl client: "live", "record" (live, saving responses to the corpus) or
+    # "replay" (offline, from the corpus; see firecrawl_replay.py)
+    FIRECRAWL_MODE: str = "live"
+    FIRECRAWL_CORPUS_DIR: str = "firecrawl_corpus"
+    FIRECRAWL_REPLAY_LATENCY_MS: int = 0
+    # Async Firecrawl transport: pooled keep-alive connections, retries with jitter and a
+    # per-process token bucket (divide the plan's limit between workers)
+    FIRECRAWL_API_URL: str = "https://api.firecrawl.dev"
+    FIRECRAWL_RATE_LIMIT_PER_MINUTE: int = 100
+    FIRECRAWL_RATE_LIMIT_BURST: int = 10
+    FIRECRAWL_MAX_CONNECTIONS: int = 20
+    FIRECRAWL_TIMEOUT_SECONDS: float = 60.0
+    FIRECRAWL_MAX_RETRIES: int = 3
+    FIRECRAWL_RETRY_BACKOFF_SECONDS: float = 0.5
+    # Coordinate searches snap to the nearest gazetteer locality, else city, within these distances
+    GAZETTEER_LOCALITY_KM: float = 3.0
+    GAZETTEER_CITY_KM: float = 40.0
     QDRANT_URL: str = ""
     QDRANT_API_KEY: str = ""
+    # Async Qdrant client: request timeout, HTTP connection pool (or gRPC) and init retry spacing
+    QDRANT_TIMEOUT_SECONDS: int = 10
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_POOL_SIZE: int = 20
+    QDRANT_INIT_RETRY_SECONDS: float = 60.0
+    # Embedding cache keyed by text hash, model and dimension (memory LRU + Mongo)
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = 1024
+    EMBEDDING_CACHE_RETENTION_DAYS: int = 90
+    EMBEDDING_CACHE_PERSIST: bool = True
+    # Data lifecycle: retention windows in days (0 disables expiry/archival)
+    NOTIFICATION_RETENTION_DAYS: int = 30
+    WEB_CONNECTION_RETENTION_DAYS: int = 30
+    ANONYMOUS_REQUEST_RETENTION_DAYS: int = 7
+    REQUEST_ARCHIVE_AFTER_DAYS: int = 90
+    REQUEST_ARCHIVE_INTERVAL_MINUTES: int = 60
+    # Audit write-behind: "sync", "write_behind" or "best_effort"
+    AUDIT_WRITE_MODE: str = "write_behind"
+    AUDIT_QUEUE_MAX_SIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL_MS: int = 200
+    AUDIT_MAX_RETRIES: int = 3
+    # Batches that still fail after the retries are spilled here and replayed on startup
+    AUDIT_DEAD_LETTER_PATH: str = "audit_dead_letter.jsonl"
+    # Push notifications: "memory" (single worker) or "mongo" (capped collection, multi-worker)
+    NOTIFICATION_BUS_BACKEND: str = "memory"
+    NOTIFICATION_BUS_CAPPED_SIZE_MB: int = 16
+    NOTIFICATION_SUBSCRIBER_QUEUE_SIZE: int = 100
+    SSE_HEARTBEAT_SECONDS: int = 15
+    REQUEST_STATUS_STREAM_TIMEOUT_SECONDS: int = 600
+    # Resumable SSE runs: events kept per run, and how long finished runs stay replayable
+    SSE_REPLAY_BUFFER_SIZE: int = 256
+    SSE_REPLAY_TTL_SECONDS: int = 300
+    # Unfinished runs are cancelled this long after their last client disconnects
+    SSE_DISCONNECT_GRACE_SECONDS: int = 10
+    SSE_MAX_RUNS_PER_CLIENT: int = 3
+    # Web doctor search cache (scrape_cache.py): fresh TTL, extra stale-while-revalidate window,
+    # per-worker memory entries, and whether the shared Mongo tier is used
+    WEB_SEARCH_CACHE_TTL_SECONDS: int = 21600
+    WEB_SEARCH_CACHE_STALE_SECONDS: int = 86400
+    WEB_SEARCH_CACHE_MEMORY_ENTRIES: int = 1024
+    WEB_SEARCH_CACHE_PERSIST: bool = True
+    # Background web doctor ingestion (web_doctor_index.py). Off by default: each pass spends
+    # roughly one Firecrawl search (plus profile scrapes) per specialty x city; e.g. 12 to enable
+    WEB_DOCTOR_INGEST_INTERVAL_HOURS: int = 0
+    WEB_DOCTOR_INGEST_SPECIALTIES: str = ("Cardiology,Dermatology,General Medicine,Gynecology,Orthopedic Surgery,"
+                                          "Pediatrics,Neurology,Gastroenterology,Otolaryngology (ENT),Psychiatry")
+    WEB_DOCTOR_INGEST_CITIES: str = "Bangalore,Mumbai,Delhi,Chennai,Hyderabad,Pune,Kolkata,Ahmedabad"
+    WEB_DOCTOR_INGEST_LIMIT: int = 10
+    WEB_DOCTOR_INGEST_PAUSE_SECONDS: float = 2.0
+    WEB_DOCTOR_INGEST_ENRICH: bool = True
+    # Indexed doctors older than this are ignored by searches, and deleted after the retention window
+    WEB_DOCTOR_INDEX_MAX_AGE_HOURS: int = 48
+    WEB_DOCTOR_INDEX_RETENTION_DAYS: int = 14
+    # A search whose pages total at least this many chars is parsed in a process pool, one
+    # batch of pages per worker (0 workers parses inline); ~50 KB is ~8 ms of parsing
+    EXTRACTION_PROCESS_WORKERS: int = 2
+    EXTRACTION_PROCESS_MIN_CHARS: int = 50000
+    # Doctor profile enrichment: concurrent profile scrapes, spacing per host, per-URL cache
+    ENRICH_CONCURRENCY: int = 4
+    ENRICH_DOMAIN_INTERVAL_MS: int = 500
+    DOCTOR_DETAILS_CACHE_TTL_SECONDS: int = 86400
+    DOCTOR_DETAILS_CACHE_MAX_ENTRIES: int = 2048
+    COPILOT_ENRICH_DOCTORS: bool = True
+    # Start the copilot's doctor search for the locally predicted specialty during triage
+    COPILOT_SPECULATIVE_RESEARCH: bool = True
+    # End-to-end budget for the triage pipeline, tighter once a case is critical
+    TRIAGE_DEADLINE_SECONDS: float = 45.0
+    TRIAGE_CRITICAL_DEADLINE_SECONDS: float = 20.0
+    # Per-source timeouts for the hybrid (registered + web) doctor search
+    HYBRID_REGISTERED_TIMEOUT_SECONDS: float = 3.0
+    HYBRID_WEB_TIMEOUT_SECONDS: float = 15.0
+    # Urgency levels whose copilot report is rendered from a template when no doctors
+    # were found (comma-separated, empty to always use the LLM)
+    COPILOT_TEMPLATE_REPORT_URGENCIES: str = "mild,moderate"
+    # Whole-run copilot cache; the TTL bounds how stale cached scraped doctors may be
+    COPILOT_RUN_CACHE_MAX_ENTRIES: int = 512
+    COPILOT_RUN_CACHE_TTL_SECONDS: int = 3600
+    # Copilot graph checkpoints: "mongo", "memory" (single worker/tests) or "none"
+    COPILOT_CHECKPOINTER: str = "mongo"
+    COPILOT_CHECKPOINT_TTL_HOURS: int = 24
     
     class Config:
         env_file = str(BACKEND_DIR / ".env")
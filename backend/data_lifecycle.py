@@ -0,0 +1,147 @@
+"""
+Data lifecycle management for AyuMitraAI.
+
+TTL indexes keep short-lived collections bounded:
+- doctor_notifications: expire NOTIFICATION_RETENTION_DAYS after created_at
+- web_doctor_connections: expire WEB_CONNECTION_RETENTION_DAYS after created_at
+- patient_requests: anonymous (temp_ patient id) requests that were never linked
+  to an account expire ANONYMOUS_REQUEST_RETENTION_DAYS after requested_at
+
+Completed requests older than REQUEST_ARCHIVE_AFTER_DAYS are moved into the
+patient_requests_archive cold collection so the hot working set stays small.
+
+TTL indexes only act on BSON dates. Run migrations.py once to convert legacy
+ISO-string timestamps and flag existing anonymous requests.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import BulkWriteError, OperationFailure
+
+sys.path.append(os.path.dirname(__file__))
+from config import get_settings
+
+logger = logging.getLogger("ayumitra.lifecycle")
+settings = get_settings()
+
+ARCHIVE_COLLECTION = "patient_requests_archive"
+ANONYMOUS_PATIENT_PREFIX = "temp_"
+
+_INDEX_OPTIONS_CONFLICT = 85
+_INDEX_KEY_SPECS_CONFLICT = 86
+_INDEX_NOT_FOUND = 27
+_DUPLICATE_KEY = 11000
+
+
+def is_anonymous_patient(patient_id: str) -> bool:
+    return bool(patient_id) and patient_id.startswith(ANONYMOUS_PATIENT_PREFIX)
+
+
+async def ensure_ttl_index(collection, field: str, retention: timedelta, name: str,
+                           partial_filter: dict = None):
+    """
+    Create (or retune) a TTL index on `field` expiring documents `retention` after it.
+    A changed retention window is applied in place with collMod; a window of 0
+    drops the index so documents are kept indefinitely.
+    """
+    expire_after = int(retention.total_seconds())
+    if expire_after <= 0:
+        try:
+            await collection.drop_index(name)
+            logger.info("Dropped TTL index %s.%s (retention disabled)", collection.name, name)
+        except OperationFailure as exc:
+            if exc.code != _INDEX_NOT_FOUND:
+                raise
+        return
+
+    options = {"name": name, "expireAfterSeconds": expire_after}
+    if partial_filter:
+        options["partialFilterExpression"] = partial_filter
+    try:
+        await collection.create_index(field, **options)
+    except OperationFailure as exc:
+        if exc.code not in (_INDEX_OPTIONS_CONFLICT, _INDEX_KEY_SPECS_CONFLICT):
+            raise
+        await collection.database.command(
+            "collMod", collection.name,
+            index={"name": name, "expireAfterSeconds": expire_after},
+        )
+        logger.info("Updated TTL on %s.%s to %s", collection.name, name, retention)
+
+
+async def ensure_lifecycle_indexes(db):
+    await ensure_ttl_index(
+        db.doctor_notifications, "created_at",
+        timedelta(days=settings.NOTIFICATION_RETENTION_DAYS), "created_at_ttl",
+    )
+    await ensure_ttl_index(
+        db.web_doctor_connections, "created_at",
+        timedelta(days=settings.WEB_CONNECTION_RETENTION_DAYS), "created_at_ttl",
+    )
+    await ensure_ttl_index(
+        db.patient_requests, "requested_at",
+        timedelta(days=settings.ANONYMOUS_REQUEST_RETENTION_DAYS), "anonymous_requested_at_ttl",
+        partial_filter={"is_anonymous": True},
+    )
+    # Supports the archival scan below
+    await db.patient_requests.create_index([("status", 1), ("requested_at", 1)])
+    await db[ARCHIVE_COLLECTION].create_index("request_id")
+    await db[ARCHIVE_COLLECTION].create_index([("patient_id", 1), ("requested_at", -1)])
+
+
+async def archive_completed_requests(db, older_than_days: int = None, batch_size: int = 500) -> int:
+    """
+    Move completed requests older than the archive window into the cold
+    collection. Archived documents keep their _id, so a batch interrupted
+    between insert and delete is safe to re-run.
+    Returns the number of requests archived.
+    """
+    days = settings.REQUEST_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    if days <= 0:
+        return 0
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    query = {"status": "completed", "requested_at": {"$lt": cutoff}}
+    archived = 0
+
+    while True:
+        batch = await db.patient_requests.find(query).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        try:
+            await db[ARCHIVE_COLLECTION].insert_many(batch, ordered=False)
+        except BulkWriteError as exc:
+            # Documents copied by an earlier interrupted run are already there
+            if any(err.get("code") != _DUPLICATE_KEY for err in exc.details.get("writeErrors", [])):
+                raise
+        await db.patient_requests.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+        archived += len(batch)
+
+    if archived:
+        logger.info("Archived %d completed patient requests older than %d days", archived, days)
+    return archived
+
+
+async def find_request(db, request_id: str, projection: dict = None):
+    """Look a request up in the hot collection, falling back to the archive."""
+    doc = await db.patient_requests.find_one({"request_id": request_id}, projection)
+    if doc is None:
+        doc = await db[ARCHIVE_COLLECTION].find_one({"request_id": request_id}, projection)
+    return doc
+
+
+async def run_archival_loop(db):
+    """Periodically archive completed requests until cancelled."""
+    interval = max(settings.REQUEST_ARCHIVE_INTERVAL_MINUTES, 1) * 60
+    while True:
+        try:
+            await archive_completed_requests(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.error("Request archival failed: %s", exc)
+        await asyncio.sleep(interval)
@@ -0,0 +1,216 @@
+"""
+Centralized MongoDB connection layer for AyuMitraAI.
+
+Every module (API server, LangChain tools, seed/migration scripts) gets its
+database handle from here, so each process owns exactly one tuned connection
+pool per driver flavour:
+- get_db():       Motor (async) database for request handlers and scripts
+- LazyDatabase:   the same, for module-level handles bound at import time
+- get_sync_db():  PyMongo database for sync code running in worker threads
+
+Reads are routed per query: pass read=READ_SECONDARY_PREFERRED for dashboard
+and history reads that tolerate replication lag; everything else defaults to
+the primary. Pool utilization is tracked by CMAP listeners, see pool_stats().
+"""
+
+import logging
+import os
+import sys
+import threading
+from collections import defaultdict
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, ReadPreference, monitoring
+
+sys.path.append(os.path.dirname(__file__))
+from config import get_settings
+
+logger = logging.getLogger("ayumitra.db")
+settings = get_settings()
+
+READ_PRIMARY = "primary"
+READ_SECONDARY_PREFERRED = "secondaryPreferred"
+
+_READ_PREFERENCES = {
+    READ_PRIMARY: ReadPreference.PRIMARY,
+    READ_SECONDARY_PREFERRED: ReadPreference.SECONDARY_PREFERRED,
+}
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Counts connection pool events per server address."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = defaultdict(lambda: {
+            "open": 0,
+            "checked_out": 0,
+            "max_checked_out": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "cleared": 0,
+        })
+
+    def _update(self, address, **deltas):
+        key = "%s:%s" % address
+        with self._lock:
+            pool = self._pools[key]
+            for field, delta in deltas.items():
+                pool[field] += delta
+            pool["max_checked_out"] = max(pool["max_checked_out"], pool["checked_out"])
+
+    def pool_created(self, event):
+        self._update(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._update(event.address, cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._update(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._update(event.address, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._update(event.address, checked_out=1, checkouts=1)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, checked_out=-1)
+
+    def snapshot(self) -> dict:
+        max_pool = settings.MONGO_MAX_POOL_SIZE
+        with self._lock:
+            return {
+                address: {
+                    **pool,
+                    "max_pool_size": max_pool,
+                    "utilization": round(pool["checked_out"] / max_pool, 3) if max_pool else None,
+                }
+                for address, pool in self._pools.items()
+            }
+
+
+pool_metrics = PoolMetrics()
+sync_pool_metrics = PoolMetrics()
+
+_client = None
+_sync_client = None
+_owner_pid = None
+_lock = threading.Lock()
+
+
+def _write_concern():
+    w = settings.MONGO_WRITE_CONCERN
+    return int(w) if w.isdigit() else w
+
+
+def _client_options(listener: PoolMetrics) -> dict:
+    return {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+        "w": _write_concern(),
+        "retryWrites": True,
+        "tz_aware": True,
+        "appname": "ayumitra",
+        "event_listeners": [listener],
+    }
+
+
+def _reset_after_fork():
+    """Clients must not be shared across fork(); each worker builds its own."""
+    global _client, _sync_client, _owner_pid
+    if _owner_pid != os.getpid():
+        _client = None
+        _sync_client = None
+        _owner_pid = os.getpid()
+
+
+def get_client() -> AsyncIOMotorClient:
+    global _client
+    with _lock:
+        _reset_after_fork()
+        if _client is None:
+            _client = AsyncIOMotorClient(settings.MONGO_URL, **_client_options(pool_metrics))
+            logger.info("MongoDB client created (maxPoolSize=%d)", settings.MONGO_MAX_POOL_SIZE)
+        return _client
+
+
+def get_sync_client() -> MongoClient:
+    global _sync_client
+    with _lock:
+        _reset_after_fork()
+        if _sync_client is None:
+            _sync_client = MongoClient(settings.MONGO_URL, **_client_options(sync_pool_metrics))
+        return _sync_client
+
+
+def get_db(read: str = READ_PRIMARY):
+    return get_client().get_database(settings.DB_NAME, read_preference=_READ_PREFERENCES[read])
+
+
+class LazyDatabase:
+    """
+    Module-level database handle that resolves get_db() on use, so handles
+    created at import time (server.db, the audit writer...) follow the
+    per-process client that _reset_after_fork() builds in each worker.
+    """
+
+    def __init__(self, read: str = READ_PRIMARY):
+        self._read = read
+        self._client = None
+        self._db = None
+
+    def _resolve(self):
+        client = get_client()
+        if client is not self._client:
+            self._client = client
+            self._db = client.get_database(settings.DB_NAME, read_preference=_READ_PREFERENCES[self._read])
+        return self._db
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __getitem__(self, name):
+        return self._resolve()[name]
+
+
+def get_sync_db(read: str = READ_PRIMARY):
+    return get_sync_client().get_database(settings.DB_NAME, read_preference=_READ_PREFERENCES[read])
+
+
+def close_clients():
+    global _client, _sync_client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+
+
+def pool_stats() -> dict:
+    return {
+        "async": pool_metrics.snapshot(),
+        "sync": sync_pool_metrics.snapshot(),
+    }
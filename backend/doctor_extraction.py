@@ -0,0 +1,177 @@
+"""
+Doctor extraction engine for scraped directory pages (Practo, Lybrate, Justdial...).
+
+All patterns are compiled once at import. A match can only contain letters,
+whitespace and ".,-–", so the page is first cut into runs of those characters
+(SEGMENT_PATTERN), and only runs containing a literal every match needs ("Dr",
+a degree, or the dash before a title; ANCHOR_PATTERN) are scanned with one
+alternation of the name patterns; most of a directory page (prices, phone
+numbers, markup) is skipped without trying the name regex at every letter.
+The bare-name branch may only start where no letter precedes it: under
+IGNORECASE [A-Z][a-z]+ matches inside any word, and a match starting mid-word
+is never the leftmost one, so the lookbehind drops those attempts without
+changing the result. Each match records its offset, and
+phone and experience are searched only in the window around that offset
+(WINDOW_BEFORE chars before, WINDOW_AFTER after) instead of rescanning or
+re-lowercasing the whole page per candidate. Pairing each doctor with the
+phone next to their name also replaces the old "i-th phone on the page" guess.
+
+extract_doctors() is a plain top-level function of its inputs, so the pages of
+a search can be parsed in a process pool (see parse_pages_async) without
+blocking the event loop.
+"""
+
+import asyncio
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+sys.path.append(os.path.dirname(__file__))
+from config import get_settings
+
+settings = get_settings()
+
+MAX_DOCTORS_PER_PAGE = 10
+WINDOW_BEFORE = 100
+WINDOW_AFTER = 200
+
+_NAME = r"[A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3}"
+_DEGREES = r"MD|MBBS|MS|DM|MCh|DNB"
+_TITLES = (r"Cardiologist|Orthopedic|Neurologist|Dermatologist|Pediatrician|Gynecologist|Urologist|"
+           r"Ophthalmologist|ENT|Gastroenterologist|Pulmonologist|Psychiatrist|Surgeon|Physician|General\s+Physician")
+
+# One pass over the page: "Dr. First Last" | "First Last, MBBS" | "First Last - Cardiologist".
+# The last two share the name prefix so it is matched once per position.
+DOCTOR_PATTERN = re.compile(
+    rf"Dr\.?\s+(?P<dr_name>{_NAME})"
+    rf"|(?<![A-Za-z])(?P<name>{_NAME})(?:\s*,?\s*(?P<degree>{_DEGREES})|\s*[-–]\s*(?P<title>{_TITLES}))",
+    re.IGNORECASE | re.MULTILINE,
+)
+# Characters a DOCTOR_PATTERN match can span, and a literal each match contains
+SEGMENT_PATTERN = re.compile(r"[A-Za-z\s.,\-–]{7,}", re.IGNORECASE)
+ANCHOR_PATTERN = re.compile(r"dr|md|ms|mbbs|dm|mch|dnb|[-–]", re.IGNORECASE)
+PHONE_PATTERN = re.compile(r"(?:\+91[\s\-]?)?([6-9]\d{9})")
+EXPERIENCE_PATTERN = re.compile(r"(\d+)\s*(?:\+)?\s*(?:years?|yrs?)\s*(?:of\s+)?(?:experience|exp)", re.IGNORECASE)
+WHITESPACE = re.compile(r"\s+")
+
+
+def _candidates(content: str):
+    """(name, specialty, offset) for every name-pattern match, in page order."""
+    for segment in SEGMENT_PATTERN.finditer(content):
+        start, end = segment.span()
+        if not ANCHOR_PATTERN.search(content, start, end):
+            continue
+        for match in DOCTOR_PATTERN.finditer(content, start, end):
+            if match.group("dr_name"):
+                name, specialty = match.group("dr_name"), "General Physician"
+            else:
+                name, specialty = match.group("name"), match.group("degree") or match.group("title")
+            yield WHITESPACE.sub(" ", name).strip(), specialty.strip(), match.start()
+
+
+def _nearby_phone(content: str, offset: int) -> str:
+    # Prefer the number after the name (listing cards put contact details below it)
+    match = (PHONE_PATTERN.search(content, offset, offset + WINDOW_AFTER)
+             or PHONE_PATTERN.search(content, max(0, offset - WINDOW_BEFORE), offset))
+    return match.group(1) if match else ""
+
+
+def _nearby_experience(content: str, offset: int) -> str:
+    match = EXPERIENCE_PATTERN.search(content, max(0, offset - WINDOW_BEFORE), offset + WINDOW_AFTER)
+    return f"{match.group(1)} years" if match else ""
+
+
+def extract_doctors(content: str, location: str, link: str = "") -> List[Dict]:
+    """Parse up to MAX_DOCTORS_PER_PAGE unique doctors from one page of text."""
+    doctors = []
+    seen_names = set()
+    for name, specialty, offset in _candidates(content):
+        # Validate name (should have at least first and last name)
+        if len(name.split()) < 2 or len(name) <= 5:
+            continue
+        name_key = name.lower()
+        if name_key in seen_names:
+            continue
+        seen_names.add(name_key)
+        doctors.append({
+            'name': name,
+            'mobile': _nearby_phone(content, offset),
+            'designation': specialty,
+            'location': location,
+            'specialty': specialty,
+            'experience': _nearby_experience(content, offset),
+            'source': 'web_search',
+            'link': link,
+        })
+        if len(doctors) >= MAX_DOCTORS_PER_PAGE:
+            break
+    return doctors
+
+
+def dedupe_doctors(doctors: List[Dict]) -> List[Dict]:
+    """Drop repeat doctors across pages (same name, case-insensitive), keeping the first."""
+    unique = []
+    seen_names = set()
+    for doctor in doctors:
+        name_key = doctor['name'].lower().strip()
+        if name_key not in seen_names:
+            seen_names.add(name_key)
+            unique.append(doctor)
+    return unique
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if _pool is None and settings.EXTRACTION_PROCESS_WORKERS > 0:
+        _pool = ProcessPoolExecutor(max_workers=settings.EXTRACTION_PROCESS_WORKERS)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def extract_batch(pages: Sequence[Tuple[str, str]], location: str) -> List[List[Dict]]:
+    """extract_doctors over (content, link) pages; one pool task per batch amortizes the IPC."""
+    return [extract_doctors(content, location, link) for content, link in pages]
+
+
+def _batches(pages: Sequence[Tuple[str, str]], count: int) -> List[List[Tuple[str, str]]]:
+    """Split pages, in order, into at most count runs of roughly equal total size."""
+    target = sum(len(content) for content, _ in pages) / count
+    batches, current, size = [], [], 0
+    for page in pages:
+        current.append(page)
+        size += len(page[0])
+        if size >= target and len(batches) < count - 1:
+            batches.append(current)
+            current, size = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def parse_pages_async(pages: Sequence[Tuple[str, str]], location: str) -> List[List[Dict]]:
+    """
+    Extract doctors from (content, link) pages. When the pages together reach
+    EXTRACTION_PROCESS_MIN_CHARS they are split into one batch per pool worker
+    and parsed in parallel off the event loop; less text than that is cheaper
+    to parse inline than to pickle.
+    """
+    pool = _get_pool()
+    if pool is None or sum(len(content) for content, _ in pages) < settings.EXTRACTION_PROCESS_MIN_CHARS:
+        return extract_batch(pages, location)
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(pool, extract_batch, batch, location)
+        for batch in _batches(pages, settings.EXTRACTION_PROCESS_WORKERS)
+    ))
+    return [doctors for batch in results for doctors in batch]
@@ -1,12 +1,40 @@
-import requests
 import asyncio
 import re
+from collections import defaultdict
 from typing import List, Dict
-from urllib.parse import quote
+from urllib.parse import quote, urlparse
 
 from config import get_settings
-from firecrawl import FirecrawlApp
 from langsmith import traceable
+from request_context import check_cancelled, run_with_deadline
+from scrape_cache import scrape_cache
+from web_doctor_index import web_doctor_index
+from doctor_extraction import dedupe_doctors, extract_doctors, parse_pages_async
+from cache import TTLCache
+from gazetteer import canonical_location, location_for_coordinates
+from firecrawl_client import get_firecrawl_app
+
+
+def search_query(specialty: str, location: str) -> str:
+    """Firecrawl search query targeting doctor-finding websites."""
+    return f"{specialty} doctors in {location} site:practo.com OR site:1mg.com OR site:lybrate.com OR site:justdial.com"
+
+
+class DomainRateLimiter:
+    """Spaces requests to the same host at least min_interval seconds apart."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot: Dict[str, float] = {}
+
+    async def wait(self, url: str):
+        host = urlparse(url).netloc.lower()
+        now = asyncio.get_running_loop().time()
+        # Reserve the slot before sleeping so concurrent callers queue up behind it
+        slot = max(now, self._next_slot.get(host, 0.0))
+        self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
 
 
 class DoctorScraper:
@@ -15,16 +43,30 @@ class DoctorScraper:
     Extracts name, mobile number, designation, and location.
     """
 
-    def __init__(self):
+    def __init__(self, app=None, index=web_doctor_index):
+        """
+        app defaults to the shared async Firecrawl client for FIRECRAWL_MODE
+        (see firecrawl_client.py); index=None skips the local doctor index.
+        """
         settings = get_settings()
         self.firecrawl_api_key = settings.FIRECRAWL_API_KEY
-        self.app = FirecrawlApp(api_key=self.firecrawl_api_key)
+        self.app = app if app is not None else get_firecrawl_app()
+        self.cache = scrape_cache
+        self.index = index
+        self.details_cache = TTLCache(settings.DOCTOR_DETAILS_CACHE_MAX_ENTRIES,
+                                      settings.DOCTOR_DETAILS_CACHE_TTL_SECONDS, name="doctor_details")
+        self.domain_limiter = DomainRateLimiter(settings.ENRICH_DOMAIN_INTERVAL_MS / 1000)
+        self.enrich_concurrency = settings.ENRICH_CONCURRENCY
 
     @traceable(name="search_doctors_firecrawl")
     async def search_doctors(self, specialty: str, location: str, limit: int = 5) -> List[Dict]:
         """
         Search for doctors by specialty and location using Firecrawl Search API.
         Uses Firecrawl's native search functionality for better results.
+        Fresh doctors from the local ingestion index (see web_doctor_index.py)
+        are returned first; when it has fewer than limit, the rest come from
+        the web search cache (see scrape_cache.py). A live search only runs on
+        a cache miss or to refresh a stale cache entry.
         
         Args:
             specialty: Medical specialty (e.g., "Cardiologist", "Orthopedic")
@@ -34,31 +76,53 @@ class DoctorScraper:
         Returns:
             List of doctor information with name, mobile, designation, location
         """
-        
-        # Build search query targeting doctor-finding websites
-        query = f"{specialty} doctors in {location} site:practo.com OR site:1mg.com OR site:lybrate.com OR site:justdial.com"
+        # Canonical place names ("Bengaluru" -> "Bangalore") for the query and every cache tier
+        location = canonical_location(location)
+        indexed = []
+        if self.index is not None:
+            indexed = await self.index.find(specialty, location, limit)
+            if len(indexed) >= limit:
+                return indexed
+        searched = await self.cache.get_or_fetch(
+            specialty, location, limit,
+            lambda: self._search_doctors_live(specialty, location, limit),
+        )
+        # Top up a partial index hit, skipping doctors the index already returned
+        return dedupe_doctors(indexed + searched)[:limit] if indexed else searched
+
+    async def _search_doctors_live(self, specialty: str, location: str, limit: int,
+                                   raise_errors: bool = False) -> List[Dict]:
+        """
+        Run the Firecrawl search and parse doctors from every result page.
+        Search failures are logged and give [], or are raised with raise_errors
+        (ingestion counts them as failed combinations).
+        """
+        query = search_query(specialty, location)
         
         all_doctors = []
         
+        # Don't spend Firecrawl credits for a run whose client has gone
+        check_cancelled()
         try:
             print(f"[DEBUG] Firecrawl Search Query: {query}")
             
-            # Use Firecrawl's search API with scraping enabled
-            search_result = await asyncio.to_thread(
-                self.app.search,
-                query,  # First positional argument
-                {  # Options as second argument
+            # Use Firecrawl's search API with scraping enabled; bounded by the request deadline
+            search_result = await run_with_deadline(self.app.search(
+                query,
+                {
                     "limit": limit * 2,  # Get more results to filter
                     "scrapeOptions": {
                         "formats": ["markdown"],
                         "onlyMainContent": True
                     }
                 }
-            )
+            ))
             
             # The SDK returns a list directly, not a dict with "success"
             if not search_result or not isinstance(search_result, list):
                 print(f"[DEBUG] Firecrawl search failed or returned unexpected format: {type(search_result)}")
+                if raise_errors and not isinstance(search_result, list):
+                    raise TypeError(f"Firecrawl search returned {type(search_result).__name__}, expected a list")
                 return []
             
             # Process search results (search_result is already the data list)
@@ -66,28 +130,15 @@ class DoctorScraper:
             
             print(f"[DEBUG] Firecrawl returned {len(data)} results")
             
-            for result in data:
-                # Extract doctor information from each result
-                url = result.get("url", "")
-                title = result.get("title", "")
-                markdown = result.get("markdown", "")
-                description = result.get("description", "")
-                
-                # Combine all text content for parsing
-                combined_content = f"{title}\n{description}\n{markdown}"
-                
-                # Parse doctor information
-                doctors = self._parse_doctors_from_content(
-                    combined_content, 
-                    "", 
-                    location, 
-                    url
-                )
-                
+            check_cancelled()
+            # Combine all text content of each result for parsing; the source URL is each doctor's link
+            pages = [
+                (f"{result.get('title', '')}\n{result.get('description', '')}\n{result.get('markdown', '')}\n",
+                 result.get("url", ""))
+                for result in data
+            ]
+            for (_, url), doctors in zip(pages, await parse_pages_async(pages, location)):
                 if doctors:
-                    # Add source URL to each doctor
-                    for doctor in doctors:
-                        doctor['link'] = url
                     all_doctors.extend(doctors)
                     print(f"[DEBUG] Extracted {len(doctors)} doctors from {url}")
             
@@ -95,16 +146,11 @@ class DoctorScraper:
             print(f"[DEBUG] Firecrawl search error: {str(e)}")
             import traceback
             print(f"[DEBUG] Traceback: {traceback.format_exc()}")
+            if raise_errors:
+                raise
         
         # Remove duplicates based on doctor name
-        unique_doctors = []
-        seen_names = set()
-        
-        for doctor in all_doctors:
-            name_key = doctor['name'].lower().strip()
-            if name_key not in seen_names:
-                seen_names.add(name_key)
-                unique_doctors.append(doctor)
+        unique_doctors = dedupe_doctors(all_doctors)
         
         print(f"[DEBUG] Total unique doctors found: {len(unique_doctors)}")
         return unique_doctors[:limit]
@@ -121,98 +167,20 @@ class DoctorScraper:
         
         Returns:
             List of parsed doctor information
-        """
-        doctors = []
-        
-        # Combine both markdown and HTML content for parsing
-        combined_content = f"{markdown_content}\n{html_content}"
-        
-        # Enhanced doctor name patterns
-        doctor_patterns = [
-            r'Dr\.?\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})',  # Dr. FirstName LastName
-            r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})\s*,?\s*(MD|MBBS|MS|DM|MCh|DNB)',  # Name, Degree
-            r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})\s*[-–]\s*(Cardiologist|Orthopedic|Neurologist|Dermatologist|Pediatrician|Gynecologist|Urologist|Ophthalmologist|ENT|Gastroenterologist|Pulmonologist|Psychiatrist|Surgeon|Physician|General\s+Physician)',
-        ]
-        
-        # Specialty patterns
-        specialty_patterns = [
-            r'(Cardiologist|Cardiology)',
-            r'(Orthopedic|Orthopedics|Orthopaedic)',
-            r'(Neurologist|Neurology)',
-            r'(Dermatologist|Dermatology)',
-            r'(Pediatrician|Pediatrics)',
-            r'(Gynecologist|Gynecology)',
-            r'(Urologist|Urology)',
-            r'(Ophthalmologist|Ophthalmology)',
-            r'(ENT|Otolaryngology)',
-            r'(Gastroenterologist|Gastroenterology)',
-            r'(Pulmonologist|Pulmonology)',
-            r'(Psychiatrist|Psychiatry)',
-            r'(Surgeon|Surgery)',
-            r'(General\s+Physician|General\s+Medicine|Physician)',
-        ]
-        
-        # Extract potential doctor entries
-        potential_doctors = []
-        
-        for pattern in doctor_patterns:
-            matches = re.finditer(pattern, combined_content, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                groups = match.groups()
-                name = groups[0].strip()
-                specialty = groups[1].strip() if len(groups) > 1 else "General Physician"
-                
-                # Clean up name (remove extra spaces, titles)
-                name = re.sub(r'\s+', ' ', name).strip()
-                
-                # Validate name (should have at least first and last name)
-                if len(name.split()) >= 2 and len(name) > 5:
-                    potential_doctors.append((name, specialty))
-        
-        # Extract phone numbers from the content
-        phone_pattern = r'(?:\+91[\s\-]?)?([6-9]\d{9})'
-        phone_numbers = re.findall(phone_pattern, combined_content)
-        
-        # Remove duplicates while preserving order
-        seen_names = set()
-        unique_doctors = []
         
-        for name, specialty in potential_doctors:
-            name_key = name.lower().strip()
-            if name_key not in seen_names:
-                seen_names.add(name_key)
-                unique_doctors.append((name, specialty))
-        
-        # Create doctor entries
-        for i, (name, specialty) in enumerate(unique_doctors[:10]):
-            doctor_info = {
-                'name': name,
-                'mobile': phone_numbers[i] if i < len(phone_numbers) else '',
-                'designation': specialty,
-                'location': location,
-                'specialty': specialty,
-                'experience': '',
-                'source': 'web_search',
-                'link': search_url
-            }
-            
-            # Try to extract experience from nearby text (within 200 chars of name)
-            name_pos = combined_content.lower().find(name.lower())
-            if name_pos != -1:
-                context = combined_content[max(0, name_pos - 100):min(len(combined_content), name_pos + 200)]
-                exp_match = re.search(r'(\d+)\s*(?:\+)?\s*(?:years?|yrs?)\s*(?:of\s+)?(?:experience|exp)', context, re.IGNORECASE)
-                if exp_match:
-                    doctor_info['experience'] = f"{exp_match.group(1)} years"
-            
-            doctors.append(doctor_info)
-        
-        return doctors
+        See doctor_extraction.py for the single-pass extraction engine.
+        """
+        return extract_doctors(f"{markdown_content}\n{html_content}", location, search_url)
     
     async def search_doctors_by_location(self, specialty: str, latitude: float, 
                                         longitude: float, radius_km: int = 10) -> List[Dict]:
         """
         Search for doctors near a specific location (lat/long) using Firecrawl.
         
+        The coordinate is snapped to the nearest named locality or city in the
+        offline gazetteer (see gazetteer.py), so the web query names a place
+        and nearby patients share the search caches.
+        
         Args:
             specialty: Medical specialty
             latitude: Patient latitude
@@ -222,11 +190,7 @@ class DoctorScraper:
         Returns:
             List of nearby doctors
         """
-        
-        # Use coordinates in the search query
-        location_query = f"near {latitude},{longitude}"
-        
-        return await self.search_doctors(specialty, location_query)
+        return await self.search_doctors(specialty, location_for_coordinates(latitude, longitude))
     
     async def get_doctor_details(self, doctor_url: str) -> Dict:
         """
@@ -237,17 +201,24 @@ class DoctorScraper:
         
         Returns:
             Detailed doctor information
+        
+        Details are cached per URL, and scrapes of the same host are spaced by
+        ENRICH_DOMAIN_INTERVAL_MS.
         """
+        cached = self.details_cache.get(doctor_url)
+        if cached is not None:
+            return cached
         
+        check_cancelled()
+        await self.domain_limiter.wait(doctor_url)
         try:
-            scrape_result = await asyncio.to_thread(
-                self.app.scrape_url,
-                url=doctor_url,
-                params={
+            scrape_result = await run_with_deadline(self.app.scrape_url(
+                doctor_url,
+                {
                     'formats': ['markdown'],
                     'onlyMainContent': True
                 }
-            )
+            ))
             
             if not scrape_result.get('success'):
                 print(f"Failed to scrape doctor details: {scrape_result.get('error', 'Unknown error')}")
@@ -284,6 +255,12 @@ class DoctorScraper:
             if exp_match:
                 details['experience'] = f"{exp_match.group(1)} years"
             
+            # Extract consultation fee
+            fee_match = re.search(r'fees?[^\n₹]{0,40}(?:₹|Rs\.?|INR)\s*([\d,]+)', content, re.IGNORECASE)
+            if fee_match:
+                details['fees'] = f"₹{fee_match.group(1)}"
+            
+            self.details_cache.set(doctor_url, details)
             return details
         
         except Exception as e:
@@ -291,6 +268,52 @@ class DoctorScraper:
             return {}
 
 
+    async def enrich_doctors(self, doctors: List[Dict]) -> List[Dict]:
+        """
+        Merge profile details (qualifications, fees, clinic address, experience)
+        into search_doctors results, fetching up to ENRICH_CONCURRENCY profiles
+        at once.
+        
+        Only links that yielded a single doctor are treated as profile pages;
+        details from a listing page would be attributed to every doctor on it.
+        Returns new dicts, the input (possibly shared with the search cache) is
+        left untouched.
+        """
+        by_link = defaultdict(list)
+        for doctor in doctors:
+            if doctor.get('link'):
+                by_link[doctor['link']].append(doctor)
+        profile_links = [link for link, found in by_link.items() if len(found) == 1]
+        
+        semaphore = asyncio.Semaphore(self.enrich_concurrency)
+        
+        async def fetch(link: str):
+            async with semaphore:
+                return await self.get_doctor_details(link)
+        
+        results = await asyncio.gather(*(fetch(link) for link in profile_links), return_exceptions=True)
+        details_by_link = {
+            link: details for link, details in zip(profile_links, results)
+            if isinstance(details, dict) and details
+        }
+        
+        enriched = []
+        for doctor in doctors:
+            details = details_by_link.get(doctor.get('link'))
+            if not details:
+                enriched.append(doctor)
+                continue
+            merged = dict(doctor)
+            merged['qualifications'] = list(dict.fromkeys(details.get('qualifications', [])))
+            for field in ('fees', 'clinic_address'):
+                if details.get(field):
+                    merged[field] = details[field]
+            if not merged.get('experience') and details.get('experience'):
+                merged['experience'] = details['experience']
+            enriched.append(merged)
+        return enriched
+
+
 # Singleton instance
 _scraper = None
 
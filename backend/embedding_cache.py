@@ -0,0 +1,112 @@
+"""
+Embedding cache for AyuMitraAI.
+
+qdrant_service._embed is content-addressed: the key is the SHA-256 of the
+exact text together with the embedding model name and dimension, so
+switching EMBEDDING_MODEL or EMBEDDING_DIM starts a fresh keyspace instead of
+serving vectors from the old model. Two tiers:
+- memory: TTLCache per worker (LRU, EMBEDDING_CACHE_MEMORY_ENTRIES)
+- mongo:  embedding_cache collection shared by all workers and surviving
+          restarts; a TTL index drops entries after EMBEDDING_CACHE_RETENTION_DAYS
+
+Vectors are kept as packed float32 (12 KB for 3072 dimensions rather than
+~100 KB as a list of Python floats), which is ample precision for cosine
+search.
+"""
+
+import logging
+import os
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from bson import Binary
+
+sys.path.append(os.path.dirname(__file__))
+from cache import TTLCache, cache_key
+from config import get_settings
+from data_lifecycle import ensure_ttl_index
+
+logger = logging.getLogger("ayumitra.embedding_cache")
+settings = get_settings()
+
+CACHE_COLLECTION = "embedding_cache"
+
+
+def embedding_key(model: str, dim: int, text: str) -> str:
+    return cache_key(model, dim, cache_key(text))
+
+
+class EmbeddingCache:
+    """Memory + Mongo cache of embedding vectors keyed by model, dimension and text hash."""
+
+    def __init__(self, db=None):
+        self.memory = TTLCache(settings.EMBEDDING_CACHE_MEMORY_ENTRIES,
+                               settings.EMBEDDING_CACHE_RETENTION_DAYS * 86400, name="embeddings")
+        self._db = db
+        self.counters = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "mongo_errors": 0}
+
+    @property
+    def collection(self):
+        if not settings.EMBEDDING_CACHE_PERSIST:
+            return None
+        if self._db is None:
+            from db import get_db
+            self._db = get_db()
+        return self._db[CACHE_COLLECTION]
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await ensure_ttl_index(self.collection, "created_at",
+                                   timedelta(days=settings.EMBEDDING_CACHE_RETENTION_DAYS), "created_at_ttl")
+
+    async def get(self, model: str, dim: int, text: str) -> Optional[List[float]]:
+        key = embedding_key(model, dim, text)
+        packed = self.memory.get(key)
+        if packed is not None:
+            self.counters["memory_hits"] += 1
+            return packed.tolist()
+        if self.collection is not None:
+            try:
+                doc = await self.collection.find_one({"_id": key}, {"vector": 1})
+            except Exception as exc:
+                self.counters["mongo_errors"] += 1
+                logger.warning("Embedding cache read failed: %s", exc)
+                doc = None
+            if doc is not None:
+                packed = array("f", bytes(doc["vector"]))
+                self.memory.set(key, packed)
+                self.counters["mongo_hits"] += 1
+                return packed.tolist()
+        self.counters["misses"] += 1
+        return None
+
+    async def set(self, model: str, dim: int, text: str, vector: List[float]):
+        key = embedding_key(model, dim, text)
+        packed = array("f", vector)
+        self.memory.set(key, packed)
+        if self.collection is None:
+            return
+        try:
+            await self.collection.replace_one(
+                {"_id": key},
+                {"model": model, "dim": dim, "vector": Binary(packed.tobytes()),
+                 "created_at": datetime.now(timezone.utc)},
+                upsert=True,
+            )
+        except Exception as exc:
+            self.counters["mongo_errors"] += 1
+            logger.warning("Embedding cache write failed: %s", exc)
+
+    def stats(self) -> dict:
+        hits = self.counters["memory_hits"] + self.counters["mongo_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
+
+
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,203 @@
+"""
+Async Firecrawl transport for AyuMitraAI.
+
+DoctorScraper used to call the synchronous FirecrawlApp SDK through
+asyncio.to_thread, so every search or profile scrape held a worker thread and
+the SDK's bare requests.post opened a new connection each time.
+AsyncFirecrawlClient talks to the same v0 endpoints over one shared
+httpx.AsyncClient instead:
+- keep-alive pool of FIRECRAWL_MAX_CONNECTIONS, HTTP/2 when h2 is installed
+- retries of connection errors, 429 and 5xx with jittered exponential backoff
+  (honouring Retry-After)
+- a client-side token bucket at FIRECRAWL_RATE_LIMIT_PER_MINUTE, shared by
+  searches and scrapes, so concurrency is bounded by the plan's quota rather
+  than by threads
+
+One client serves every DoctorScraper in the process (see get_firecrawl_app).
+The rate limit is per process; with several workers, divide the plan's limit
+between them. Without httpx the SDK is still used, via a thread.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - httpx is in requirements.txt; the SDK fallback remains
+    httpx = None
+
+sys.path.append(os.path.dirname(__file__))
+from config import get_settings
+
+logger = logging.getLogger("ayumitra.firecrawl")
+settings = get_settings()
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FirecrawlError(Exception):
+    """A Firecrawl request that failed after all retries."""
+
+
+class TokenBucket:
+    """Allows rate_per_minute acquisitions on average, with bursts of up to burst."""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # Take the token before sleeping (the balance may go negative) so waiters are served in order
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+class AsyncFirecrawlClient:
+    """search / scrape_url against the Firecrawl v0 API, shaped like the results DoctorScraper reads."""
+
+    def __init__(self, api_key: str, api_url: str = None):
+        if not api_key:
+            raise ValueError("No API key provided")
+        self.bucket = TokenBucket(settings.FIRECRAWL_RATE_LIMIT_PER_MINUTE, settings.FIRECRAWL_RATE_LIMIT_BURST)
+        self.retries = settings.FIRECRAWL_MAX_RETRIES
+        self.backoff = settings.FIRECRAWL_RETRY_BACKOFF_SECONDS
+        self.http2 = importlib.util.find_spec("h2") is not None
+        self.client = httpx.AsyncClient(
+            base_url=api_url or settings.FIRECRAWL_API_URL,
+            headers={"Authorization": f"Bearer {api_key}"},
+            http2=self.http2,
+            limits=httpx.Limits(max_connections=settings.FIRECRAWL_MAX_CONNECTIONS,
+                                max_keepalive_connections=settings.FIRECRAWL_MAX_CONNECTIONS),
+            timeout=settings.FIRECRAWL_TIMEOUT_SECONDS,
+        )
+        self.counters = {"requests": 0, "retries": 0, "failures": 0}
+
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        # Full jitter: concurrent callers that failed together do not retry together
+        delay = random.uniform(0, self.backoff * 2 ** attempt)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return delay
+
+    async def _post(self, path: str, payload: dict) -> dict:
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            self.counters["requests"] += 1
+            response = None
+            try:
+                response = await self.client.post(path, json=payload)
+            except httpx.TransportError as exc:
+                error = f"{type(exc).__name__}: {exc}"
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                error = f"HTTP {response.status_code}"
+            if attempt == self.retries:
+                self.counters["failures"] += 1
+                raise FirecrawlError(f"Firecrawl {path} failed after {attempt + 1} attempts: {error}")
+            self.counters["retries"] += 1
+            delay = self._retry_delay(attempt, response)
+            logger.warning("Firecrawl %s: %s, retrying in %.1fs", path, error, delay)
+            await asyncio.sleep(delay)
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        if response.status_code != 200:
+            self.counters["failures"] += 1
+            detail = body.get("error") if isinstance(body, dict) else None
+            raise FirecrawlError(f"Firecrawl {path} returned HTTP {response.status_code}: "
+                                 f"{detail or response.text[:200]}")
+        if not isinstance(body, dict):
+            self.counters["failures"] += 1
+            # A proxy error page or a bare JSON value, not a Firecrawl response object
+            return {"success": False, "error": f"Firecrawl {path} returned a non-object body: {response.text[:200]}"}
+        return body
+
+    async def search(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[dict]:
+        body = await self._post("/v0/search", {"query": query, **(params or {})})
+        if not body.get("success") or "data" not in body:
+            raise FirecrawlError(f"Failed to search. Error: {body.get('error')}")
+        return body["data"]
+
+    async def scrape_url(self, url: str, params: Optional[Dict[str, Any]] = None) -> dict:
+        """The full response, {"success": ..., "data": {"markdown": ...}} or {"success": False, "error": ...}."""
+        return await self._post("/v0/scrape", {"url": url, **(params or {})})
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def stats(self) -> dict:
+        return {**self.counters, "http2": self.http2, "rate_limit_per_minute": settings.FIRECRAWL_RATE_LIMIT_PER_MINUTE}
+
+
+class ThreadedFirecrawlApp:
+    """The synchronous SDK behind the async interface, for installs without httpx."""
+
+    def __init__(self, api_key: str):
+        from firecrawl import FirecrawlApp
+        self.app = FirecrawlApp(api_key=api_key)
+
+    async def search(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[dict]:
+        return await asyncio.to_thread(self.app.search, query, params)
+
+    async def scrape_url(self, url: str, params: Optional[Dict[str, Any]] = None) -> dict:
+        # The SDK unwraps the response and raises on failure
+        data = await asyncio.to_thread(self.app.scrape_url, url, params)
+        return {"success": True, "data": data}
+
+    async def aclose(self):
+        pass
+
+
+def create_firecrawl_app():
+    """A new Firecrawl client for FIRECRAWL_MODE: "live", "record" or "replay" (see firecrawl_replay.py)."""
+    if settings.FIRECRAWL_MODE == "replay":
+        from firecrawl_replay import ReplayFirecrawlApp
+        return ReplayFirecrawlApp(settings.FIRECRAWL_CORPUS_DIR, settings.FIRECRAWL_REPLAY_LATENCY_MS)
+    if httpx is not None:
+        app = AsyncFirecrawlClient(settings.FIRECRAWL_API_KEY)
+    else:
+        app = ThreadedFirecrawlApp(settings.FIRECRAWL_API_KEY)
+    if settings.FIRECRAWL_MODE == "record":
+        from firecrawl_replay import RecordingFirecrawlApp
+        return RecordingFirecrawlApp(app, settings.FIRECRAWL_CORPUS_DIR)
+    return app
+
+
+_app = None
+
+
+def get_firecrawl_app():
+    """The process-wide Firecrawl client, so all scrapers share one connection pool and rate limit."""
+    global _app
+    if _app is None:
+        _app = create_firecrawl_app()
+    return _app
+
+
+async def close_firecrawl_app():
+    global _app
+    if _app is not None:
+        await _app.aclose()
+        _app = None
+
+
+def firecrawl_stats() -> dict:
+    return _app.stats() if hasattr(_app, "stats") else {}
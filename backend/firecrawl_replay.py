@@ -0,0 +1,207 @@
+"""
+Offline Firecrawl stand-in for AyuMitraAI.
+
+ReplayFirecrawlApp answers FirecrawlApp.search / scrape_url from a recorded
+corpus on disk instead of the Firecrawl API, so DoctorScraper can be run and
+benchmarked (see benchmark_scraper.py) without an API key or network.
+RecordingFirecrawlApp wraps the live client and saves every response it gets
+into the corpus. Both have the async interface of firecrawl_client.py.
+
+Corpus layout, one JSON file per response:
+    <corpus>/search/<sha256>.json   {"query": ..., "results": [{url, title, description, markdown}]}
+    <corpus>/pages/<sha256>.json    {"url": ..., "response": <scrape_url response>}
+
+A search that was never recorded is answered from all recorded results,
+ranked by how many query words appear in their title and URL, so replay also
+serves specialty/city combinations beyond the recorded ones.
+
+The client is picked by FIRECRAWL_MODE: "live" (default), "record" or
+"replay", with the corpus in FIRECRAWL_CORPUS_DIR (see create_firecrawl_app).
+synthesize_corpus() writes Practo, Lybrate and Justdial style pages for when
+there are no recordings yet.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(__file__))
+from cache import cache_key
+
+QUERY_WORD = re.compile(r"[a-z]+")
+# Search operators in DoctorScraper's query ("site:practo.com OR ...") are not content words
+QUERY_NOISE = {"or", "in", "doctors", "site", "practo", "lybrate", "justdial", "com", "mg"}
+
+
+def _query_words(text: str) -> set:
+    return set(QUERY_WORD.findall(text.lower())) - QUERY_NOISE
+
+
+def _write(path: Path, payload: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, ensure_ascii=False))
+
+
+class ReplayFirecrawlApp:
+    """FirecrawlApp replacement that serves responses from a recorded corpus."""
+
+    def __init__(self, corpus_dir: str, latency_ms: float = 0):
+        self.corpus = Path(corpus_dir)
+        self.latency = latency_ms / 1000
+        self.searches: Dict[str, List[dict]] = {}
+        self.pages: Dict[str, dict] = {}
+        for path in sorted(self.corpus.glob("search/*.json")):
+            recorded = json.loads(path.read_text())
+            self.searches[recorded["query"]] = recorded["results"]
+        for path in sorted(self.corpus.glob("pages/*.json")):
+            recorded = json.loads(path.read_text())
+            self.pages[recorded["url"]] = recorded["response"]
+        # Every distinct search result, for queries that were not recorded verbatim
+        self.results = list({r["url"]: r for results in self.searches.values() for r in results}.values())
+        if not self.results and not self.pages:
+            raise ValueError(f"Firecrawl corpus {self.corpus} is empty")
+
+    async def _wait(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def search(self, query: str, params: dict = None) -> List[dict]:
+        await self._wait()
+        limit = (params or {}).get("limit", 5)
+        if query in self.searches:
+            return self.searches[query][:limit]
+        words = _query_words(query)
+        ranked = sorted(
+            ((len(words & _query_words(f"{r.get('title', '')} {r.get('url', '')}")), i, r)
+             for i, r in enumerate(self.results)),
+            key=lambda item: (-item[0], item[1]),
+        )
+        return [r for score, _, r in ranked if score][:limit]
+
+    async def scrape_url(self, url: str, params: dict = None) -> dict:
+        await self._wait()
+        recorded = self.pages.get(url)
+        if recorded is None:
+            return {"success": False, "error": f"{url} is not in the corpus"}
+        return recorded
+
+    async def aclose(self):
+        pass
+
+
+class RecordingFirecrawlApp:
+    """Pass-through to the live Firecrawl client that saves each response into the corpus."""
+
+    def __init__(self, app, corpus_dir: str):
+        self.app = app
+        self.corpus = Path(corpus_dir)
+
+    async def search(self, query: str, params: dict = None):
+        results = await self.app.search(query, params)
+        if isinstance(results, list):
+            _write(self.corpus / "search" / f"{cache_key(query)}.json", {"query": query, "results": results})
+        return results
+
+    async def scrape_url(self, url: str, params: dict = None):
+        response = await self.app.scrape_url(url, params)
+        if isinstance(response, dict) and response.get("success"):
+            _write(self.corpus / "pages" / f"{cache_key(url)}.json", {"url": url, "response": response})
+        return response
+
+    async def aclose(self):
+        await self.app.aclose()
+
+
+# --- Synthetic corpus ----------------------------------------------------------
+
+FIRST_NAMES = ["Aarav", "Ananya", "Arjun", "Deepa", "Farhan", "Gayatri", "Harish", "Ishita", "Karthik",
+               "Lakshmi", "Manoj", "Meera", "Nikhil", "Pooja", "Rahul", "Rekha", "Sandeep", "Shalini",
+               "Suresh", "Tanvi", "Vikram", "Yamini"]
+LAST_NAMES = ["Agarwal", "Banerjee", "Chatterjee", "Desai", "Gupta", "Iyer", "Joshi", "Kapoor", "Khan",
+              "Menon", "Nair", "Patel", "Pillai", "Rao", "Reddy", "Sharma", "Singh", "Verma"]
+# Listing titles the extraction engine recognizes, per ingestion specialty
+SPECIALTY_TITLES = {
+    "Cardiology": "Cardiologist", "Dermatology": "Dermatologist", "General Medicine": "General Physician",
+    "Gynecology": "Gynecologist", "Orthopedic Surgery": "Orthopedic", "Pediatrics": "Pediatrician",
+    "Neurology": "Neurologist", "Gastroenterology": "Gastroenterologist", "Otolaryngology (ENT)": "ENT",
+    "Psychiatry": "Psychiatrist",
+}
+FILLER = ("Book an appointment online or call the clinic directly. Verified patient reviews help you choose "
+          "the right doctor. Timings may vary on public holidays; please confirm before visiting. ")
+
+
+def _doctor(rng: random.Random, title: str, city: str) -> dict:
+    return {
+        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "title": title,
+        "phone": f"{rng.choice('6789')}{rng.randrange(10 ** 8, 10 ** 9)}",
+        "years": rng.randrange(3, 35),
+        "fee": rng.randrange(3, 20) * 100,
+        "area": f"{rng.choice(['MG Road', 'Sector 21', 'Main Street', 'Ring Road', 'Station Road'])}, {city}",
+    }
+
+
+def _practo_card(d: dict) -> str:
+    return (f"## Dr. {d['name']}\n{d['title']}\n{d['years']} years experience overall\n{d['area']}\n"
+            f"₹{d['fee']} Consultation fee at clinic\nCall +91 {d['phone']}\n\n")
+
+
+def _lybrate_card(d: dict) -> str:
+    return (f"### {d['name']}, MBBS\n{d['title']} · {d['years']} Years Exp\n{d['area']}\n"
+            f"Consultation fees: Rs. {d['fee']}\n\n")
+
+
+def _justdial_card(d: dict) -> str:
+    return f"**{d['name']} - {d['title']}**\n{d['area']}\n{d['phone']}\nOpen 24 Hrs\n\n"
+
+
+SITES = {
+    "practo.com": ("Best {title}s in {city} - Practo", _practo_card),
+    "lybrate.com": ("{title}s in {city} | Lybrate", _lybrate_card),
+    "justdial.com": ("Top {title} Doctors in {city} - Justdial", _justdial_card),
+}
+
+
+def synthesize_corpus(corpus_dir: str, combinations: List[tuple], doctors_per_page: int = 12,
+                      filler_paragraphs: int = 40, seed: int = 7) -> dict:
+    """
+    Write one listing page per site for every (specialty, city), recorded
+    under the exact query DoctorScraper builds, plus one profile page per
+    listed doctor. The same doctors appear on several sites, as they do on
+    the real directories, so deduplication has work to do.
+    """
+    from doctor_scraper import search_query
+
+    rng = random.Random(seed)
+    corpus = Path(corpus_dir)
+    searches = pages = 0
+    for specialty, city in combinations:
+        title = SPECIALTY_TITLES.get(specialty, "Physician")
+        doctors = [_doctor(rng, title, city) for _ in range(doctors_per_page)]
+        results = []
+        for site, (page_title, card) in SITES.items():
+            listed = rng.sample(doctors, k=max(1, doctors_per_page * 2 // 3))
+            body = "".join(card(d) + FILLER * rng.randrange(1, 3) for d in listed)
+            slug = f"{city}/{specialty}".lower().replace(" ", "-")
+            results.append({
+                "url": f"https://www.{site}/{slug}",
+                "title": page_title.format(title=title, city=city),
+                "description": f"{len(listed)} {title}s in {city}. Book appointments and check fees.",
+                "markdown": body + (FILLER + "\n\n") * filler_paragraphs,
+            })
+            for d in listed:
+                url = f"https://www.{site}/{slug}/{d['name'].lower().replace(' ', '-')}"
+                markdown = (f"# Dr. {d['name']}\nMBBS, MD - {specialty}\n{d['years']} years experience\n"
+                            f"Clinic address: {d['area']}\nConsultation fees ₹{d['fee']}\n\n{FILLER}")
+                _write(corpus / "pages" / f"{cache_key(url)}.json",
+                       {"url": url, "response": {"success": True, "data": {"markdown": markdown}}})
+                pages += 1
+        query = search_query(specialty, city)
+        _write(corpus / "search" / f"{cache_key(query)}.json", {"query": query, "results": results})
+        searches += 1
+    return {"searches": searches, "pages": pages}
@@ -0,0 +1,144 @@
+"""
+Offline gazetteer of Indian cities and localities for AyuMitraAI.
+
+data/india_places.csv lists cities and the main localities of the metros,
+with coordinates and alternate names (Bengaluru, Bombay, Gurugram...). It is
+loaded once into a grid index of GRID_DEGREES cells (a fixed-precision
+geohash), so snapping a coordinate only measures the places in the few cells
+around it instead of the whole table.
+
+Web doctor searches by coordinate are turned into a canonical place name
+("Koramangala, Bangalore") before they reach Firecrawl and the search caches:
+every patient within a locality shares one cache entry, and the query names
+a place the directories understand rather than raw coordinates.
+canonical_location() does the same for typed locations, so "Bengaluru" and
+"bangalore " are one search.
+"""
+
+import csv
+import math
+import os
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(__file__))
+from config import get_settings
+
+settings = get_settings()
+
+PLACES_FILE = os.path.join(os.path.dirname(__file__), "data", "india_places.csv")
+GRID_DEGREES = 0.25
+EARTH_RADIUS_KM = 6371.0
+# Smallest east-west extent of a cell in India (about 35°N), so ring counts never undershoot
+MIN_CELL_KM = GRID_DEGREES * 111.32 * math.cos(math.radians(35))
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    kind: str  # "city" or "locality"
+    city: str
+    state: str
+    latitude: float
+    longitude: float
+
+    @property
+    def query(self) -> str:
+        """Location string for web searches and cache keys."""
+        return self.name if self.kind == "city" else f"{self.name}, {self.city}"
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat, dlon = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
+    a = (math.sin(dlat / 2) ** 2
+         + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _cell(latitude: float, longitude: float) -> Tuple[int, int]:
+    return math.floor(latitude / GRID_DEGREES), math.floor(longitude / GRID_DEGREES)
+
+
+class Gazetteer:
+    """Places with a grid index for nearest-place lookups and an alias table for names."""
+
+    def __init__(self, places: List[Place], aliases: Dict[str, Place]):
+        self.places = places
+        self.aliases = aliases
+        self.grid: Dict[Tuple[int, int], List[Place]] = {}
+        for place in places:
+            self.grid.setdefault(_cell(place.latitude, place.longitude), []).append(place)
+
+    @classmethod
+    def load(cls, path: str = PLACES_FILE) -> "Gazetteer":
+        places, aliases = [], {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                place = Place(row["name"], row["kind"], row["city"], row["state"],
+                              float(row["latitude"]), float(row["longitude"]))
+                places.append(place)
+                for name in [place.name, *filter(None, row["aliases"].split("|"))]:
+                    aliases.setdefault(_name_key(name), place)
+        return cls(places, aliases)
+
+    def nearest(self, latitude: float, longitude: float, max_km: float, kind: str = None) -> Optional[Place]:
+        """Closest place (of `kind`, if given) within max_km, or None."""
+        rings = math.ceil(max_km / MIN_CELL_KM)
+        row, col = _cell(latitude, longitude)
+        best, best_km = None, max_km
+        for r in range(row - rings, row + rings + 1):
+            for c in range(col - rings, col + rings + 1):
+                for place in self.grid.get((r, c), ()):
+                    if kind and place.kind != kind:
+                        continue
+                    km = haversine_km(latitude, longitude, place.latitude, place.longitude)
+                    if km <= best_km:
+                        best, best_km = place, km
+        return best
+
+    def snap(self, latitude: float, longitude: float) -> Optional[Place]:
+        """
+        The named place a coordinate belongs to: the nearest locality within
+        GAZETTEER_LOCALITY_KM, else the nearest city within GAZETTEER_CITY_KM.
+        """
+        return (self.nearest(latitude, longitude, settings.GAZETTEER_LOCALITY_KM, kind="locality")
+                or self.nearest(latitude, longitude, settings.GAZETTEER_CITY_KM, kind="city"))
+
+    def lookup(self, name: str) -> Optional[Place]:
+        return self.aliases.get(_name_key(name))
+
+
+def _name_key(name: str) -> str:
+    return " ".join(name.replace(".", " ").lower().split())
+
+
+@lru_cache(maxsize=1)
+def get_gazetteer() -> Gazetteer:
+    return Gazetteer.load()
+
+
+def location_for_coordinates(latitude: float, longitude: float) -> str:
+    """Canonical place name for a coordinate; rounded coordinates (~1 km) where no place is near."""
+    place = get_gazetteer().snap(latitude, longitude)
+    if place is not None:
+        return place.query
+    return f"near {latitude:.2f},{longitude:.2f}"
+
+
+def canonical_location(location: str) -> str:
+    """
+    Replace known place names and aliases in a typed location with their
+    canonical spelling ("bengaluru" -> "Bangalore"). A bare locality gets its
+    city appended ("Koramangala" -> "Koramangala, Bangalore"). Unknown parts
+    are kept as typed.
+    """
+    parts = [part.strip() for part in location.split(",") if part.strip()]
+    if not parts:
+        return location.strip()
+    gazetteer = get_gazetteer()
+    places = [gazetteer.lookup(part) for part in parts]
+    if len(parts) == 1 and places[0] is not None:
+        return places[0].query
+    return ", ".join(place.name if place else part for part, place in zip(parts, places))
@@ -0,0 +1,473 @@
+"""
+Synthetic dataset generator for load testing AyuMitraAI at production scale.
+
+Produces hospitals, clinics, doctors (+ user accounts), patients, patient
+requests, doctor notifications and prescriptions with realistic distributions
+over the DEMO_DOCTORS specialties, written with unordered bulk_write batches.
+
+Every document gets a deterministic _id, so an interrupted run can be resumed:
+progress is checkpointed per entity in the `synthetic_progress` collection and
+re-written batches are absorbed as duplicate-key errors.
+
+Run:
+    uv run python generate_dataset.py --doctors 50000 --requests 10000000
+    uv run python generate_dataset.py --doctors 50000 --requests 10000000   # resumes
+    uv run python generate_dataset.py --reset ...                           # start over
+Password for ALL synthetic accounts: AyuMitra123
+"""
+import argparse
+import asyncio
+import bisect
+import random
+import struct
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+import bcrypt
+from bson import ObjectId
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+from db import close_clients, get_db
+from models import specialty_code
+from seed_doctors import DEMO_DOCTORS, PASSWORD
+
+PROGRESS_COLLECTION = "synthetic_progress"
+NAMESPACE = uuid.UUID("6f1c2a9e-2d7b-4c1e-9b53-0a7d5e3c8f10")
+DUPLICATE_KEY = 11000
+
+# Entity code embedded in every synthetic ObjectId: b"SYN" + code + 8-byte index
+ENTITY_CODES = {
+    "hospitals": 1,
+    "clinics": 2,
+    "doctors": 3,
+    "patients": 4,
+    "patient_requests": 5,
+    "doctor_notifications": 6,
+    "prescriptions": 7,
+}
+
+# Relative supply/demand per specialty; anything not listed gets weight 1
+SPECIALTY_WEIGHTS = {
+    "General Medicine": 18, "Family Medicine": 8, "Pediatrics": 7, "Gynecology": 7,
+    "Internal Medicine": 6, "Orthopedic Surgery": 6, "Dermatology": 5, "Cardiology": 5,
+    "Otolaryngology (ENT)": 4, "Ophthalmology": 4, "Neurology": 3, "Psychiatry": 3,
+    "Gastroenterology": 3, "Endocrinology": 3, "Emergency Medicine": 3, "Obstetrics": 3,
+    "Pulmonology": 2, "Urology": 2, "General Surgery": 2,
+}
+
+CITIES = [
+    # (city, weight, latitude, longitude)
+    ("Bangalore", 14, 12.9716, 77.5946), ("Mumbai", 14, 19.0760, 72.8777),
+    ("Delhi", 14, 28.7041, 77.1025), ("Chennai", 9, 13.0827, 80.2707),
+    ("Hyderabad", 9, 17.3850, 78.4867), ("Kolkata", 8, 22.5726, 88.3639),
+    ("Pune", 7, 18.5204, 73.8567), ("Ahmedabad", 6, 23.0225, 72.5714),
+    ("Jaipur", 4, 26.9124, 75.7873), ("Lucknow", 4, 26.8467, 80.9462),
+    ("Kochi", 3, 9.9312, 76.2673), ("Chandigarh", 3, 30.7333, 76.7794),
+    ("Indore", 3, 22.7196, 75.8577), ("Bhubaneswar", 2, 20.2961, 85.8245),
+]
+
+SYMPTOMS = {
+    "Cardiology": ["chest pain radiating to left arm", "palpitations while climbing stairs", "tightness in chest"],
+    "Dermatology": ["itchy red rash on forearms", "persistent acne with scarring", "dry scaly skin patches"],
+    "Pediatrics": ["child has high fever and cough", "infant not feeding well", "toddler with ear pain"],
+    "Gynecology": ["irregular menstrual cycle", "severe period cramps", "pelvic pain during pregnancy"],
+    "Orthopedic Surgery": ["knee pain after running", "lower back pain when bending", "swollen ankle after a fall"],
+    "Psychiatry": ["constant anxiety and trouble sleeping", "low mood for several weeks", "frequent panic attacks"],
+    "Neurology": ["recurring migraine with aura", "numbness in fingers", "dizziness and blurred vision"],
+    "Otolaryngology (ENT)": ["sore throat and blocked nose", "ringing in the ears", "sinus pressure and headache"],
+}
+GENERIC_SYMPTOMS = ["fever and body ache", "persistent fatigue and weakness", "cough with mild fever", "stomach pain after meals"]
+DURATIONS = ["since yesterday", "for 3 days", "for a week", "for two weeks", "on and off for a month"]
+MEDICATIONS = ["Paracetamol 500mg", "Amoxicillin 250mg", "Cetirizine 10mg", "Pantoprazole 40mg", "Ibuprofen 400mg",
+               "Metformin 500mg", "Azithromycin 500mg", "Vitamin D3 60K", "Omeprazole 20mg", "Salbutamol inhaler"]
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Ananya", "Diya", "Ishaan", "Kavya", "Meera", "Rohan", "Saanvi",
+               "Arjun", "Priya", "Rahul", "Sneha", "Vikram", "Lakshmi", "Karthik", "Neha", "Suresh", "Pooja"]
+LAST_NAMES = ["Sharma", "Nair", "Reddy", "Iyer", "Patel", "Gupta", "Menon", "Rao", "Singh", "Kulkarni",
+              "Das", "Joshi", "Pillai", "Bhat", "Verma", "Krishnan", "Shetty", "Mehta", "Bose", "Chandra"]
+
+URGENCY = [("mild", 45, 0.3, 0.6), ("moderate", 45, 0.6, 0.85), ("critical", 10, 0.85, 1.0)]
+REQUEST_STATUS = [("completed", 55), ("pending", 20), ("rejected", 15), ("accepted", 10)]
+
+
+def _oid(entity: str, index: int) -> ObjectId:
+    return ObjectId(b"SYN" + struct.pack(">BQ", ENTITY_CODES[entity], index))
+
+
+def _uid(entity: str, index: int) -> str:
+    return str(uuid.uuid5(NAMESPACE, f"{entity}:{index}"))
+
+
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+class Distributions:
+    """Deterministic index -> attribute mappings shared by all generators."""
+
+    def __init__(self, args):
+        self.args = args
+        self.specialties = sorted({spec for (_, _, spec, _, _, _) in DEMO_DOCTORS})
+        weights = [SPECIALTY_WEIGHTS.get(spec, 1) for spec in self.specialties]
+        self.specialty_cum_weights = list(accumulate(weights))
+
+        # Doctors are laid out in contiguous specialty blocks proportional to weight
+        total = self.specialty_cum_weights[-1]
+        self.block_starts = [0]
+        for cum in self.specialty_cum_weights[:-1]:
+            self.block_starts.append(round(args.doctors * cum / total))
+        self.block_ends = self.block_starts[1:] + [args.doctors]
+
+        self.city_cum_weights = list(accumulate(c[1] for c in CITIES))
+        self.urgency_cum_weights = list(accumulate(u[1] for u in URGENCY))
+        self.status_cum_weights = list(accumulate(s[1] for s in REQUEST_STATUS))
+        self.facilities = sorted({facility for (_, _, _, facility, _, _) in DEMO_DOCTORS})
+        self.now = datetime.now(timezone.utc)
+
+    def doctor_specialty(self, index: int) -> str:
+        return self.specialties[bisect.bisect_right(self.block_starts, index) - 1]
+
+    def pick_specialty(self, rng: random.Random) -> int:
+        return rng.choices(range(len(self.specialties)), cum_weights=self.specialty_cum_weights)[0]
+
+    def pick_doctors(self, rng: random.Random, specialty_idx: int, count: int) -> list:
+        start, end = self.block_starts[specialty_idx], self.block_ends[specialty_idx]
+        if end <= start:
+            start, end = 0, self.args.doctors
+        return [rng.randrange(start, end) for _ in range(count)]
+
+    def pick_city(self, rng: random.Random):
+        return rng.choices(CITIES, cum_weights=self.city_cum_weights)[0]
+
+    def location(self, rng: random.Random) -> dict:
+        city, _, lat, lon = self.pick_city(rng)
+        return {
+            "address": f"{rng.randint(1, 400)}, {rng.choice(['MG Road', 'Main Street', 'Ring Road', 'Station Road'])}, {city}",
+            "city": city,
+            "lat": round(lat + rng.uniform(-0.15, 0.15), 5),
+            "lon": round(lon + rng.uniform(-0.15, 0.15), 5),
+        }
+
+    def past(self, rng: random.Random) -> datetime:
+        # Recency-skewed: most traffic is recent, with a long tail back to --days
+        return self.now - timedelta(days=self.args.days * rng.betavariate(1, 3))
+
+
+def gen_hospitals(dist, rng, start, end):
+    docs = []
+    for i in range(start, end):
+        docs.append({"hospitals": {
+            "_id": _oid("hospitals", i),
+            "hospital_id": _uid("hospitals", i),
+            "hospital_name": f"{rng.choice(dist.facilities)} #{i}",
+            "hospital_type": rng.choice(["private", "private", "government"]),
+            "location": dist.location(rng),
+            "doctors": [],
+            "total_rooms": rng.randint(20, 600),
+            "icu_beds": rng.randint(0, 60),
+            "has_emergency_dept": rng.random() < 0.6,
+            "operation_theatres": rng.randint(0, 12),
+            "nurses_count": rng.randint(10, 400),
+            "services": rng.sample(["MRI", "CT", "X-Ray", "Physiotherapy", "Dialysis", "Pharmacy", "Lab"], 3),
+            "contact_phone": f"+91-{rng.randint(6000000000, 9999999999)}",
+            "created_at": dist.past(rng).isoformat(),
+        }})
+    return docs
+
+
+def gen_clinics(dist, rng, start, end):
+    docs = []
+    for i in range(start, end):
+        specialty = dist.specialties[dist.pick_specialty(rng)]
+        docs.append({"clinics": {
+            "_id": _oid("clinics", i),
+            "clinic_id": _uid("clinics", i),
+            "clinic_name": f"{rng.choice(LAST_NAMES)} {specialty} Clinic #{i}",
+            "location": dist.location(rng),
+            "doctor": {
+                "name": f"Dr. {_name(rng)}",
+                "specialization": specialty,
+                "experience": rng.randint(2, 35),
+                "availability_hours": rng.choice(["9:00 AM - 1:00 PM", "10:00 AM - 6:00 PM", "5:00 PM - 9:00 PM"]),
+            },
+            "has_nurses": rng.random() < 0.5,
+            "has_medicine_shop": rng.random() < 0.4,
+            "accepts_emergencies": rng.random() < 0.15,
+            "fees": rng.choice([200, 300, 400, 500, 700, 1000]),
+            "contact_phone": f"+91-{rng.randint(6000000000, 9999999999)}",
+            "created_at": dist.past(rng).isoformat(),
+        }})
+    return docs
+
+
+def gen_doctors(dist, rng, start, end, password_hash):
+    docs = []
+    for i in range(start, end):
+        doctor_id = _uid("doctors", i)
+        full_name = f"Dr. {_name(rng)}"
+        email = f"doctor{i}@synthetic.ayumitra.demo"
+        exp = min(int(rng.gammavariate(3, 4)) + 1, 45)
+        created_at = dist.past(rng).isoformat()
+        in_hospital = dist.args.hospitals and (not dist.args.clinics or rng.random() < 0.6)
+        if in_hospital:
+            facility_id, facility_type = _uid("hospitals", rng.randrange(dist.args.hospitals)), "hospital"
+        elif dist.args.clinics:
+            facility_id, facility_type = _uid("clinics", rng.randrange(dist.args.clinics)), "clinic"
+        else:
+            facility_id, facility_type = None, "clinic"
+        docs.append({"users": {
+            "_id": _oid("doctors", i),
+            "user_id": doctor_id,
+            "email": email,
+            "password": password_hash,
+            "role": "doctor",
+            "full_name": full_name,
+            "created_at": created_at,
+        }})
+        docs.append({"doctors": {
+            "_id": _oid("doctors", i),
+            "doctor_id": doctor_id,
+            "user_id": doctor_id,
+            "full_name": full_name,
+            "email": email,
+            "phone": f"+91-{rng.randint(6000000000, 9999999999)}",
+            "specialization": dist.doctor_specialty(i),
+            "specialty_code": specialty_code(dist.doctor_specialty(i)),
+            "experience_years": exp,
+            "license_number": f"SYN-{i:08d}",
+            "facility_id": facility_id,
+            "facility_name": rng.choice(dist.facilities),
+            "facility_type": facility_type,
+            "availability": {
+                "is_online": rng.random() < 0.3,
+                "time_slots": [],
+            },
+            "rating": round(min(5.0, rng.gauss(4.3, 0.35)), 1),
+            "consultation_fee": rng.choice([300, 400, 500, 600, 800, 1000, 1500]),
+            "patients_treated": int(rng.expovariate(1 / 200)),
+            "created_at": created_at,
+        }})
+    return docs
+
+
+def gen_patients(dist, rng, start, end, password_hash):
+    docs = []
+    for i in range(start, end):
+        docs.append({"users": {
+            "_id": _oid("patients", i),
+            "user_id": _uid("patients", i),
+            "email": f"patient{i}@synthetic.ayumitra.demo",
+            "password": password_hash,
+            "role": "patient",
+            "full_name": _name(rng),
+            "created_at": dist.past(rng).isoformat(),
+        }})
+    return docs
+
+
+def _request_shape(dist, index: int) -> tuple:
+    """Specialty, matched doctor indexes and status of request `index` (stable across entities)."""
+    rng = random.Random(f"{dist.args.seed}:request:{index}")
+    specialty_idx = dist.pick_specialty(rng)
+    matched = dist.pick_doctors(rng, specialty_idx, rng.randint(1, 5)) if dist.args.doctors else []
+    status = rng.choices(REQUEST_STATUS, cum_weights=dist.status_cum_weights)[0][0]
+    return specialty_idx, matched, status, rng
+
+
+def gen_requests(dist, _rng, start, end):
+    docs = []
+    for i in range(start, end):
+        specialty_idx, matched, status, rng = _request_shape(dist, i)
+        specialty = dist.specialties[specialty_idx]
+        level, _, low, high = rng.choices(URGENCY, cum_weights=dist.urgency_cum_weights)[0]
+        anonymous = not dist.args.patients or rng.random() < 0.3
+        patient_id = f"temp_{_uid('patient_requests', i)}" if anonymous else _uid("patients", rng.randrange(dist.args.patients))
+        symptom = rng.choice(SYMPTOMS.get(specialty, GENERIC_SYMPTOMS))
+        doc = {
+            "_id": _oid("patient_requests", i),
+            "request_id": _uid("patient_requests", i),
+            "patient_id": patient_id,
+            "patient_name": "Anonymous Patient" if anonymous else _name(rng),
+            "patient_age": min(int(rng.gauss(38, 18)), 95) if rng.random() < 0.8 else None,
+            "symptoms": f"{symptom} {rng.choice(DURATIONS)}",
+            "urgency_level": level,
+            "urgency_score": round(rng.uniform(low, high), 2),
+            "primary_specialty": specialty,
+            "recommended_actions": ["Consult the recommended specialist"],
+            "critical_warnings": ["Seek emergency care if symptoms worsen"] if level == "critical" else [],
+            "key_symptoms": [symptom],
+            "requested_at": dist.past(rng),
+            "is_anonymous": anonymous,
+            "status": status,
+            "matched_doctors": [_uid("doctors", d) for d in matched],
+            "assigned_doctor_id": _uid("doctors", matched[0]) if matched and status in ("accepted", "completed") else None,
+        }
+        if status == "completed":
+            fee = rng.choice([300, 500, 800])
+            doc["bill_breakdown"] = {"consultation_fee": fee, "additional_charges": [], "total": fee}
+        docs.append({"patient_requests": doc})
+    return docs
+
+
+def gen_notifications(dist, rng, start, end):
+    docs = []
+    for i in range(start, end):
+        request_index = rng.randrange(dist.args.requests)
+        _, matched, _, _ = _request_shape(dist, request_index)
+        if not matched:
+            continue
+        docs.append({"doctor_notifications": {
+            "_id": _oid("doctor_notifications", i),
+            "notification_id": _uid("doctor_notifications", i),
+            "doctor_id": _uid("doctors", rng.choice(matched)),
+            "patient_request_id": _uid("patient_requests", request_index),
+            "patient_name": _name(rng),
+            "symptoms": rng.choice(GENERIC_SYMPTOMS),
+            "urgency_level": rng.choices(URGENCY, cum_weights=dist.urgency_cum_weights)[0][0],
+            "created_at": dist.past(rng),
+            "read": rng.random() < 0.7,
+        }})
+    return docs
+
+
+def gen_prescriptions(dist, rng, start, end):
+    docs = []
+    for i in range(start, end):
+        request_index = rng.randrange(dist.args.requests) if dist.args.requests else i
+        specialty_idx, matched, _, _ = _request_shape(dist, request_index)
+        medications = [
+            {"name": med, "dosage": "1 tablet", "frequency": rng.choice(["OD", "BD", "TDS"]), "duration": f"{rng.randint(3, 14)} days"}
+            for med in rng.sample(MEDICATIONS, rng.randint(1, 4))
+        ]
+        docs.append({"prescriptions": {
+            "_id": _oid("prescriptions", i),
+            "prescription_id": _uid("prescriptions", i),
+            "patient_id": _uid("patients", rng.randrange(dist.args.patients)) if dist.args.patients else None,
+            "patient_name": _name(rng),
+            "doctor_name": f"Dr. {_name(rng)}",
+            "doctor_specialty": dist.specialties[specialty_idx],
+            "request_id": _uid("patient_requests", request_index),
+            "symptoms": rng.choice(GENERIC_SYMPTOMS),
+            "notes": "Review after the course if symptoms persist.",
+            "medications": medications,
+            "created_at": dist.past(rng).isoformat(),
+        }})
+    return docs
+
+
+async def _write_batch(db, docs: list):
+    by_collection = {}
+    for item in docs:
+        for collection, doc in item.items():
+            by_collection.setdefault(collection, []).append(InsertOne(doc))
+    for collection, ops in by_collection.items():
+        try:
+            await db[collection].bulk_write(ops, ordered=False)
+        except BulkWriteError as exc:
+            # Batches re-written after a resume collide on their deterministic _ids
+            if any(err.get("code") != DUPLICATE_KEY for err in exc.details.get("writeErrors", [])):
+                raise
+
+
+async def generate_entity(db, dist, entity: str, total: int, generator, concurrency: int, batch_size: int):
+    progress = await db[PROGRESS_COLLECTION].find_one({"_id": entity}) or {}
+    if progress.get("seed") not in (None, dist.args.seed):
+        raise SystemExit(f"{entity} was generated with seed {progress['seed']}; rerun with that seed or --reset")
+    done = min(progress.get("done", 0), total)
+    if done >= total:
+        print(f"  {entity}: {total:,} already generated, skipping")
+        return
+
+    print(f"  {entity}: generating {total - done:,} (resuming at {done:,})")
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    finished = set()
+    frontier = done
+    pending = set()
+
+    async def run(batch_start: int, batch_end: int):
+        nonlocal frontier
+        try:
+            rng = random.Random(f"{dist.args.seed}:{entity}:{batch_start}")
+            await _write_batch(db, generator(dist, rng, batch_start, batch_end))
+            finished.add(batch_start)
+            # Checkpoint only the contiguous prefix so a resume never skips a batch
+            advanced = False
+            while frontier in finished:
+                finished.discard(frontier)
+                frontier = min(frontier + batch_size, total)
+                advanced = True
+            if advanced:
+                await db[PROGRESS_COLLECTION].update_one(
+                    {"_id": entity},
+                    {"$set": {"done": frontier, "target": total, "seed": dist.args.seed}},
+                    upsert=True,
+                )
+                rate = (frontier - done) / max(time.perf_counter() - started, 1e-6)
+                print(f"    {entity}: {frontier:,}/{total:,} ({rate:,.0f} docs/s)", end="\r")
+        finally:
+            semaphore.release()
+
+    for batch_start in range(done, total, batch_size):
+        await semaphore.acquire()
+        task = asyncio.create_task(run(batch_start, min(batch_start + batch_size, total)))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+    print(f"\n  {entity}: done in {time.perf_counter() - started:,.1f}s")
+
+
+async def generate(args):
+    db = get_db()
+    if args.reset:
+        print("Resetting synthetic data...")
+        for entity, code in ENTITY_CODES.items():
+            low, high = ObjectId(b"SYN" + struct.pack(">BQ", code, 0)), ObjectId(b"SYN" + struct.pack(">BQ", code + 1, 0))
+            collections = ["users", "doctors"] if entity == "doctors" else ["users"] if entity == "patients" else [entity]
+            for collection in collections:
+                await db[collection].delete_many({"_id": {"$gte": low, "$lt": high}})
+        await db[PROGRESS_COLLECTION].delete_many({})
+
+    # Hash once: bcrypt is deliberately slow and every synthetic account shares a password
+    password_hash = bcrypt.hashpw(args.password.encode(), bcrypt.gensalt()).decode()
+    dist = Distributions(args)
+
+    plan = [
+        ("hospitals", args.hospitals, gen_hospitals),
+        ("clinics", args.clinics, gen_clinics),
+        ("doctors", args.doctors, lambda d, r, s, e: gen_doctors(d, r, s, e, password_hash)),
+        ("patients", args.patients, lambda d, r, s, e: gen_patients(d, r, s, e, password_hash)),
+        ("patient_requests", args.requests, gen_requests),
+        ("doctor_notifications", args.notifications if args.requests else 0, gen_notifications),
+        ("prescriptions", args.prescriptions, gen_prescriptions),
+    ]
+    for entity, total, generator in plan:
+        if total > 0:
+            await generate_entity(db, dist, entity, total, generator, args.concurrency, args.batch_size)
+    print("\nDone.")
+    close_clients()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a synthetic AyuMitraAI dataset for load testing.")
+    parser.add_argument("--hospitals", type=int, default=500)
+    parser.add_argument("--clinics", type=int, default=2000)
+    parser.add_argument("--doctors", type=int, default=5000)
+    parser.add_argument("--patients", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--notifications", type=int, default=600000)
+    parser.add_argument("--prescriptions", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=365, help="Spread timestamps over this many past days")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=4, help="Bulk writes in flight")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--reset", action="store_true", help="Delete synthetic data and progress before generating")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(generate(parse_args()))
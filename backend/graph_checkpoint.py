@@ -0,0 +1,282 @@
+"""
+LangGraph checkpoint storage for the AyuMitra Health Copilot.
+
+The copilot graph is compiled with a checkpointer so TriageState is persisted
+after every node, keyed by thread_id = the SSE run id. A run that is
+interrupted (cancelled, crashed, worker restarted) resumes from the last
+completed node, and a finished run can be re-fetched without calling Gemini or
+Firecrawl again.
+
+Backends (COPILOT_CHECKPOINTER):
+- "mongo":  MongoCheckpointSaver, checkpoints expire after COPILOT_CHECKPOINT_TTL_HOURS
+- "memory": LangGraph's in-process MemorySaver (single worker, tests)
+- "none":   no checkpointing (previous behaviour)
+"""
+
+import logging
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.memory import MemorySaver
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+sys.path.append(os.path.dirname(__file__))
+from config import get_settings
+from data_lifecycle import ensure_ttl_index
+
+logger = logging.getLogger("ayumitra.checkpoint")
+settings = get_settings()
+
+CHECKPOINTERS = ("mongo", "memory", "none")
+CHECKPOINTS_COLLECTION = "copilot_checkpoints"
+WRITES_COLLECTION = "copilot_checkpoint_writes"
+WRITES_ORDER = [("task_id", ASCENDING), ("idx", ASCENDING)]
+
+
+class MongoCheckpointSaver(BaseCheckpointSaver):
+    """
+    Checkpoint saver on Motor. One document per checkpoint (channel values
+    included, the copilot state is small) plus one document per pending write.
+    The copilot graph is always streamed through the async API; the sync API
+    (graph.invoke, get_state) runs the same queries on a PyMongo database.
+    """
+
+    def __init__(self, db, serde=None, sync_db=None):
+        super().__init__(serde=serde)
+        self.db = db
+        self._sync_db = sync_db
+
+    # Looked up per use: the saver is built at import, and server.db only
+    # creates its Motor client (per worker) on first use
+    @property
+    def checkpoints(self):
+        return self.db[CHECKPOINTS_COLLECTION]
+
+    @property
+    def writes(self):
+        return self.db[WRITES_COLLECTION]
+
+    @property
+    def sync_db(self):
+        if self._sync_db is None:
+            from db import get_sync_db
+            self._sync_db = get_sync_db()
+        return self._sync_db
+
+    async def ensure_indexes(self):
+        await self.checkpoints.create_index(
+            [("thread_id", ASCENDING), ("checkpoint_ns", ASCENDING), ("checkpoint_id", DESCENDING)],
+            unique=True,
+        )
+        await self.writes.create_index(
+            [("thread_id", ASCENDING), ("checkpoint_ns", ASCENDING), ("checkpoint_id", ASCENDING),
+             ("task_id", ASCENDING), ("idx", ASCENDING)],
+            unique=True,
+        )
+        retention = timedelta(hours=settings.COPILOT_CHECKPOINT_TTL_HOURS)
+        for collection in (self.checkpoints, self.writes):
+            await ensure_ttl_index(collection, "created_at", retention, "created_at_ttl")
+
+    # Query and document builders shared by the async and sync APIs
+
+    def _loads(self, type_: str, value: bytes):
+        return self.serde.loads_typed((type_, bytes(value)))
+
+    @staticmethod
+    def _writes_query(doc: dict) -> dict:
+        return {"thread_id": doc["thread_id"], "checkpoint_ns": doc["checkpoint_ns"],
+                "checkpoint_id": doc["checkpoint_id"]}
+
+    def _to_tuple(self, doc: dict, pending: list) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id = doc["thread_id"], doc["checkpoint_ns"], doc["checkpoint_id"]
+        parent_id = doc.get("parent_checkpoint_id")
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id,
+            }},
+            checkpoint=self._loads(doc["type"], doc["checkpoint"]),
+            metadata=self._loads(doc["metadata_type"], doc["metadata"]),
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id,
+                }}
+                if parent_id else None
+            ),
+            pending_writes=[(w["task_id"], w["channel"], self._loads(w["type"], w["value"])) for w in pending],
+        )
+
+    @staticmethod
+    def _get_query(config: RunnableConfig) -> dict:
+        configurable = config["configurable"]
+        query = {
+            "thread_id": configurable["thread_id"],
+            "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+        }
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            query["checkpoint_id"] = checkpoint_id
+        return query
+
+    @staticmethod
+    def _list_query(config: Optional[RunnableConfig], before: Optional[RunnableConfig]) -> dict:
+        query = {}
+        if config:
+            configurable = config["configurable"]
+            query["thread_id"] = configurable["thread_id"]
+            if configurable.get("checkpoint_ns") is not None:
+                query["checkpoint_ns"] = configurable["checkpoint_ns"]
+            if get_checkpoint_id(config):
+                query["checkpoint_id"] = get_checkpoint_id(config)
+        if before and get_checkpoint_id(before):
+            bound = {"$lt": get_checkpoint_id(before)}
+            query["checkpoint_id"] = {"$eq": query["checkpoint_id"], **bound} if "checkpoint_id" in query else bound
+        return query
+
+    @staticmethod
+    def _matches(checkpoint_tuple: CheckpointTuple, filter: Optional[dict]) -> bool:
+        # Metadata is stored serialized, so filters are applied here
+        return not filter or all(checkpoint_tuple.metadata.get(k) == v for k, v in filter.items())
+
+    def _put_op(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata):
+        """(filter, update, returned config) for storing a checkpoint."""
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(metadata)
+        key = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}
+        update = {"$set": {
+            "parent_checkpoint_id": configurable.get("checkpoint_id"),
+            "type": type_,
+            "checkpoint": serialized,
+            "metadata_type": metadata_type,
+            "metadata": serialized_metadata,
+            "created_at": datetime.now(timezone.utc),
+        }}
+        return key, update, {"configurable": dict(key)}
+
+    def _write_ops(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]],
+                   task_id: str, task_path: str) -> list:
+        configurable = config["configurable"]
+        key = {
+            "thread_id": configurable["thread_id"],
+            "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+            "checkpoint_id": configurable["checkpoint_id"],
+            "task_id": task_id,
+        }
+        ops = []
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            type_, serialized = self.serde.dumps_typed(value)
+            doc = {"channel": channel, "type": type_, "value": serialized, "task_path": task_path,
+                   "created_at": datetime.now(timezone.utc)}
+            # Special writes (errors, interrupts) are overwritten; regular writes are kept once
+            update = {"$set": doc} if write_idx < 0 else {"$setOnInsert": doc}
+            ops.append(UpdateOne({**key, "idx": write_idx}, update, upsert=True))
+        return ops
+
+    # Async API (Motor)
+
+    async def _load_tuple(self, doc: dict) -> CheckpointTuple:
+        pending = await self.writes.find(self._writes_query(doc)).sort(WRITES_ORDER).to_list(None)
+        return self._to_tuple(doc, pending)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        doc = await self.checkpoints.find_one(self._get_query(config), sort=[("checkpoint_id", DESCENDING)])
+        return await self._load_tuple(doc) if doc else None
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        returned = 0
+        async for doc in self.checkpoints.find(self._list_query(config, before)).sort("checkpoint_id", DESCENDING):
+            if limit is not None and returned >= limit:
+                break
+            checkpoint_tuple = await self._load_tuple(doc)
+            if not self._matches(checkpoint_tuple, filter):
+                continue
+            returned += 1
+            yield checkpoint_tuple
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint,
+                   metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        key, update, next_config = self._put_op(config, checkpoint, metadata)
+        await self.checkpoints.update_one(key, update, upsert=True)
+        return next_config
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]],
+                          task_id: str, task_path: str = "") -> None:
+        ops = self._write_ops(config, writes, task_id, task_path)
+        if ops:
+            await self.writes.bulk_write(ops, ordered=False)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.checkpoints.delete_many({"thread_id": thread_id})
+        await self.writes.delete_many({"thread_id": thread_id})
+
+    # Sync API (PyMongo)
+
+    def _load_tuple_sync(self, doc: dict) -> CheckpointTuple:
+        pending = list(self.sync_db[WRITES_COLLECTION].find(self._writes_query(doc)).sort(WRITES_ORDER))
+        return self._to_tuple(doc, pending)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        doc = self.sync_db[CHECKPOINTS_COLLECTION].find_one(self._get_query(config),
+                                                             sort=[("checkpoint_id", DESCENDING)])
+        return self._load_tuple_sync(doc) if doc else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        returned = 0
+        cursor = self.sync_db[CHECKPOINTS_COLLECTION].find(self._list_query(config, before))
+        for doc in cursor.sort("checkpoint_id", DESCENDING):
+            if limit is not None and returned >= limit:
+                break
+            checkpoint_tuple = self._load_tuple_sync(doc)
+            if not self._matches(checkpoint_tuple, filter):
+                continue
+            returned += 1
+            yield checkpoint_tuple
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint,
+            metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        key, update, next_config = self._put_op(config, checkpoint, metadata)
+        self.sync_db[CHECKPOINTS_COLLECTION].update_one(key, update, upsert=True)
+        return next_config
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]],
+                   task_id: str, task_path: str = "") -> None:
+        ops = self._write_ops(config, writes, task_id, task_path)
+        if ops:
+            self.sync_db[WRITES_COLLECTION].bulk_write(ops, ordered=False)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.sync_db[CHECKPOINTS_COLLECTION].delete_many({"thread_id": thread_id})
+        self.sync_db[WRITES_COLLECTION].delete_many({"thread_id": thread_id})
+
+
+def create_checkpointer(kind: str = None, db=None) -> Optional[BaseCheckpointSaver]:
+    """Build the checkpointer selected by COPILOT_CHECKPOINTER."""
+    kind = kind or settings.COPILOT_CHECKPOINTER
+    if kind not in CHECKPOINTERS:
+        raise ValueError(f"COPILOT_CHECKPOINTER must be one of {CHECKPOINTERS}, got {kind!r}")
+    if kind == "none":
+        return None
+    if kind == "memory":
+        return MemorySaver()
+    if db is None:
+        from db import get_db
+        db = get_db()
+    return MongoCheckpointSaver(db)
@@ -5,7 +5,6 @@ from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.tools import tool
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage
-from motor.motor_asyncio import AsyncIOMotorClient
 import json
 import os
 import sys
@@ -13,6 +12,7 @@ import asyncio
 
 sys.path.append(os.path.dirname(__file__))
 from config import get_settings
+from db import get_sync_db
 from model_utils import generate_with_fallback
 
 settings = get_settings()
@@ -27,24 +27,6 @@ os.environ["LANGSMITH_PROJECT"] = settings.LANGSMITH_PROJECT
 google_api_key = settings.GOOGLE_API_KEY or settings.GOOGLE_GEMINI_API_KEY
 os.environ["GOOGLE_API_KEY"] = google_api_key
 
-# Shared MongoDB client for tools
-_motor_client = AsyncIOMotorClient(settings.MONGO_URL)
-_db = _motor_client[settings.DB_NAME]
-
-
-def _run_async(coro):
-    """Bridge async DB calls into sync LangChain tools."""
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                future = pool.submit(asyncio.run, coro)
-                return future.result(timeout=10)
-        else:
-            return loop.run_until_complete(coro)
-    except Exception as e:
-        return None
 
 @tool
 def analyze_symptom_severity(symptoms: str, patient_age: int = None) -> dict:
@@ -112,7 +94,7 @@ def check_doctor_availability(specialty: str, urgency: str) -> dict:
     Check which doctors are currently ONLINE in the database for the given specialty.
     Queries MongoDB doctors collection in real time. Returns available doctors with details.
     """
-    async def _query():
+    def _query():
         specialty_lower = specialty.lower()
         keyword_map = {
             "cardiology":                       ["cardiology", "cardiologist", "heart", "cardiac"],
@@ -154,7 +136,8 @@ def check_doctor_availability(specialty: str, urgency: str) -> dict:
         if not keywords:
             keywords.add(specialty_lower)
         
-        all_doctors = await _db.doctors.find({}, {"_id": 0}).to_list(100)
+        # Sync tools run in worker threads, so they use the shared PyMongo pool
+        all_doctors = list(get_sync_db().doctors.find({}, {"_id": 0}).limit(100))
         matched = []
         for doc in all_doctors:
             if not doc.get("availability", {}).get("is_online", False):
@@ -170,7 +153,10 @@ def check_doctor_availability(specialty: str, urgency: str) -> dict:
                 })
         return matched
     
-    doctors = _run_async(_query()) or []
+    try:
+        doctors = _query()
+    except Exception:
+        doctors = []
     return {
         "specialty": specialty,
         "urgency": urgency,
@@ -0,0 +1,230 @@
+"""
+Batched, resumable migration runner for AyuMitraAI.
+
+Migrations are applied in the order of MIGRATIONS and recorded in the
+`migrations` collection. Each migration is a list of steps. A step walks one
+collection in _id order with a range query, so it never holds a long-lived
+cursor, and writes each batch with one unordered bulk_write. After every batch
+the last _id is checkpointed, so an interrupted run resumes where it stopped.
+
+Throttling protects the live cluster: the runner sleeps at least
+--throttle-ms between batches and keeps its write duty cycle at or below
+--max-duty-cycle.
+
+Run:
+    uv run python migrations.py                    # apply all pending migrations
+    uv run python migrations.py --list             # show status
+    uv run python migrations.py 0004_backfill_specialty_code --batch-size 500
+    uv run python migrations.py --dry-run
+"""
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from pymongo import UpdateOne
+
+from db import close_clients, get_db
+from models import specialty_code
+
+MIGRATIONS_COLLECTION = "migrations"
+
+
+@dataclass
+class Step:
+    collection: str
+    query: dict
+    # Returns the update document for one source document, or None to skip it
+    build_update: Callable[[dict], Optional[dict]]
+    projection: Optional[dict] = None
+
+
+@dataclass
+class Migration:
+    name: str
+    description: str
+    steps: List[Step] = field(default_factory=list)
+
+
+def _iso_to_date(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _timestamp_step(collection: str, field_name: str) -> Step:
+    def build_update(doc):
+        try:
+            return {"$set": {field_name: _iso_to_date(doc[field_name])}}
+        except ValueError:
+            print(f"    Skipped unparseable {collection}.{field_name} on {doc['_id']}: {doc[field_name]!r}")
+            return None
+    return Step(collection, {field_name: {"$type": "string"}}, build_update, {field_name: 1})
+
+
+MIGRATIONS = [
+    Migration(
+        "0001_password_hash_to_password",
+        "Rename users.password_hash to users.password",
+        [Step(
+            "users",
+            {"password_hash": {"$exists": True}},
+            lambda doc: {"$set": {"password": doc["password_hash"]}, "$unset": {"password_hash": ""}},
+            {"password_hash": 1},
+        )],
+    ),
+    Migration(
+        "0002_iso_timestamps_to_dates",
+        "Store lifecycle timestamps as BSON dates so TTL indexes can act on them",
+        [
+            _timestamp_step("doctor_notifications", "created_at"),
+            _timestamp_step("web_doctor_connections", "created_at"),
+            _timestamp_step("patient_requests", "requested_at"),
+        ],
+    ),
+    Migration(
+        "0003_flag_anonymous_requests",
+        "Flag temp_ patient requests so the anonymous-request TTL applies",
+        [Step(
+            "patient_requests",
+            {"patient_id": {"$regex": "^temp_"}, "is_anonymous": {"$exists": False}},
+            lambda doc: {"$set": {"is_anonymous": True}},
+            {"_id": 1},
+        )],
+    ),
+    Migration(
+        "0004_backfill_specialty_code",
+        "Add the normalized specialty_code to doctors",
+        [Step(
+            "doctors",
+            {"specialty_code": {"$exists": False}},
+            lambda doc: {"$set": {"specialty_code": specialty_code(doc.get("specialization") or "")}},
+            {"specialization": 1},
+        )],
+    ),
+]
+
+
+async def run_step(db, migration: Migration, index: int, step: Step, batch_size: int,
+                   throttle_ms: int, max_duty_cycle: float, dry_run: bool) -> int:
+    key = f"{index}_{step.collection}"
+    record = await db[MIGRATIONS_COLLECTION].find_one({"_id": migration.name}) or {}
+    checkpoint = record.get("checkpoints", {}).get(key, {})
+    if checkpoint.get("done"):
+        return checkpoint.get("processed", 0)
+
+    last_id = checkpoint.get("last_id")
+    processed = checkpoint.get("processed", 0)
+    scanned = 0
+
+    while True:
+        query = step.query if last_id is None else {"$and": [step.query, {"_id": {"$gt": last_id}}]}
+        started = time.perf_counter()
+        batch = await db[step.collection].find(query, step.projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        ops = []
+        for doc in batch:
+            update = step.build_update(doc)
+            if update:
+                ops.append(UpdateOne({"_id": doc["_id"]}, update))
+        if ops and not dry_run:
+            await db[step.collection].bulk_write(ops, ordered=False)
+
+        last_id = batch[-1]["_id"]
+        processed += len(ops)
+        scanned += len(batch)
+        if not dry_run:
+            await db[MIGRATIONS_COLLECTION].update_one(
+                {"_id": migration.name},
+                {"$set": {f"checkpoints.{key}": {"last_id": last_id, "processed": processed, "done": False}}},
+                upsert=True,
+            )
+        print(f"    {step.collection}: {processed:,} updated ({scanned:,} scanned this run)", end="\r")
+
+        elapsed = time.perf_counter() - started
+        pause = max(throttle_ms / 1000, elapsed * (1 / max_duty_cycle - 1))
+        await asyncio.sleep(pause)
+
+    if not dry_run:
+        await db[MIGRATIONS_COLLECTION].update_one(
+            {"_id": migration.name},
+            {"$set": {f"checkpoints.{key}": {"last_id": last_id, "processed": processed, "done": True}}},
+            upsert=True,
+        )
+    print(f"    {step.collection}: {processed:,} updated{' (dry run)' if dry_run else ''}          ")
+    return processed
+
+
+async def run_migrations(names: List[str] = None, batch_size: int = 1000, throttle_ms: int = 20,
+                         max_duty_cycle: float = 0.5, dry_run: bool = False):
+    db = get_db()
+    known = {m.name for m in MIGRATIONS}
+    unknown = set(names or []) - known
+    if unknown:
+        raise SystemExit(f"Unknown migrations: {', '.join(sorted(unknown))}")
+
+    for migration in MIGRATIONS:
+        if names and migration.name not in names:
+            continue
+        record = await db[MIGRATIONS_COLLECTION].find_one({"_id": migration.name}) or {}
+        if record.get("completed_at"):
+            print(f"  {migration.name}: already applied")
+            continue
+
+        print(f"  {migration.name}: {migration.description}")
+        if not dry_run:
+            await db[MIGRATIONS_COLLECTION].update_one(
+                {"_id": migration.name},
+                {"$setOnInsert": {"started_at": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+        total = 0
+        for index, step in enumerate(migration.steps):
+            total += await run_step(db, migration, index, step, batch_size, throttle_ms, max_duty_cycle, dry_run)
+        if not dry_run:
+            await db[MIGRATIONS_COLLECTION].update_one(
+                {"_id": migration.name},
+                {"$set": {"completed_at": datetime.now(timezone.utc), "processed": total}},
+            )
+    close_clients()
+
+
+async def list_migrations():
+    db = get_db()
+    records = {r["_id"]: r async for r in db[MIGRATIONS_COLLECTION].find()}
+    for migration in MIGRATIONS:
+        record = records.get(migration.name, {})
+        if record.get("completed_at"):
+            status = f"applied {record['completed_at']:%Y-%m-%d %H:%M} ({record.get('processed', 0):,} docs)"
+        elif record:
+            status = "in progress"
+        else:
+            status = "pending"
+        print(f"  {migration.name:<36} {status}")
+    close_clients()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Apply AyuMitraAI data migrations.")
+    parser.add_argument("names", nargs="*", help="Migrations to run (default: all pending)")
+    parser.add_argument("--list", action="store_true", help="Show migration status and exit")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--throttle-ms", type=int, default=20, help="Minimum pause between batches")
+    parser.add_argument("--max-duty-cycle", type=float, default=0.5,
+                        help="Fraction of wall time spent writing (0-1]; lower is gentler on the cluster")
+    parser.add_argument("--dry-run", action="store_true", help="Scan and count without writing")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.list:
+        asyncio.run(list_migrations())
+    else:
+        asyncio.run(run_migrations(args.names, args.batch_size, args.throttle_ms,
+                                   min(max(args.max_duty_cycle, 0.01), 1.0), args.dry_run))
@@ -3,8 +3,12 @@ Model utilities for AyuMitraAI.
 Provides a fallback chain for Gemini model calls to handle quota (503) errors.
 """
 
-import asyncio
 import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(__file__))
+from request_context import DeadlineExceeded, check_cancelled, run_with_deadline
 
 logger = logging.getLogger("ayumitra.model_utils")
 
@@ -19,20 +23,28 @@ GEMINI_FALLBACK_CHAIN = [
 async def generate_with_fallback(client, contents: str, **kwargs) -> str:
     """
     Try generating content with each model in GEMINI_FALLBACK_CHAIN until one succeeds.
-    Raises the last exception if all models fail.
+    Raises the last exception if all models fail, or RunCancelled if the current
+    run is cancelled before the next model is tried.
+    Uses the client's native async API so cancelling the awaiting task aborts
+    the HTTP call instead of leaving it running in a worker thread.
+    Each call is bounded by the current deadline; DeadlineExceeded is raised
+    without trying the remaining models, since the budget is already spent.
     """
     last_exc = None
     for model in GEMINI_FALLBACK_CHAIN:
+        check_cancelled()
         try:
-            response = await asyncio.to_thread(
-                client.models.generate_content,
+            response = await run_with_deadline(client.aio.models.generate_content(
                 model=model,
                 contents=contents,
                 **kwargs,
-            )
+            ))
             if model != GEMINI_FALLBACK_CHAIN[0]:
                 logger.info("Used fallback model %s (primary unavailable)", model)
             return response.text
+        except DeadlineExceeded:
+            logger.warning("Model %s did not answer within the request deadline", model)
+            raise
         except Exception as e:
             err_str = str(e)
             # Only continue to fallback on quota/overload/rate-limit errors
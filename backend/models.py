@@ -3,6 +3,10 @@ from pydantic import BaseModel, Field, EmailStr, ConfigDict, field_validator
 from typing import List, Optional, Literal
 from datetime import datetime, timezone
 
+def specialty_code(specialization: str) -> str:
+    """Normalized, index-friendly key for a specialization, e.g. "Otolaryngology (ENT)" -> "otolaryngology_ent"."""
+    return re.sub(r"[^a-z0-9]+", "_", specialization.lower()).strip("_")
+
 class UserCreate(BaseModel):
     email: EmailStr
     password: str = Field(min_length=8)
@@ -0,0 +1,202 @@
+"""
+Push notification bus for AyuMitraAI.
+
+Handlers publish small events to topics and SSE endpoints subscribe to them,
+so dashboards learn about new work as it happens instead of polling Mongo.
+
+Topics:
+- doctor:{doctor_id}    new consultation requests and status changes for a doctor
+- request:{request_id}  status changes for the patient waiting on a request
+
+Backends (NOTIFICATION_BUS_BACKEND):
+- "memory": in-process fan-out only; correct when the API runs as one worker
+- "mongo":  events are also appended to the `notification_bus` capped
+            collection and every worker tails it, so a subscriber connected
+            to worker A sees events published on worker B
+
+Each subscriber owns a bounded queue. A subscriber that falls behind is sent a
+single "resync" event and should reload its state over the regular REST API.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, Set
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+sys.path.append(os.path.dirname(__file__))
+from config import get_settings
+
+logger = logging.getLogger("ayumitra.bus")
+settings = get_settings()
+
+BUS_BACKENDS = ("memory", "mongo")
+BUS_COLLECTION = "notification_bus"
+
+RESYNC_EVENT = {"event": "resync"}
+
+
+def doctor_topic(doctor_id: str) -> str:
+    return f"doctor:{doctor_id}"
+
+
+def request_topic(request_id: str) -> str:
+    return f"request:{request_id}"
+
+
+class Subscription:
+    """A bounded per-connection event queue."""
+
+    def __init__(self, topic: str, max_size: int):
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.lagged = False
+
+    def offer(self, event: dict) -> bool:
+        """Queue an event without blocking the publisher. Returns False if dropped."""
+        if self.lagged:
+            return False
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            # Make room for one resync marker; the client reloads on receipt
+            self.lagged = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_EVENT)
+            return False
+
+    async def get(self, timeout: float = None) -> dict:
+        """Wait for the next event; raises asyncio.TimeoutError after `timeout` seconds."""
+        event = await asyncio.wait_for(self.queue.get(), timeout)
+        if event is RESYNC_EVENT:
+            self.lagged = False
+        return event
+
+
+class NotificationBus:
+    """Topic-based pub/sub with an optional Mongo capped-collection relay."""
+
+    def __init__(self, db=None, backend: str = None, subscriber_queue_size: int = None,
+                 capped_size_mb: int = None):
+        backend = backend or settings.NOTIFICATION_BUS_BACKEND
+        if backend not in BUS_BACKENDS:
+            raise ValueError(f"NOTIFICATION_BUS_BACKEND must be one of {BUS_BACKENDS}, got {backend!r}")
+        if backend == "mongo" and db is None:
+            raise ValueError("The mongo notification bus backend needs a database handle")
+        self.db = db
+        self.backend = backend
+        self.subscriber_queue_size = subscriber_queue_size or settings.NOTIFICATION_SUBSCRIBER_QUEUE_SIZE
+        self.capped_size = (capped_size_mb or settings.NOTIFICATION_BUS_CAPPED_SIZE_MB) * 1024 * 1024
+        # Events relayed through Mongo carry the publishing worker's id so the
+        # tailer does not deliver them twice locally
+        self.origin = uuid.uuid4().hex
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._tailer = None
+        self._metrics = {"published": 0, "delivered": 0, "dropped": 0, "relay_errors": 0}
+
+    async def start(self):
+        if self.backend == "mongo" and self._tailer is None:
+            await self._ensure_capped_collection()
+            self._tailer = asyncio.create_task(self._tail())
+            logger.info("Notification bus relaying through %s", BUS_COLLECTION)
+
+    async def stop(self):
+        if self._tailer:
+            self._tailer.cancel()
+            self._tailer = None
+
+    @asynccontextmanager
+    async def subscribe(self, topic: str):
+        subscription = Subscription(topic, self.subscriber_queue_size)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    async def publish(self, topic: str, event: dict):
+        """Deliver to local subscribers now and, on the mongo backend, to other workers."""
+        self._metrics["published"] += 1
+        self._deliver(topic, event)
+        if self.backend == "mongo":
+            try:
+                await self.db[BUS_COLLECTION].insert_one({
+                    "topic": topic,
+                    "event": event,
+                    "origin": self.origin,
+                    "published_at": datetime.now(timezone.utc),
+                })
+            except Exception as exc:
+                self._metrics["relay_errors"] += 1
+                logger.error("Notification relay failed for %s: %s", topic, exc)
+
+    async def publish_many(self, events):
+        """Publish (topic, event) pairs."""
+        for topic, event in events:
+            await self.publish(topic, event)
+
+    def stats(self) -> dict:
+        return {
+            **self._metrics,
+            "backend": self.backend,
+            "topics": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+        }
+
+    def _deliver(self, topic: str, event: dict):
+        for subscription in list(self._subscribers.get(topic, ())):
+            if subscription.offer(event):
+                self._metrics["delivered"] += 1
+            else:
+                self._metrics["dropped"] += 1
+
+    async def _ensure_capped_collection(self):
+        try:
+            await self.db.create_collection(BUS_COLLECTION, capped=True, size=self.capped_size)
+        except CollectionInvalid:
+            pass
+        # A tailable cursor on an empty capped collection dies immediately
+        if await self.db[BUS_COLLECTION].estimated_document_count() == 0:
+            await self.db[BUS_COLLECTION].insert_one({"topic": None, "origin": None})
+
+    async def _tail(self):
+        collection = self.db[BUS_COLLECTION]
+        last = await collection.find_one({}, sort=[("$natural", -1)])
+        last_id = last["_id"] if last else None
+        while True:
+            try:
+                # Resume by position in $natural (insertion) order: ObjectIds from
+                # workers with skewed clocks are not increasing, so an _id filter
+                # would drop events. Skip up to the last event seen; if it has
+                # already been evicted from the capped collection, all that remains is new.
+                skipping = (last_id is not None
+                            and await collection.find_one({"_id": last_id}, {"_id": 1}) is not None)
+                cursor = collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for doc in cursor:
+                        if skipping:
+                            skipping = doc["_id"] != last_id
+                            continue
+                        last_id = doc["_id"]
+                        if doc.get("topic") and doc.get("origin") != self.origin:
+                            self._deliver(doc["topic"], doc["event"])
+                    # Caught up; anything after this point is new even if last_id was evicted meanwhile
+                    skipping = False
+                    await asyncio.sleep(0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self._metrics["relay_errors"] += 1
+                logger.error("Notification bus tailer failed, retrying: %s", exc)
+            await asyncio.sleep(1)
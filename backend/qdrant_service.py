@@ -5,16 +5,23 @@ Stores and retrieves prescription embeddings for RAG-based context in future ses
 Collection: ayumitra_prescriptions
 Embedding: Google Gemini text-embedding-004 (768-dim) via the genai client
 Fallback: If QDRANT_URL is not configured, all operations silently skip.
+
+Vector I/O goes through one AsyncQdrantClient (pooled HTTP, or gRPC with
+QDRANT_PREFER_GRPC) and the async genai client, so upserts, searches and
+embeddings never block the event loop. init_qdrant() runs at startup.
+Embeddings are cached by content hash, model and dimension (embedding_cache.py).
 """
 
 import logging
 import os
 import sys
 import asyncio
+import time
 from typing import List, Optional, Dict, Any
 
 sys.path.append(os.path.dirname(__file__))
 from config import get_settings
+from embedding_cache import embedding_cache
 
 logger = logging.getLogger("ayumitra.qdrant")
 settings = get_settings()
@@ -25,54 +32,89 @@ EMBEDDING_DIM = 3072
 
 _qdrant_client = None
 _genai_client = None
+_init_lock = asyncio.Lock()
+_init_failed_at: Optional[float] = None
 
 
-def _get_clients():
-    global _qdrant_client, _genai_client
+async def init_qdrant():
+    """
+    Create the shared AsyncQdrantClient and embedding client and ensure the
+    collection exists. Called once at startup; the lock keeps concurrent first
+    requests from racing to create clients. After a failure, initialization
+    is retried at most every QDRANT_INIT_RETRY_SECONDS so a down Qdrant does
+    not add its timeout to every request.
+    """
+    global _qdrant_client, _genai_client, _init_failed_at
     if not settings.QDRANT_URL:
-        return None, None
-    if _qdrant_client is None:
+        return
+    async with _init_lock:
+        if _qdrant_client is not None:
+            return
+        if _init_failed_at is not None and time.monotonic() - _init_failed_at < settings.QDRANT_INIT_RETRY_SECONDS:
+            return
+        client = None
         try:
-            from qdrant_client import QdrantClient
+            from qdrant_client import AsyncQdrantClient
             from qdrant_client.models import Distance, VectorParams
             from google import genai
 
-            _qdrant_client = QdrantClient(
+            client = AsyncQdrantClient(
                 url=settings.QDRANT_URL,
                 api_key=settings.QDRANT_API_KEY or None,
+                prefer_grpc=settings.QDRANT_PREFER_GRPC,
+                timeout=settings.QDRANT_TIMEOUT_SECONDS,
+                pool_size=settings.QDRANT_POOL_SIZE,
             )
-            _genai_client = genai.Client()
-
-            # Ensure collection exists
-            existing = [c.name for c in _qdrant_client.get_collections().collections]
-            if COLLECTION_NAME not in existing:
-                _qdrant_client.create_collection(
+            if not await client.collection_exists(COLLECTION_NAME):
+                await client.create_collection(
                     collection_name=COLLECTION_NAME,
                     vectors_config=VectorParams(size=EMBEDDING_DIM, distance=Distance.COSINE),
                 )
                 logger.info("Created Qdrant collection: %s", COLLECTION_NAME)
+            _genai_client = genai.Client()
+            _qdrant_client = client
+            _init_failed_at = None
         except Exception as e:
             logger.warning("Qdrant init failed: %s", e)
-            _qdrant_client = None
-            _genai_client = None
+            _init_failed_at = time.monotonic()
+            if client is not None:
+                await client.close()
+
+
+async def close_qdrant():
+    global _qdrant_client
+    if _qdrant_client is not None:
+        await _qdrant_client.close()
+        _qdrant_client = None
+
 
+async def _get_clients():
+    if not settings.QDRANT_URL:
+        return None, None
+    if _qdrant_client is None:
+        await init_qdrant()
     return _qdrant_client, _genai_client
 
 
-def _embed(text: str) -> Optional[List[float]]:
-    """Embed text using Gemini text-embedding-004."""
-    _, genai_client = _get_clients()
+async def _embed(text: str) -> Optional[List[float]]:
+    """Embed text with the Gemini embedding model, through the embedding cache (see embedding_cache.py)."""
+    _, genai_client = await _get_clients()
     if genai_client is None:
         return None
+    cached = await embedding_cache.get(EMBEDDING_MODEL, EMBEDDING_DIM, text)
+    if cached is not None:
+        return cached
     try:
-        result = genai_client.models.embed_content(
+        result = await genai_client.aio.models.embed_content(
             model=EMBEDDING_MODEL,
             contents=text,
         )
-        return result.embeddings[0].values
+        vector = result.embeddings[0].values
     except Exception as e:
         logger.warning("Embedding failed: %s", e)
         return None
+    await embedding_cache.set(EMBEDDING_MODEL, EMBEDDING_DIM, text, vector)
+    return vector
 
 
 async def store_prescription(
@@ -89,7 +131,7 @@ async def store_prescription(
     Embed the full prescription text and store in Qdrant.
     Returns True if successfully stored, False if Qdrant not configured or failed.
     """
-    client, _ = _get_clients()
+    client, _ = await _get_clients()
     if client is None:
         logger.warning("Qdrant not configured — skipping prescription storage")
         return False
@@ -102,13 +144,13 @@ async def store_prescription(
         f"Notes: {notes}"
     )
 
-    vector = await asyncio.to_thread(_embed, full_text)
+    vector = await _embed(full_text)
     if vector is None:
         return False
 
     try:
         from qdrant_client.models import PointStruct
-        client.upsert(
+        await client.upsert(
             collection_name=COLLECTION_NAME,
             points=[
                 PointStruct(
@@ -142,11 +184,11 @@ async def search_similar_prescriptions(
     Optionally filter by patient_id so patients only see their own history.
     Returns list of prescription payloads.
     """
-    client, _ = _get_clients()
+    client, _ = await _get_clients()
     if client is None:
         return []
 
-    vector = await asyncio.to_thread(_embed, query_text)
+    vector = await _embed(query_text)
     if vector is None:
         return []
 
@@ -158,14 +200,14 @@ async def search_similar_prescriptions(
                 must=[FieldCondition(key="patient_id", match=MatchValue(value=patient_id))]
             )
 
-        results = client.search(
+        results = await client.query_points(
             collection_name=COLLECTION_NAME,
-            query_vector=vector,
+            query=vector,
             query_filter=query_filter,
             limit=top_k,
             with_payload=True,
         )
-        return [r.payload for r in results]
+        return [r.payload for r in results.points]
     except Exception as e:
         logger.error("Qdrant search failed: %s", e)
         return []
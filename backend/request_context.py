@@ -0,0 +1,148 @@
+"""
+Per-run execution context for AyuMitraAI.
+
+A CancelToken is bound to a context variable for the lifetime of a streamed
+run. asyncio tasks and asyncio.to_thread() copy the current context, so
+LangGraph nodes, Gemini calls and scraper calls started by the run all see
+the same token without it being passed through every signature.
+
+Long-running code calls check_cancelled() between units of work (before the
+next fallback model, before the next scrape) so a run whose client went away
+stops spending quota at the next checkpoint.
+
+Deadlines travel the same way. An endpoint bounds a request with
+deadline_scope() (or the stream registry binds one per run), each stage takes
+a share of what is left with stage_deadline(), and external calls are awaited
+through run_with_deadline() so they raise DeadlineExceeded instead of hanging.
+Callers already fall back on exceptions (rule-based triage, report template,
+no scraped doctors), so an expired stage degrades rather than fails.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+class RunCancelled(BaseException):
+    """
+    Raised at a checkpoint once the current run has been cancelled.
+    Like asyncio.CancelledError it is not an Exception, so the broad
+    `except Exception` fallbacks in the agents do not swallow it.
+    """
+
+
+class CancelToken:
+    """Thread-safe cancellation flag shared by a run's tasks and worker threads."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise RunCancelled(self.reason)
+
+
+_cancel_token: ContextVar[Optional[CancelToken]] = ContextVar("ayumitra_cancel_token", default=None)
+
+
+def bind_cancel_token(token: CancelToken):
+    """Bind token to the current context; returns the contextvars reset token."""
+    return _cancel_token.set(token)
+
+
+def current_cancel_token() -> Optional[CancelToken]:
+    return _cancel_token.get()
+
+
+def check_cancelled():
+    """Raise RunCancelled if the current run has been cancelled. No-op outside a run."""
+    token = _cancel_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised by run_with_deadline() when the current time budget is spent."""
+
+
+class Deadline:
+    """A time budget, optionally nested inside a parent budget it can never outlive."""
+
+    def __init__(self, seconds: float, parent: "Deadline" = None):
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+        self.parent = parent
+
+    def remaining(self) -> float:
+        left = self.expires_at - time.monotonic()
+        if self.parent is not None:
+            left = min(left, self.parent.remaining())
+        return max(left, 0.0)
+
+    def tighten(self, seconds: float):
+        """Cap the budget at `seconds` from when it was set, e.g. once a case turns out critical."""
+        self.expires_at = min(self.expires_at, self.started_at + seconds)
+
+
+_deadline: ContextVar[Optional[Deadline]] = ContextVar("ayumitra_deadline", default=None)
+
+
+def bind_deadline(deadline: Deadline):
+    """Bind deadline to the current context; returns the contextvars reset token."""
+    return _deadline.set(deadline)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Bound everything awaited in the block by `seconds`, within any enclosing deadline."""
+    token = _deadline.set(Deadline(seconds, parent=_deadline.get()))
+    try:
+        yield _deadline.get()
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def stage_deadline(share: float):
+    """Give the block `share` of the remaining budget. No-op outside a deadline."""
+    parent = _deadline.get()
+    if parent is None:
+        yield None
+        return
+    with deadline_scope(parent.remaining() * share) as deadline:
+        yield deadline
+
+
+async def run_with_deadline(awaitable):
+    """Await `awaitable` within the current deadline, raising DeadlineExceeded once it is spent."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return await awaitable
+    left = deadline.remaining()
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        elif isinstance(awaitable, asyncio.Future):
+            awaitable.cancel()
+        raise DeadlineExceeded("deadline exceeded before the call started")
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError as exc:
+        raise DeadlineExceeded(f"deadline exceeded after {left:.1f}s") from exc
@@ -0,0 +1,176 @@
+"""
+Web doctor search cache for AyuMitraAI.
+
+DoctorScraper.search_doctors results are cached per (specialty, location,
+limit), normalized so "Cardiologist"/"cardiologist " and "Bangalore"/"bengaluru "
+share an entry (place names are canonicalized through gazetteer.py). Two tiers:
+- memory: TTLCache per worker, answers repeat searches without any I/O
+- mongo:  web_doctor_search_cache collection shared by all workers and
+          surviving restarts; a TTL index removes entries past their stale window
+
+An entry is fresh for WEB_SEARCH_CACHE_TTL_SECONDS. For another
+WEB_SEARCH_CACHE_STALE_SECONDS it is still served (stale-while-revalidate)
+while one background task per key refreshes it from Firecrawl. Empty results
+are never cached, because search_doctors returns [] on scraper errors.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.append(os.path.dirname(__file__))
+from cache import TTLCache, cache_key
+from config import get_settings
+from data_lifecycle import ensure_ttl_index
+from gazetteer import canonical_location
+from models import specialty_code
+
+logger = logging.getLogger("ayumitra.scrape_cache")
+settings = get_settings()
+
+CACHE_COLLECTION = "web_doctor_search_cache"
+
+
+def normalize_location(location: str) -> str:
+    return " ".join(canonical_location(location).lower().split())
+
+
+def search_key(specialty: str, location: str, limit: int) -> str:
+    return cache_key(specialty_code(specialty), normalize_location(location), limit)
+
+
+class ScrapeCache:
+    """Memory + Mongo cache of web doctor searches with background refresh of stale entries."""
+
+    def __init__(self, db=None):
+        self.ttl = settings.WEB_SEARCH_CACHE_TTL_SECONDS
+        self.stale = settings.WEB_SEARCH_CACHE_STALE_SECONDS
+        self.memory = TTLCache(settings.WEB_SEARCH_CACHE_MEMORY_ENTRIES, self.ttl + self.stale,
+                               name="web_doctor_search")
+        self._db = db
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.counters = {"memory_hits": 0, "mongo_hits": 0, "stale_hits": 0, "misses": 0,
+                         "refreshes": 0, "refresh_failures": 0, "mongo_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @property
+    def collection(self):
+        if not settings.WEB_SEARCH_CACHE_PERSIST:
+            return None
+        if self._db is None:
+            from db import get_db
+            self._db = get_db()
+        return self._db[CACHE_COLLECTION]
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            retention = timedelta(seconds=self.ttl + self.stale)
+            await ensure_ttl_index(self.collection, "fetched_at", retention, "fetched_at_ttl")
+
+    async def get_or_fetch(self, specialty: str, location: str, limit: int,
+                           fetch: Callable[[], Awaitable[List[dict]]]) -> List[dict]:
+        """Cached doctors for the search, calling fetch() on a miss and refreshing stale hits."""
+        if not self.enabled:
+            return await fetch()
+        key = search_key(specialty, location, limit)
+        entry = await self._lookup(key)
+        if entry is not None:
+            age = time.time() - entry["fetched_at"]
+            if age >= self.ttl:
+                self.counters["stale_hits"] += 1
+                self._schedule_refresh(key, specialty, location, limit, fetch)
+            return entry["doctors"]
+
+        self.counters["misses"] += 1
+        doctors = await fetch()
+        await self._store(key, specialty, location, limit, doctors)
+        return doctors
+
+    async def _lookup(self, key: str):
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.counters["memory_hits"] += 1
+            return entry
+        if self.collection is None:
+            return None
+        try:
+            doc = await self.collection.find_one({"_id": key}, {"doctors": 1, "fetched_at": 1})
+        except Exception as exc:
+            self.counters["mongo_errors"] += 1
+            logger.warning("Web search cache read failed: %s", exc)
+            return None
+        if doc is None:
+            return None
+        fetched_at = doc["fetched_at"].replace(tzinfo=timezone.utc).timestamp()
+        remaining = self.ttl + self.stale - (time.time() - fetched_at)
+        if remaining <= 0:
+            return None
+        self.counters["mongo_hits"] += 1
+        entry = {"doctors": doc["doctors"], "fetched_at": fetched_at}
+        self.memory.set(key, entry, ttl_seconds=remaining)
+        return entry
+
+    async def _store(self, key: str, specialty: str, location: str, limit: int, doctors: List[dict]):
+        if not doctors:
+            return
+        now = time.time()
+        self.memory.set(key, {"doctors": doctors, "fetched_at": now})
+        if self.collection is None:
+            return
+        try:
+            await self.collection.replace_one(
+                {"_id": key},
+                {"specialty": specialty, "location": location, "limit": limit,
+                 "doctors": [dict(d) for d in doctors],
+                 "fetched_at": datetime.fromtimestamp(now, timezone.utc)},
+                upsert=True,
+            )
+        except Exception as exc:
+            self.counters["mongo_errors"] += 1
+            logger.warning("Web search cache write failed: %s", exc)
+
+    def _schedule_refresh(self, key: str, specialty: str, location: str, limit: int,
+                          fetch: Callable[[], Awaitable[List[dict]]]):
+        if key in self._refreshing:
+            return
+        # A fresh context: the refresh must not inherit the caller's cancel token or deadline
+        task = asyncio.get_running_loop().create_task(
+            self._refresh(key, specialty, location, limit, fetch), context=contextvars.Context()
+        )
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(self, key: str, specialty: str, location: str, limit: int,
+                       fetch: Callable[[], Awaitable[List[dict]]]):
+        self.counters["refreshes"] += 1
+        try:
+            doctors = await fetch()
+        except Exception as exc:
+            self.counters["refresh_failures"] += 1
+            logger.warning("Refreshing web search %s in %s failed: %s", specialty, location, exc)
+            return
+        if not doctors:
+            self.counters["refresh_failures"] += 1
+            return
+        await self._store(key, specialty, location, limit, doctors)
+
+    def stats(self) -> dict:
+        hits = self.counters["memory_hits"] + self.counters["mongo_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "refreshing": len(self._refreshing),
+        }
+
+
+scrape_cache = ScrapeCache()
@@ -7,14 +7,9 @@ import asyncio
 import bcrypt
 import uuid
 from datetime import datetime, timezone
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
-
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
-DB_NAME   = os.getenv("DB_NAME", "ayumitra_db")
+from db import close_clients, get_db
+from models import specialty_code
 
 # ── Specialty → demo doctor data ─────────────────────────────────────────────
 DEMO_DOCTORS = [
@@ -61,8 +56,7 @@ DEMO_DOCTORS = [
 PASSWORD = "AyuMitra123"
 
 async def seed():
-    client = AsyncIOMotorClient(MONGO_URL)
-    db = client[DB_NAME]
+    db = get_db()
 
     hashed_pw = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt()).decode()
     now = datetime.now(timezone.utc).isoformat()
@@ -102,6 +96,7 @@ async def seed():
             "email": email,
             "phone": phone,
             "specialization": specialization,
+            "specialty_code": specialty_code(specialization),
             "experience_years": exp,
             "facility_name": facility,
             "facility_type": "hospital" if "Hospital" in facility or "Institute" in facility else "clinic",
@@ -120,7 +115,7 @@ async def seed():
         created += 1
 
     print(f"\nDone. Created: {created} | Skipped (already exist): {skipped}")
-    client.close()
+    close_clients()
 
 
 if __name__ == "__main__":
@@ -1,13 +1,10 @@
-from fastapi import FastAPI, APIRouter, HTTPException, status, Depends, Request
+from fastapi import FastAPI, APIRouter, Body, HTTPException, status, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 from langsmith import traceable
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
-import json
 import logging
 import os
 import sys
@@ -23,16 +20,39 @@ logger = logging.getLogger("ayumitra")
 
 sys.path.append(os.path.dirname(__file__))
 from config import get_settings
+from db import READ_SECONDARY_PREFERRED, LazyDatabase, close_clients, pool_stats
 from models import *
-from auth import hash_password, verify_password, create_access_token, get_current_user
+from auth import hash_password, verify_password, create_access_token, get_current_user, get_optional_user
 from gemini_service import GeminiSymptomAnalyzer
 from triage_graph import HealthCopilotGraph
-from qdrant_service import store_prescription, search_similar_prescriptions
+from graph_checkpoint import MongoCheckpointSaver, create_checkpointer
+from scrape_cache import scrape_cache
+from web_doctor_index import run_ingestion_loop, web_doctor_index
+from doctor_extraction import shutdown_pool as shutdown_extraction_pool
+from firecrawl_client import close_firecrawl_app, firecrawl_stats
+from gazetteer import location_for_coordinates
+from embedding_cache import embedding_cache
+from qdrant_service import close_qdrant, init_qdrant, store_prescription, search_similar_prescriptions
+from data_lifecycle import (
+    ARCHIVE_COLLECTION,
+    ensure_lifecycle_indexes,
+    find_request,
+    is_anonymous_patient,
+    run_archival_loop,
+)
+from audit_writer import AuditWriter
+from notification_bus import NotificationBus, doctor_topic, request_topic
+from sse import HEARTBEAT, format_event, parse_last_event_id, resume_or_start, sse_response, stream_registry
+from request_context import DeadlineExceeded, current_deadline, deadline_scope, run_with_deadline, stage_deadline
 
 settings = get_settings()
 
-client = AsyncIOMotorClient(settings.MONGO_URL)
-db = client[settings.DB_NAME]
+# Resolved per use, so each forked worker talks through its own client
+db = LazyDatabase()
+# Dashboard and history reads tolerate replication lag
+read_db = LazyDatabase(READ_SECONDARY_PREFERRED)
+audit_writer = AuditWriter(db)
+notification_bus = NotificationBus(db)
 
 app = FastAPI(title="AyuMitraAI API", version="1.0.0")
 # Trigger reload to refresh cached settings from .env
@@ -48,10 +68,23 @@ async def create_db_indexes():
     await db.users.create_index("email", unique=True)
     await db.users.create_index("user_id")
     await db.patient_requests.create_index("request_id")
+    await db.doctors.create_index([("specialty_code", 1), ("availability.is_online", 1)])
+    await ensure_lifecycle_indexes(db)
+    await scrape_cache.ensure_indexes()
+    await web_doctor_index.ensure_indexes()
+    await embedding_cache.ensure_indexes()
+    if isinstance(health_copilot.checkpointer, MongoCheckpointSaver):
+        await health_copilot.checkpointer.ensure_indexes()
     logger.info("MongoDB indexes ensured")
+    app.state.archival_task = asyncio.create_task(run_archival_loop(db))
+    if settings.WEB_DOCTOR_INGEST_INTERVAL_HOURS > 0 and health_copilot.scraper is not None:
+        app.state.ingestion_task = asyncio.create_task(run_ingestion_loop(health_copilot.scraper))
+    await audit_writer.start()
+    await notification_bus.start()
+    await init_qdrant()
 
 gemini_analyzer = GeminiSymptomAnalyzer()
-health_copilot = HealthCopilotGraph()
+health_copilot = HealthCopilotGraph(create_checkpointer(db=db))
 
 app.add_middleware(
     CORSMiddleware,
@@ -120,34 +153,64 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 
 @api_router.post("/copilot/triage/stream")
 @limiter.limit("10/minute")
-async def copilot_triage_stream(request: Request, payload: CopilotTriageRequest):
-    """Multi-agent health copilot. Streams agent progress as Server-Sent Events."""
+async def copilot_triage_stream(request: Request, payload: CopilotTriageRequest,
+                                last_event_id: Optional[str] = Header(default=None),
+                                current_user: Optional[dict] = Depends(get_optional_user)):
+    """
+    Multi-agent health copilot. Streams agent progress as Server-Sent Events.
+    Reconnecting with Last-Event-ID replays the same run instead of starting a new one;
+    a run nobody is listening to is cancelled. Graph state is checkpointed per
+    node, so a run that is no longer buffered continues from its last completed node.
+    Only the caller who started a run (or any anonymous caller, for an anonymous
+    run) can resume it; anyone else gets a fresh run.
+    """
+    owner_id = current_user["sub"] if current_user else None
     initial_state = {
         "symptom_description": payload.symptom_description,
         "patient_age": payload.patient_age,
         "location": payload.location,
+        "owner_id": owner_id,
     }
-
-    async def event_stream():
+    run_id, _ = parse_last_event_id(last_event_id)
+    if run_id:
+        checkpointed = await health_copilot.get_run(run_id)
+        if checkpointed is not None and checkpointed["state"].get("owner_id") != owner_id:
+            logger.warning("Refusing to resume copilot run %s for a different caller", run_id)
+            last_event_id = None
+
+    async def copilot_events(run_id: str):
         research_enabled = bool(payload.location) and health_copilot.scraper is not None
-        yield "data: " + json.dumps({"event": "start", "research_enabled": research_enabled}) + "\n\n"
+        resumed = await health_copilot.get_run(run_id) is not None
+        yield {"event": "start", "run_id": run_id, "research_enabled": research_enabled, "resumed": resumed}
         try:
-            async for node_name, update in health_copilot.astream_events(initial_state):
-                yield "data: " + json.dumps(
-                    {"event": "agent_update", "agent": node_name, "data": update}, default=str
-                ) + "\n\n"
+            async for node_name, update in health_copilot.astream_events(initial_state, run_id):
+                yield {"event": "agent_update", "agent": node_name, "data": update}
         except Exception as exc:
             logger.error("Copilot stream failed: %s", exc)
-            yield "data: " + json.dumps(
-                {"event": "error", "message": "Copilot pipeline failed. Please try again."}
-            ) + "\n\n"
-        yield "data: " + json.dumps({"event": "end"}) + "\n\n"
-
-    return StreamingResponse(
-        event_stream(),
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
-    )
+            yield {"event": "error", "message": "Copilot pipeline failed. Please try again."}
+        yield {"event": "end"}
+
+    return resume_or_start(request, last_event_id, copilot_events,
+                           client_key=get_remote_address(request), reuse_run_id=True,
+                           deadline_seconds=settings.TRIAGE_DEADLINE_SECONDS)
+
+@api_router.get("/copilot/runs/{run_id}")
+async def get_copilot_run(run_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    Checkpointed result of a copilot run, so clients can re-fetch it without re-running the agents.
+    Only the signed-in user who started the run can read it.
+    """
+    checkpointed = await health_copilot.get_run(run_id)
+    if checkpointed is None or checkpointed["state"].get("owner_id") != current_user["sub"]:
+        raise HTTPException(status_code=404, detail="Run not found")
+    stream_run = stream_registry.get(run_id)
+    if stream_run is not None and not stream_run.done:
+        run_status = "running"
+    elif checkpointed["next"]:
+        run_status = "interrupted"
+    else:
+        run_status = "completed"
+    return {"run_id": run_id, "status": run_status, **checkpointed}
 
 @api_router.post("/connect-with-doctor")
 @traceable(name="connect_with_doctor_endpoint")
@@ -161,11 +224,12 @@ async def connect_with_doctor(request: SymptomAnalysisRequest):
         temp_patient_id = f"temp_{uuid.uuid4()}"
         patient_name = request.patient_name or "Anonymous Patient"
         
-        # Analyze symptoms to get specialty
-        analysis = await gemini_analyzer.analyze_symptoms(
-            request.symptom_description,
-            request.patient_age
-        )
+        # Analyze symptoms to get specialty (rule-based fallback once the deadline passes)
+        with deadline_scope(settings.TRIAGE_DEADLINE_SECONDS):
+            analysis = await gemini_analyzer.analyze_symptoms(
+                request.symptom_description,
+                request.patient_age
+            )
         
         urgency = UrgencyLevel(
             level=analysis["urgency_level"],
@@ -198,8 +262,8 @@ async def connect_with_doctor(request: SymptomAnalysisRequest):
             "recommended_actions": analysis.get("recommended_actions", []),
             "critical_warnings": analysis.get("critical_warnings", []),
             "key_symptoms": analysis.get("key_symptoms", []),
-            "requested_at": datetime.now(timezone.utc).isoformat(),
-
+            "requested_at": datetime.now(timezone.utc),
+            "is_anonymous": is_anonymous_patient(temp_patient_id),
             "status": "pending",
             "matched_doctors": [doc["doctor_id"] for doc in matching_doctors],
             "assigned_doctor_id": None
@@ -207,18 +271,21 @@ async def connect_with_doctor(request: SymptomAnalysisRequest):
         
         await db.patient_requests.insert_one(patient_request_doc)
         
-        # Notify matching doctors
-        for doctor in matching_doctors:
-            await db.doctor_notifications.insert_one({
+        # Notify matching doctors; written inline because the bus pushes the request right away
+        await audit_writer.write_many("doctor_notifications", [
+            {
                 "notification_id": str(uuid.uuid4()),
                 "doctor_id": doctor["doctor_id"],
                 "patient_request_id": request_id,
                 "patient_name": patient_name,
                 "symptoms": request.symptom_description,
                 "urgency_level": urgency.level,
-                "created_at": datetime.now(timezone.utc).isoformat(),
+                "created_at": datetime.now(timezone.utc),
                 "read": False
-            })
+            }
+            for doctor in matching_doctors
+        ], sync=True)
+        await publish_new_request(patient_request_doc)
         
         return {
             "request_id": request_id,
@@ -242,16 +309,11 @@ async def connect_with_doctor(request: SymptomAnalysisRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Connection failed: {str(e)}")
 
-@api_router.get("/patient/request-status/{request_id}")
-async def get_request_status(request_id: str):
-    """Get status of patient's doctor connection request - NO AUTH REQUIRED"""
-    request_doc = await db.patient_requests.find_one(
-        {"request_id": request_id},
-        {"_id": 0}
-    )
-    
+async def build_request_status(request_id: str):
+    """Patient-facing status payload for a request, or None if it does not exist."""
+    request_doc = await find_request(db, request_id, {"_id": 0})
     if not request_doc:
-        raise HTTPException(status_code=404, detail="Request not found")
+        return None
     
     assigned_doctor = None
     if request_doc.get("assigned_doctor_id"):
@@ -298,6 +360,67 @@ async def get_request_status(request_id: str):
         "bill_breakdown": request_doc.get("bill_breakdown")
     }
 
+@api_router.get("/patient/request-status/{request_id}")
+async def get_request_status(request_id: str):
+    """Get status of patient's doctor connection request - NO AUTH REQUIRED"""
+    request_status = await build_request_status(request_id)
+    if not request_status:
+        raise HTTPException(status_code=404, detail="Request not found")
+    return request_status
+
+FINAL_REQUEST_STATUSES = ("completed", "rejected")
+
+@api_router.get("/patient/request-status/{request_id}/stream")
+async def stream_request_status(request_id: str, request: Request):
+    """
+    Push version of /patient/request-status - NO AUTH REQUIRED.
+    Sends the current status, then a new status event whenever a doctor accepts,
+    rejects or completes the request. The stream closes on a final status or
+    after REQUEST_STATUS_STREAM_TIMEOUT_SECONDS; the client reconnects if it
+    still cares.
+    """
+    if not await find_request(db, request_id, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Request not found")
+
+    async def event_stream():
+        deadline = time.monotonic() + settings.REQUEST_STATUS_STREAM_TIMEOUT_SECONDS
+        async with notification_bus.subscribe(request_topic(request_id)) as subscription:
+            # Snapshot after subscribing, so a change in between is not lost
+            changed = True
+            while not await request.is_disconnected():
+                if changed:
+                    request_status = await build_request_status(request_id)
+                    if request_status is None:
+                        break
+                    yield format_event({"event": "status", **request_status})
+                    if request_status["status"] in FINAL_REQUEST_STATUSES:
+                        break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    yield format_event({"event": "timeout"})
+                    break
+                try:
+                    await subscription.get(timeout=min(settings.SSE_HEARTBEAT_SECONDS, remaining))
+                    changed = True
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                    changed = False
+
+    return sse_response(event_stream())
+
+def requested_at_key(request_doc: dict) -> datetime:
+    """Aware sort key for requested_at; ISO strings not yet migrated are parsed, anything else sorts last."""
+    value = request_doc.get("requested_at")
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            value = None
+    if not isinstance(value, datetime):
+        return datetime.min.replace(tzinfo=timezone.utc)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
 @api_router.get("/patient/history")
 async def get_patient_history(request: Request, patient_id: str = None):
     """Get patient's consultation history - with optional auth resolution"""
@@ -318,11 +441,16 @@ async def get_patient_history(request: Request, patient_id: str = None):
     
     print(f"[DEBUG] get_patient_history: pid={pid}")
     
-    # Get patient requests
-    requests = await db.patient_requests.find(
-        {"patient_id": pid},
-        {"_id": 0}
-    ).sort("requested_at", -1).limit(50).to_list(50)
+    # Get patient requests; completed consultations past the archive window live in the
+    # archive collection, and open requests can be older than archived ones, so merge by date
+    hot, archived = await asyncio.gather(*(
+        read_db[collection].find(
+            {"patient_id": pid},
+            {"_id": 0}
+        ).sort("requested_at", -1).limit(50).to_list(50)
+        for collection in ("patient_requests", ARCHIVE_COLLECTION)
+    ))
+    requests = sorted(hot + archived, key=requested_at_key, reverse=True)[:50]
     
     # Enrich with doctor info
     history = []
@@ -339,7 +467,7 @@ async def get_patient_history(request: Request, patient_id: str = None):
         
         # Get doctor info if assigned
         if req.get("assigned_doctor_id"):
-            doctor = await db.doctors.find_one(
+            doctor = await read_db.doctors.find_one(
                 {"doctor_id": req["assigned_doctor_id"]},
                 {"_id": 0, "full_name": 1, "specialization": 1}
             )
@@ -362,7 +490,8 @@ async def link_request_to_patient(request_id: str, current_user: dict = Depends(
         {"request_id": request_id},
         {"$set": {
             "patient_id": current_user["sub"],
-            "patient_name": user.get("full_name") or "Patient"
+            "patient_name": user.get("full_name") or "Patient",
+            "is_anonymous": False
         }}
     )
     
@@ -380,10 +509,11 @@ async def analyze_symptoms(request: SymptomAnalysisRequest, current_user: dict =
     request_id = str(uuid.uuid4())
     
     try:
-        analysis = await gemini_analyzer.analyze_symptoms(
-            request.symptom_description,
-            request.patient_age
-        )
+        with deadline_scope(settings.TRIAGE_DEADLINE_SECONDS):
+            analysis = await gemini_analyzer.analyze_symptoms(
+                request.symptom_description,
+                request.patient_age
+            )
         
         urgency = UrgencyLevel(
             level=analysis["urgency_level"],
@@ -429,7 +559,7 @@ async def analyze_symptoms(request: SymptomAnalysisRequest, current_user: dict =
             "processing_time_ms": (time.time() - start_time) * 1000
         }
         
-        await db.symptom_analyses.insert_one(analysis_doc)
+        await audit_writer.write("symptom_analyses", analysis_doc)
         
         return SymptomAnalysisResponse(
             request_id=request_id,
@@ -530,6 +660,25 @@ async def find_matching_doctors(specialty: str, urgency: str) -> list:
     
     return doctors[:10]
 
+def doctor_availability_summary(specialty: str, urgency: str, doctors: list) -> dict:
+    """Shape find_matching_doctors() results like the check_doctor_availability tool output."""
+    available = [
+        {
+            "name": doc.get("full_name"),
+            "specialization": doc.get("specialization"),
+            "experience_years": doc.get("experience_years"),
+            "facility": doc.get("facility_name"),
+            "is_online": True
+        }
+        for doc in doctors
+    ]
+    return {
+        "specialty": specialty,
+        "urgency": urgency,
+        "available_doctors": available,
+        "count": len(available)
+    }
+
 async def find_matching_facilities(specialty: str, urgency: str, location: dict = None) -> List[FacilityMatch]:
     facilities = []
     
@@ -684,17 +833,17 @@ async def register_hospital(hospital: HospitalRegistration, current_user: dict =
 
 @api_router.get("/clinics")
 async def get_clinics():
-    clinics = await db.clinics.find({}, {"_id": 0}).to_list(100)
+    clinics = await read_db.clinics.find({}, {"_id": 0}).to_list(100)
     return clinics
 
 @api_router.get("/hospitals")
 async def get_hospitals():
-    hospitals = await db.hospitals.find({}, {"_id": 0}).to_list(100)
+    hospitals = await read_db.hospitals.find({}, {"_id": 0}).to_list(100)
     return hospitals
 
 @api_router.get("/history")
 async def get_user_history(current_user: dict = Depends(get_current_user)):
-    history = await db.symptom_analyses.find(
+    history = await read_db.symptom_analyses.find(
         {"user_id": current_user["sub"]},
         {"_id": 0}
     ).sort("analysis_timestamp", -1).limit(20).to_list(20)
@@ -842,6 +991,7 @@ async def register_doctor(doctor: DoctorRegistration):
         "full_name": doctor.full_name,
         "email": doctor.email,
         "specialization": doctor.specialization,
+        "specialty_code": specialty_code(doctor.specialization),
         "experience_years": doctor.experience_years,
         "license_number": doctor.license_number,
         "phone": doctor.phone,
@@ -923,13 +1073,65 @@ async def get_doctor_requests(current_user: dict = Depends(get_current_user)):
         return []
         
     # Find requests where this doctor is in the matched_doctors array
-    requests = await db.patient_requests.find(
+    requests = await read_db.patient_requests.find(
         {"matched_doctors": doctor["doctor_id"]},
         {"_id": 0}
     ).sort("requested_at", -1).to_list(100)
     
     return requests
 
+@api_router.get("/doctor/notifications/stream")
+async def doctor_notification_stream(request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    Push channel for the doctor dashboard. Streams new consultation requests and
+    status changes as Server-Sent Events; a comment line is sent every
+    SSE_HEARTBEAT_SECONDS to keep proxies from closing the idle connection.
+    """
+    if current_user["role"] != "doctor":
+        raise HTTPException(status_code=403, detail="Only doctors can access this endpoint")
+
+    doctor = await db.doctors.find_one({
+        "$or": [{"user_id": current_user["sub"]}, {"doctor_id": current_user["sub"]}]
+    }, {"doctor_id": 1})
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor profile not found")
+
+    async def event_stream():
+        async with notification_bus.subscribe(doctor_topic(doctor["doctor_id"])) as subscription:
+            # Sent once subscribed: the client loads its snapshot after this, so nothing is missed
+            yield format_event({"event": "ready"})
+            while not await request.is_disconnected():
+                try:
+                    event = await subscription.get(timeout=settings.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                yield format_event(event)
+
+    return sse_response(event_stream())
+
+async def publish_new_request(request_doc: dict):
+    """Push a newly created request to every matched doctor's channel."""
+    summary = {k: v for k, v in request_doc.items() if k != "_id"}
+    await notification_bus.publish_many(
+        (doctor_topic(doctor_id), {"event": "new_request", "request": summary})
+        for doctor_id in request_doc.get("matched_doctors", [])
+    )
+
+async def publish_request_update(request_doc: dict, new_status: str, **fields):
+    """Tell every matched doctor, and the waiting patient, that a request changed status."""
+    event = {
+        "event": "request_update",
+        "request_id": request_doc["request_id"],
+        "status": new_status,
+        **fields,
+    }
+    await notification_bus.publish_many(
+        (doctor_topic(doctor_id), event)
+        for doctor_id in request_doc.get("matched_doctors", [])
+    )
+    await notification_bus.publish(request_topic(request_doc["request_id"]), event)
+
 @api_router.get("/doctor/stats", response_model=DoctorStats)
 async def get_doctor_stats(current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "doctor":
@@ -941,8 +1143,8 @@ async def get_doctor_stats(current_user: dict = Depends(get_current_user)):
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
     
-    total_requests = await db.patient_requests.count_documents({"matched_doctors": doctor["doctor_id"]})
-    pending_requests = await db.patient_requests.count_documents({"matched_doctors": doctor["doctor_id"], "status": "pending"})
+    total_requests = await read_db.patient_requests.count_documents({"matched_doctors": doctor["doctor_id"]})
+    pending_requests = await read_db.patient_requests.count_documents({"matched_doctors": doctor["doctor_id"], "status": "pending"})
     
     return DoctorStats(
         total_requests=total_requests,
@@ -974,6 +1176,7 @@ async def accept_patient_request(request_id: str, current_user: dict = Depends(g
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Request not found")
+    await publish_request_update(request_doc, "accepted", assigned_doctor_id=doctor["doctor_id"])
     
     return {
         "message": "Request accepted",
@@ -1005,6 +1208,7 @@ async def reject_patient_request(request_id: str, current_user: dict = Depends(g
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Request not found")
+    await publish_request_update(request_doc, "rejected")
         
     return {"message": "Request rejected successfully"}
 
@@ -1043,6 +1247,7 @@ async def complete_patient_request(request_id: str, body: dict = None, current_u
         {"doctor_id": doctor["doctor_id"]},
         {"$inc": {"patients_treated": 1}}
     )
+    await publish_request_update(request_doc, "completed", assigned_doctor_id=doctor["doctor_id"])
 
     # Automatically generate prescription from doctor inputs
     if bill_breakdown:
@@ -1119,10 +1324,27 @@ async def health_check():
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
+@api_router.get("/metrics")
+async def get_metrics(current_user: dict = Depends(get_current_user)):
+    """Internal runtime metrics (write-behind queue, etc.)"""
+    if current_user["role"] not in ["doctor", "clinic_admin", "hospital_admin"]:
+        raise HTTPException(status_code=403, detail="Only doctors and admins can view metrics")
+    return {
+        "audit_writer": audit_writer.stats(),
+        "notification_bus": notification_bus.stats(),
+        "sse_runs": stream_registry.stats(),
+        "copilot_run_cache": health_copilot.run_cache.stats(),
+        "web_search_cache": scrape_cache.stats(),
+        "web_doctor_index": web_doctor_index.stats(),
+        "firecrawl": firecrawl_stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "mongo_pool": pool_stats()
+    }
+
 @api_router.get("/debug/doctors")
 async def debug_doctors():
     """Debug endpoint to check all doctors and their online status"""
-    all_doctors = await db.doctors.find({}, {"_id": 0}).to_list(100)
+    all_doctors = await read_db.doctors.find({}, {"_id": 0}).to_list(100)
     online_count = sum(1 for d in all_doctors if d.get("availability", {}).get("is_online", False))
     return {
         "total_doctors": len(all_doctors),
@@ -1142,96 +1364,181 @@ async def debug_doctors():
 # HYBRID DOCTOR SEARCH ENDPOINTS (Registered + Web Scraped)
 # ============================================================================
 
+def format_registered_doctor(d: dict) -> dict:
+    return {
+        "source": "registered",
+        "doctor_id": d.get("doctor_id"),
+        "name": d.get("full_name"),
+        "specialization": d.get("specialization"),
+        "experience": d.get("experience_years"),
+        "mobile": d.get("phone"),
+        "location": d.get("location", {}).get("address", ""),
+        "is_online": d.get("availability", {}).get("is_online", False),
+        "rating": d.get("rating", 0),
+        "fees": d.get("consultation_fee", 0)
+    }
+
+def format_web_doctor(d: dict) -> dict:
+    return {
+        "source": "web_search",
+        "name": d.get("name"),
+        "specialization": d.get("specialty"),
+        "designation": d.get("designation"),
+        "mobile": d.get("mobile"),
+        "location": d.get("location"),
+        "experience": d.get("experience"),
+        "link": d.get("link", "")
+    }
+
+HYBRID_FORMATTERS = {"registered": format_registered_doctor, "web_search": format_web_doctor}
+
+def request_location(body: dict) -> str:
+    """
+    The typed location, else the gazetteer place name for latitude/longitude, else "".
+    Non-numeric or out-of-range coordinates are a 400.
+    """
+    if body.get("location"):
+        return body["location"]
+    if body.get("latitude") is not None and body.get("longitude") is not None:
+        try:
+            latitude, longitude = float(body["latitude"]), float(body["longitude"])
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Latitude and longitude must be numbers")
+        # NaN fails this check too
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise HTTPException(status_code=400, detail="Latitude must be between -90 and 90 and longitude between -180 and 180")
+        return location_for_coordinates(latitude, longitude)
+    return ""
+
+async def hybrid_analysis(symptoms: str, specialty: str = None, urgency: str = None) -> dict:
+    """Triage for the hybrid search. A caller that already knows the specialty skips the Gemini call."""
+    if specialty:
+        return {"primary_specialty": specialty, "urgency_level": urgency or "moderate"}
+    with stage_deadline(0.5):
+        analysis = await gemini_analyzer.analyze_symptoms(symptoms)
+    if analysis.get("urgency_level") == "critical":
+        current_deadline().tighten(settings.TRIAGE_CRITICAL_DEADLINE_SECONDS)
+    return analysis
+
+def hybrid_symptom_summary(analysis: dict) -> dict:
+    return {
+        "urgency_level": analysis.get("urgency_level", "moderate"),
+        "urgency_score": analysis.get("urgency_score"),
+        "primary_specialty": analysis.get("primary_specialty", "General Medicine"),
+        "key_symptoms": analysis.get("key_symptoms", []),
+        "critical_warnings": analysis.get("critical_warnings", [])
+    }
+
+async def search_doctor_source(awaitable, timeout_seconds: float) -> Optional[list]:
+    """Await one doctor source within its own timeout and the request deadline; None if it ran out."""
+    with deadline_scope(timeout_seconds):
+        try:
+            return await run_with_deadline(awaitable)
+        except DeadlineExceeded:
+            return None
+
+def start_hybrid_sources(specialty: str, urgency: str, location: str) -> dict:
+    """Start the registered-doctor query and the web search concurrently, keyed by source."""
+    from doctor_scraper import get_doctor_scraper
+
+    scraper = get_doctor_scraper()
+    return {
+        "registered": asyncio.create_task(search_doctor_source(
+            find_matching_doctors(specialty, urgency), settings.HYBRID_REGISTERED_TIMEOUT_SECONDS)),
+        "web_search": asyncio.create_task(search_doctor_source(
+            scraper.search_doctors(specialty, location, limit=5), settings.HYBRID_WEB_TIMEOUT_SECONDS)),
+    }
+
 @api_router.post("/search/doctors/hybrid")
 @traceable(name="search_doctors_hybrid_endpoint")
 async def search_doctors_hybrid(request: dict):
     """
     Search for doctors from both registered database and web scraping.
+    Both sources run concurrently, each with its own timeout; a source that
+    times out contributes no doctors and is listed in timed_out_sources.
     
     Request body:
     {
         "symptoms": "description of symptoms",
+        "specialty": "optional, skips symptom analysis",
         "location": "city or area name",
         "latitude": 28.7041,
         "longitude": 77.1025,
         "limit": 10
     }
     """
-    from gemini_service import GeminiSymptomAnalyzer
-    from doctor_scraper import get_doctor_scraper
-    
     symptoms = request.get("symptoms", "")
-    location = request.get("location", "")
-    latitude = request.get("latitude")
-    longitude = request.get("longitude")
+    location = request_location(request)
     limit = request.get("limit", 10)
     
     if not symptoms:
         raise HTTPException(status_code=400, detail="Symptoms are required")
     
-    # Step 1: Analyze symptoms with Gemini
-    analyzer = GeminiSymptomAnalyzer()
-    analysis = await analyzer.analyze_symptoms(symptoms)
-    
-    specialty = analysis.get("primary_specialty", "General Medicine")
-    urgency = analysis.get("urgency_level", "moderate")
-    
-    # Step 2: Find registered doctors
-    registered_doctors = await find_matching_doctors(specialty, urgency)
-    
-    # Step 3: Web scrape for non-registered doctors
-    scraper = get_doctor_scraper()
-    scraped_doctors = await scraper.search_doctors(specialty, location, limit=5)
-    
-    # Format registered doctors
-    formatted_registered = [
-        {
-            "source": "registered",
-            "doctor_id": d.get("doctor_id"),
-            "name": d.get("full_name"),
-            "specialization": d.get("specialization"),
-            "experience": d.get("experience_years"),
-            "mobile": d.get("phone"),
-            "location": d.get("location", {}).get("address", ""),
-            "is_online": d.get("availability", {}).get("is_online", False),
-            "rating": d.get("rating", 0),
-            "fees": d.get("consultation_fee", 0)
-        }
-        for d in registered_doctors
-    ]
+    with deadline_scope(settings.TRIAGE_DEADLINE_SECONDS):
+        analysis = await hybrid_analysis(symptoms, request.get("specialty"), request.get("urgency"))
+        summary = hybrid_symptom_summary(analysis)
+        sources = start_hybrid_sources(summary["primary_specialty"], summary["urgency_level"], location)
+        results = dict(zip(sources, await asyncio.gather(*sources.values())))
     
-    # Format scraped doctors
-    formatted_scraped = [
-        {
-            "source": "web_search",
-            "name": d.get("name"),
-            "specialization": d.get("specialty"),
-            "designation": d.get("designation"),
-            "mobile": d.get("mobile"),
-            "location": d.get("location"),
-            "experience": d.get("experience"),
-            "link": d.get("link", "")
-        }
-        for d in scraped_doctors
-    ]
-    
-    # Combine and sort by relevance
-    all_doctors = formatted_registered + formatted_scraped
+    formatted = {
+        source: [HYBRID_FORMATTERS[source](d) for d in results[source] or []]
+        for source in sources
+    }
+    all_doctors = formatted["registered"] + formatted["web_search"]
     
     return {
         "status": "success",
-        "symptom_analysis": {
-            "urgency_level": urgency,
-            "urgency_score": analysis.get("urgency_score"),
-            "primary_specialty": specialty,
-            "key_symptoms": analysis.get("key_symptoms", []),
-            "critical_warnings": analysis.get("critical_warnings", [])
-        },
-        "registered_doctors_count": len(formatted_registered),
-        "web_doctors_count": len(formatted_scraped),
+        "symptom_analysis": summary,
+        "registered_doctors_count": len(formatted["registered"]),
+        "web_doctors_count": len(formatted["web_search"]),
+        "timed_out_sources": [source for source, found in results.items() if found is None],
         "doctors": all_doctors[:limit]
     }
 
+@api_router.post("/search/doctors/hybrid/stream")
+async def search_doctors_hybrid_stream(request: Request, payload: dict = Body(...),
+                                       last_event_id: Optional[str] = Header(default=None)):
+    """
+    Streaming hybrid search. Emits the symptom analysis, then one `doctors`
+    event per source as soon as it finishes (registered doctors typically
+    within milliseconds, web doctors when scraping completes), then `done`.
+    Each source contributes up to `limit` doctors.
+    """
+    symptoms = payload.get("symptoms", "")
+    if not symptoms:
+        raise HTTPException(status_code=400, detail="Symptoms are required")
+    # Resolved before the stream starts so bad coordinates are a 400, not a failed run
+    location = request_location(payload)
+    limit = payload.get("limit", 10)
+
+    async def hybrid_events(run_id: str):
+        analysis = await hybrid_analysis(symptoms, payload.get("specialty"), payload.get("urgency"))
+        summary = hybrid_symptom_summary(analysis)
+        yield {"event": "analysis", "symptom_analysis": summary}
+
+        sources = start_hybrid_sources(summary["primary_specialty"], summary["urgency_level"], location)
+        source_of = {task: source for source, task in sources.items()}
+        counts = {}
+        pending = set(source_of)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    source, found = source_of[task], task.result()
+                    # limit applies per source, so a fast source cannot crowd out a slow one
+                    doctors = [HYBRID_FORMATTERS[source](d) for d in (found or [])[:limit]]
+                    counts[source] = len(doctors)
+                    yield {"event": "doctors", "source": source, "doctors": doctors, "timed_out": found is None}
+        finally:
+            for task in pending:
+                task.cancel()
+
+        yield {"event": "done", "registered_doctors_count": counts.get("registered", 0),
+               "web_doctors_count": counts.get("web_search", 0)}
+
+    return resume_or_start(request, last_event_id, hybrid_events, client_key=get_remote_address(request),
+                           deadline_seconds=settings.TRIAGE_DEADLINE_SECONDS)
+
 @api_router.post("/search/doctors/registered")
 async def search_registered_doctors(request: dict):
     """
@@ -1268,11 +1575,12 @@ async def search_registered_doctors(request: dict):
 async def search_web_doctors(request: dict):
     """
     Search for doctors from web scraping only.
+    Either location or latitude/longitude is required.
     """
     from doctor_scraper import get_doctor_scraper
     
     specialty = request.get("specialty", "")
-    location = request.get("location", "")
+    location = request_location(request)
     limit = request.get("limit", 10)
     
     if not specialty or not location:
@@ -1322,7 +1630,7 @@ async def connect_with_web_doctor(request: dict):
         "doctor_name": doctor_name,
         "doctor_phone": doctor_phone,
         "status": "pending",
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": datetime.now(timezone.utc),
         "source": "web_search"
     }
     
@@ -1343,77 +1651,78 @@ async def connect_with_web_doctor(request: dict):
 # ---------------------------------------------------------------------------
 
 @app.post("/api/connect-with-doctor/stream")
-async def connect_with_doctor_stream(request_data: SymptomAnalysisRequest):
+async def connect_with_doctor_stream(request: Request, request_data: SymptomAnalysisRequest,
+                                     last_event_id: Optional[str] = Header(default=None)):
     """
     SSE streaming endpoint that narrates agent reasoning in real time.
     Each server-sent event represents one step of the multi-agent pipeline.
+    Independent stages run concurrently and events are emitted as each finishes.
+    Reconnecting with Last-Event-ID replays the same run instead of starting a new one;
+    a run nobody is listening to is cancelled.
     """
-    async def agent_event_stream():
+    async def agent_events(run_id: str):
         symptoms = request_data.symptom_description
         patient_age = request_data.patient_age
         request_id = str(uuid.uuid4())
 
-        def sse(obj: dict) -> str:
-            return "data: " + json.dumps(obj, default=str) + "\n\n"
-
-        # Step 1 — Triage Agent start
-        yield sse({"event": "agent_start", "agent": "TriageAgent", "step": 1,
-                   "thinking": f"Received patient symptoms: '{symptoms[:80]}...'. Starting clinical triage analysis."})
-        await asyncio.sleep(0.4)
-
-        # Step 2 — Tool call: find_matching_specialties
-        yield sse({"event": "tool_call", "tool": "find_matching_specialties",
-                   "step": 2, "input": symptoms})
-        await asyncio.sleep(0.3)
-
         from langchain_agents import find_matching_specialties
-        specialty_result = await asyncio.to_thread(find_matching_specialties.invoke, {"symptoms": symptoms})
-        top_specialty = (specialty_result.get("specialties") or [{"specialty": "General Medicine"}])[0]["specialty"]
 
-        yield sse({"event": "tool_result", "tool": "find_matching_specialties",
-                   "step": 2, "output": specialty_result})
-        await asyncio.sleep(0.4)
+        # Stage 1 — keyword specialty matching and Gemini analysis are independent; run both now
+        yield {"event": "agent_start", "agent": "TriageAgent", "step": 1,
+               "thinking": f"Received patient symptoms: '{symptoms[:80]}...'. Starting clinical triage analysis."}
+        specialty_task = asyncio.create_task(
+            asyncio.to_thread(find_matching_specialties.invoke, {"symptoms": symptoms})
+        )
+        # The analysis gets half the run deadline, then falls back to rule-based triage
+        with stage_deadline(0.5):
+            analysis_task = asyncio.create_task(gemini_analyzer.analyze_symptoms(symptoms, patient_age))
 
-        # Step 3 — Gemini Symptom Analyzer (calls Gemini LLM)
-        yield sse({"event": "agent_start", "agent": "SymptomAnalyzerAgent", "step": 3,
-                   "thinking": f"Top specialty candidate: {top_specialty}. Calling Gemini LLM for deep clinical reasoning."})
-        await asyncio.sleep(0.3)
+        yield {"event": "tool_call", "tool": "find_matching_specialties",
+               "step": 2, "input": symptoms}
+        yield {"event": "agent_start", "agent": "SymptomAnalyzerAgent", "step": 3,
+               "thinking": "Calling Gemini LLM for deep clinical reasoning alongside the keyword specialty match."}
 
-        analysis = await gemini_analyzer.analyze_symptoms(symptoms, patient_age)
-        detected_specialty = analysis.get("primary_specialty", top_specialty)
+        # Emit each result as soon as its stage finishes
+        pending = {specialty_task, analysis_task}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is specialty_task:
+                        yield {"event": "tool_result", "tool": "find_matching_specialties",
+                               "step": 2, "output": task.result()}
+                    else:
+                        analysis = task.result()
+                        yield {"event": "llm_response", "agent": "SymptomAnalyzerAgent", "step": 3,
+                               "specialty": analysis.get("primary_specialty"),
+                               "urgency": analysis.get("urgency_level", "moderate"),
+                               "urgency_score": analysis.get("urgency_score", 0.5),
+                               "justification": analysis.get("urgency_justification", "")}
+        finally:
+            for task in pending:
+                task.cancel()
+
+        specialty_result = specialty_task.result()
+        top_specialty = (specialty_result.get("specialties") or [{"specialty": "General Medicine"}])[0]["specialty"]
+        analysis = analysis_task.result()
+        detected_specialty = analysis.get("primary_specialty") or top_specialty
         urgency = analysis.get("urgency_level", "moderate")
         urgency_score = analysis.get("urgency_score", 0.5)
+        if urgency == "critical":
+            current_deadline().tighten(settings.TRIAGE_CRITICAL_DEADLINE_SECONDS)
 
-        yield sse({"event": "llm_response", "agent": "SymptomAnalyzerAgent", "step": 3,
-                   "specialty": detected_specialty, "urgency": urgency,
-                   "urgency_score": urgency_score,
-                   "justification": analysis.get("urgency_justification", "")})
-        await asyncio.sleep(0.4)
-
-        # Step 4 — RoutingAgent
-        yield sse({"event": "agent_start", "agent": "RoutingAgent", "step": 4,
-                   "thinking": f"Urgency: {urgency} ({urgency_score:.0%}). Now querying DB for online {detected_specialty} doctors."})
-        await asyncio.sleep(0.3)
-
-        # Step 5 — Tool call: check_doctor_availability
-        yield sse({"event": "tool_call", "tool": "check_doctor_availability",
-                   "step": 5, "input": {"specialty": detected_specialty, "urgency": urgency}})
-        await asyncio.sleep(0.3)
-
-        from langchain_agents import check_doctor_availability
-        avail_result = await asyncio.to_thread(
-            check_doctor_availability.invoke,
-            {"specialty": detected_specialty, "urgency": urgency}
-        )
-        yield sse({"event": "tool_result", "tool": "check_doctor_availability",
-                   "step": 5, "output": avail_result})
-        await asyncio.sleep(0.3)
+        # Stage 2 — one doctor lookup serves both the availability trace and the match
+        yield {"event": "agent_start", "agent": "RoutingAgent", "step": 4,
+               "thinking": f"Urgency: {urgency} ({urgency_score:.0%}). Now querying DB for online {detected_specialty} doctors."}
+        yield {"event": "tool_call", "tool": "check_doctor_availability",
+               "step": 5, "input": {"specialty": detected_specialty, "urgency": urgency}}
 
-        # Step 6 — DB doctor fetch (the original path)
         matching_doctors = await find_matching_doctors(detected_specialty, urgency)
-        yield sse({"event": "agent_start", "agent": "MatchingAgent", "step": 6,
-                   "thinking": f"Found {len(matching_doctors)} verified online doctor(s) in DB. Sending consultation requests."})
-        await asyncio.sleep(0.3)
+        yield {"event": "tool_result", "tool": "check_doctor_availability",
+               "step": 5, "output": doctor_availability_summary(detected_specialty, urgency, matching_doctors)}
+
+        yield {"event": "agent_start", "agent": "MatchingAgent", "step": 6,
+               "thinking": f"Found {len(matching_doctors)} verified online doctor(s) in DB. Sending consultation requests."}
 
         # Persist the request
         temp_patient_id = f"temp_{uuid.uuid4()}"
@@ -1429,27 +1738,32 @@ async def connect_with_doctor_stream(request_data: SymptomAnalysisRequest):
             "recommended_actions": analysis.get("recommended_actions", []),
             "critical_warnings": analysis.get("critical_warnings", []),
             "key_symptoms": analysis.get("key_symptoms", []),
-            "requested_at": datetime.now(timezone.utc).isoformat(),
+            "requested_at": datetime.now(timezone.utc),
+            "is_anonymous": is_anonymous_patient(temp_patient_id),
             "status": "pending",
             "matched_doctors": [doc["doctor_id"] for doc in matching_doctors],
             "assigned_doctor_id": None
         }
         await db.patient_requests.insert_one(patient_request_doc)
 
-        for doctor in matching_doctors:
-            await db.doctor_notifications.insert_one({
+        # Written inline: the bus pushes the request to doctors right away
+        await audit_writer.write_many("doctor_notifications", [
+            {
                 "notification_id": str(uuid.uuid4()),
                 "doctor_id": doctor["doctor_id"],
                 "patient_request_id": request_id,
                 "patient_name": request_data.patient_name or "Anonymous Patient",
                 "symptoms": symptoms,
                 "urgency_level": urgency,
-                "created_at": datetime.now(timezone.utc).isoformat(),
+                "created_at": datetime.now(timezone.utc),
                 "read": False
-            })
+            }
+            for doctor in matching_doctors
+        ], sync=True)
+        await publish_new_request(patient_request_doc)
 
         # Final done event
-        yield sse({
+        yield {
             "event": "done",
             "step": 7,
             "request_id": request_id,
@@ -1469,14 +1783,10 @@ async def connect_with_doctor_stream(request_data: SymptomAnalysisRequest):
                 }
                 for doc in matching_doctors
             ]
-        })
+        }
 
-    import asyncio as _asyncio
-    return StreamingResponse(
-        agent_event_stream(),
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
-    )
+    return resume_or_start(request, last_event_id, agent_events, client_key=get_remote_address(request),
+                           deadline_seconds=settings.TRIAGE_DEADLINE_SECONDS)
 
 
 # ---------------------------------------------------------------------------
@@ -1529,7 +1839,7 @@ async def create_prescription(
 async def get_prescriptions(current_user: dict = Depends(get_current_user)):
     """Get all prescriptions for the current patient."""
     patient_id = current_user["sub"]
-    prescriptions = await db.prescriptions.find(
+    prescriptions = await read_db.prescriptions.find(
         {"patient_id": patient_id}, {"_id": 0}
     ).sort("created_at", -1).to_list(50)
     return {"prescriptions": prescriptions}
@@ -1560,4 +1870,13 @@ app.include_router(api_router)
 
 @app.on_event("shutdown")
 async def shutdown():
-    client.close()
\ No newline at end of file
+    for task_name in ("archival_task", "ingestion_task"):
+        task = getattr(app.state, task_name, None)
+        if task:
+            task.cancel()
+    await audit_writer.stop()
+    await notification_bus.stop()
+    shutdown_extraction_pool()
+    await close_firecrawl_app()
+    await close_qdrant()
+    close_clients()
\ No newline at end of file
@@ -0,0 +1,265 @@
+"""
+Server-Sent Events helpers for AyuMitraAI.
+
+Framing: events are serialized once (orjson when available) and framed as
+
+    id: <run_id>:<seq>
+    data: <json>
+
+with a comment line sent as a heartbeat while a stream is idle.
+
+Resumable runs: a long pipeline (LLM calls, scraping) is started as a StreamRun.
+Its producer task appends events to a bounded replay buffer independently of
+any HTTP connection, and each connection replays from that buffer. A client
+that drops and reconnects with the Last-Event-ID header picks up after the
+last event it saw instead of re-running the pipeline. Finished runs stay
+replayable for SSE_REPLAY_TTL_SECONDS. If the events a client is missing have
+already been evicted from the buffer, it is sent a "reset" event and then the
+buffer from its start, and should rebuild its view from what follows. A run
+restarted under the same run_id continues the previous run's numbering.
+
+Cancellation: when the last connection of an unfinished run goes away, the
+run gets SSE_DISCONNECT_GRACE_SECONDS to be resumed; after that its cancel
+token is tripped and its task cancelled, so LLM and scraper work stops.
+Each client may have at most SSE_MAX_RUNS_PER_CLIENT unfinished runs.
+A run started with deadline_seconds has that deadline bound for its producer.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+
+sys.path.append(os.path.dirname(__file__))
+from config import get_settings
+from request_context import CancelToken, Deadline, RunCancelled, bind_cancel_token, bind_deadline
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ships with langsmith
+    orjson = None
+
+logger = logging.getLogger("ayumitra.sse")
+settings = get_settings()
+
+HEARTBEAT = ": heartbeat\n\n"
+RESET_EVENT = {"event": "reset", "reason": "replay buffer overflowed"}
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, default=str)
+
+
+def format_event(data: dict, event_id: str = None) -> str:
+    frame = f"id: {event_id}\n" if event_id else ""
+    return frame + "data: " + dumps(data) + "\n\n"
+
+
+def sse_response(stream: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(stream, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def parse_last_event_id(value: Optional[str]) -> Tuple[Optional[str], int]:
+    """Split a Last-Event-ID header into (run_id, seq); (None, 0) if absent or malformed."""
+    if not value or ":" not in value:
+        return None, 0
+    run_id, _, seq = value.rpartition(":")
+    try:
+        return run_id, int(seq)
+    except ValueError:
+        return None, 0
+
+
+class StreamRun:
+    """One pipeline execution whose events can be replayed to any number of connections."""
+
+    def __init__(self, run_id: str, buffer_size: int, client_key: str = None, start_seq: int = 0):
+        self.run_id = run_id
+        self.client_key = client_key
+        self.events: deque = deque(maxlen=buffer_size)  # (seq, frame)
+        self.seq = start_seq
+        self.done = False
+        self.cancelled = False
+        self.finished_at = None
+        self.consumers = 0
+        self.cancel_token = CancelToken()
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def append(self, data: dict):
+        self.seq += 1
+        self.events.append((self.seq, format_event(data, f"{self.run_id}:{self.seq}")))
+        self._wake()
+
+    def finish(self):
+        self.done = True
+        self.finished_at = time.monotonic()
+        self._wake()
+
+    def cancel(self, reason: str):
+        """Stop the producer: trip the token for threads, cancel the task for coroutines."""
+        self.cancelled = True
+        self.cancel_token.cancel(reason)
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def consume(self, after_seq: int = 0, request=None, heartbeat_seconds: float = None) -> AsyncIterator[str]:
+        """
+        Yield frames with seq > after_seq, then follow the run live. Everything
+        already buffered is written as one chunk, so a slow client gets fewer,
+        larger writes instead of holding up the producer. A client whose next
+        event was already evicted gets RESET_EVENT before the buffered frames.
+        """
+        heartbeat = heartbeat_seconds or settings.SSE_HEARTBEAT_SECONDS
+        last = after_seq
+        self.consumers += 1
+        try:
+            while True:
+                if request is not None and await request.is_disconnected():
+                    return
+                pending = [frame for seq, frame in self.events if seq > last]
+                if pending:
+                    if self.events[0][0] > last + 1:
+                        logger.info("Stream %s: events %d-%d evicted, resetting client",
+                                    self.run_id, last + 1, self.events[0][0] - 1)
+                        pending.insert(0, format_event(RESET_EVENT))
+                    last = self.events[-1][0]
+                    yield "".join(pending)
+                    continue
+                if self.done:
+                    return
+                changed = self._changed
+                try:
+                    await asyncio.wait_for(changed.wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+        finally:
+            self.consumers -= 1
+            if self.consumers == 0 and not self.done:
+                asyncio.get_running_loop().create_task(
+                    self._cancel_when_abandoned(settings.SSE_DISCONNECT_GRACE_SECONDS)
+                )
+
+    async def _cancel_when_abandoned(self, grace: float):
+        await asyncio.sleep(grace)
+        if self.consumers == 0 and not self.done:
+            logger.info("Cancelling stream %s: no client for %ss", self.run_id, grace)
+            self.cancel("client disconnected")
+
+
+class StreamRegistry:
+    """Process-local index of resumable runs."""
+
+    def __init__(self, buffer_size: int = None, ttl_seconds: int = None):
+        self.buffer_size = buffer_size or settings.SSE_REPLAY_BUFFER_SIZE
+        self.ttl = settings.SSE_REPLAY_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._runs: Dict[str, StreamRun] = {}
+
+    def start(self, producer: Callable[[str], AsyncIterator[dict]], run_id: str = None,
+              client_key: str = None, deadline_seconds: float = None, start_seq: int = 0) -> StreamRun:
+        """
+        Start driving producer(run_id) in the background and register the run;
+        its first event is numbered start_seq + 1.
+        Raises HTTP 429 if client_key already has SSE_MAX_RUNS_PER_CLIENT unfinished runs.
+        """
+        self._expire()
+        if client_key and self.active_runs(client_key) >= settings.SSE_MAX_RUNS_PER_CLIENT:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many streams in progress. Wait for one to finish and try again.",
+            )
+        run = StreamRun(run_id or str(uuid.uuid4()), self.buffer_size, client_key, start_seq)
+        run.task = asyncio.create_task(self._drive(run, producer(run.run_id), deadline_seconds))
+        self._runs[run.run_id] = run
+        return run
+
+    def active_runs(self, client_key: str) -> int:
+        return sum(1 for run in self._runs.values() if run.client_key == client_key and not run.done)
+
+    def get(self, run_id: str) -> Optional[StreamRun]:
+        self._expire()
+        return self._runs.get(run_id)
+
+    def stats(self) -> dict:
+        return {
+            "runs": len(self._runs),
+            "active": sum(1 for run in self._runs.values() if not run.done),
+            "cancelled": sum(1 for run in self._runs.values() if run.cancelled),
+        }
+
+    async def _drive(self, run: StreamRun, events: AsyncIterator[dict], deadline_seconds: float = None):
+        # The task has its own context copy; everything it spawns inherits the token and deadline
+        bind_cancel_token(run.cancel_token)
+        if deadline_seconds is not None:
+            bind_deadline(Deadline(deadline_seconds))
+        try:
+            async for data in events:
+                run.append(data)
+        except asyncio.CancelledError:
+            run.cancelled = True
+        except RunCancelled:
+            run.cancelled = True
+        except Exception as exc:
+            logger.error("Stream run %s failed: %s", run.run_id, exc)
+            run.append({"event": "error", "message": "Stream failed. Please try again."})
+        finally:
+            run.finish()
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [
+            run_id for run_id, run in self._runs.items()
+            if run.done and now - run.finished_at > self.ttl
+        ]
+        for run_id in expired:
+            del self._runs[run_id]
+
+
+stream_registry = StreamRegistry()
+
+
+def _is_run_id(value: Optional[str]) -> bool:
+    try:
+        return value is not None and str(uuid.UUID(value)) == value
+    except ValueError:
+        return False
+
+
+def resume_or_start(request, last_event_id: Optional[str], producer: Callable[[str], AsyncIterator[dict]],
+                    client_key: str = None, reuse_run_id: bool = False,
+                    deadline_seconds: float = None) -> StreamingResponse:
+    """
+    Resume the run named in Last-Event-ID if it is still buffered, otherwise
+    start a new run from producer (subject to the per-client run cap).
+    With reuse_run_id the new run keeps the client's run id, so a producer
+    backed by durable checkpoints can continue that run instead of starting over;
+    its events are numbered on from the previous run's, so ids stay unique.
+    """
+    run_id, seq = parse_last_event_id(last_event_id)
+    run = stream_registry.get(run_id) if run_id else None
+    if run is None or run.cancelled:
+        if reuse_run_id and _is_run_id(run_id):
+            seq = max(seq, run.seq if run is not None else 0)
+            run = stream_registry.start(producer, run_id=run_id, client_key=client_key,
+                                        deadline_seconds=deadline_seconds, start_seq=seq)
+        else:
+            run = stream_registry.start(producer, client_key=client_key, deadline_seconds=deadline_seconds)
+            seq = 0
+    else:
+        logger.info("Resuming stream %s after event %d", run_id, seq)
+    return sse_response(run.consume(seq, request))
@@ -8,8 +8,33 @@ Topology:
 Each node is a specialist agent:
 - triage_agent: analyzes symptoms, urgency and specialty (Gemini)
 - research_agent: finds real doctors for the specialty near the patient (Firecrawl)
-- report_agent: composes a patient-friendly markdown summary (Gemini)
+  and, with COPILOT_ENRICH_DOCTORS, merges details from their profile pages
+- report_agent: composes a patient-friendly markdown summary (Gemini, or the
+  deterministic template for COPILOT_TEMPLATE_REPORT_URGENCIES when no doctors
+  were found, since the LLM would only restate the analysis)
+
+Speculative research: when a location is given, triage_agent also predicts the
+specialty with the local keyword matcher and starts the Firecrawl search for it
+while Gemini is still thinking. research_agent keeps that search if Gemini
+lands on the same specialty and re-issues it otherwise.
+
+Deadlines: each node spends at most its STAGE_BUDGET_SHARES share of the
+run's remaining deadline (request_context) and then falls back: rule-based
+triage, no scraped doctors, the template report. A critical triage result
+tightens the run to TRIAGE_CRITICAL_DEADLINE_SECONDS.
+
+Run cache: a finished, non-degraded run is a pure function of (symptoms, age,
+location) for a while, so its node updates are kept in an LRU TTL cache and
+replayed instantly for the same inputs. Its TTL is capped at the web search
+cache TTL, so a cached run never carries scraped doctors the scraper itself
+would consider stale.
+
+Checkpointing: with a checkpointer (see graph_checkpoint.py) state is saved
+after each node under thread_id = run id. Streaming a run id that already has
+checkpoints replays the completed nodes from storage and executes only the
+nodes that had not finished.
 """
+from contextvars import ContextVar
 from typing import List, Optional, TypedDict
 
 import asyncio
@@ -23,9 +48,13 @@ from langsmith import traceable
 
 sys.path.append(os.path.dirname(__file__))
 from model_utils import generate_with_fallback
+from cache import TTLCache, cache_key
 from config import get_settings
 from doctor_scraper import DoctorScraper
 from gemini_service import GeminiSymptomAnalyzer
+from langchain_agents import find_matching_specialties
+from models import specialty_code
+from request_context import DeadlineExceeded, current_deadline, run_with_deadline, stage_deadline
 
 logger = logging.getLogger("ayumitra.copilot")
 settings = get_settings()
@@ -39,12 +68,92 @@ class TriageState(TypedDict, total=False):
     doctors: List[dict]
     report: Optional[str]
     error: Optional[str]
+    speculation: Optional[str]
+    report_source: Optional[str]
+    # user_id of the signed-in patient who started the run; None for anonymous runs
+    owner_id: Optional[str]
+
+
+# In-flight speculative searches for the current run. Tasks are not state (they
+# can't be serialized), so they live in a run-scoped dict that every node task
+# shares through its copied context.
+_speculative_research: ContextVar[Optional[dict]] = ContextVar("ayumitra_speculative_research", default=None)
+
+# Opening guidance of the template report, per urgency level
+URGENCY_GUIDANCE = {
+    "critical": "**Seek emergency care immediately.** Call your local emergency number or go to the nearest emergency room now.",
+    "moderate": "Book a consultation with a doctor within the next 24 to 48 hours, sooner if symptoms get worse.",
+    "mild": "These symptoms can usually be managed at home for now. See a doctor if they persist or get worse.",
+}
+
+
+def render_template_report(analysis: dict, doctors: List[dict] = None, location: str = None) -> str:
+    """Markdown report rendered straight from the triage analysis, without an LLM call."""
+    urgency = analysis.get("urgency_level", "moderate")
+    lines = [URGENCY_GUIDANCE.get(urgency, URGENCY_GUIDANCE["moderate"]), "", "## Summary", ""]
+    lines.append(analysis.get("urgency_justification") or "Please consult a doctor.")
+    lines += ["", f"**Urgency:** {urgency.capitalize()}  ",
+              f"**Recommended specialty:** {analysis.get('primary_specialty', 'General Medicine')}"]
+    alternatives = [a.get("specialty") for a in analysis.get("alternative_specialties") or [] if a.get("specialty")]
+    if alternatives:
+        lines[-1] += "  "
+        lines.append(f"**Also relevant:** {', '.join(alternatives)}")
+
+    key_symptoms = analysis.get("key_symptoms") or []
+    if key_symptoms:
+        lines += ["", "### What we noted", ""] + [f"- {s}" for s in key_symptoms]
+
+    actions = analysis.get("recommended_actions") or ["Consult a general physician."]
+    lines += ["", "### What to do next", ""] + [f"- {a}" for a in actions]
+
+    warnings = analysis.get("critical_warnings") or []
+    if warnings:
+        lines += ["", "### Warning signs", ""] + [f"- {w}" for w in warnings]
+
+    if doctors:
+        lines += ["", "### Doctors that may help", ""]
+        for doctor in doctors:
+            details = ", ".join(filter(None, [doctor.get("designation"), doctor.get("mobile")]))
+            lines.append(f"- **{doctor.get('name', 'Doctor')}**" + (f" ({details})" if details else ""))
+    elif location:
+        lines += ["", f"We could not find doctors near {location} right now; a local clinic or hospital can refer you."]
+
+    lines += ["", "_This is not a medical diagnosis._"]
+    return "\n".join(lines)
+
+
+def run_cache_key(state: TriageState) -> str:
+    symptoms = " ".join(state["symptom_description"].lower().split())
+    location = " ".join((state.get("location") or "").lower().split())
+    return cache_key(symptoms, state.get("patient_age"), location)
+
+
+def _is_degraded(updates: list) -> bool:
+    """Runs that hit a fallback are not worth replaying to the next patient."""
+    for _, update in updates:
+        if update.get("error"):
+            return True
+        justification = (update.get("analysis") or {}).get("urgency_justification") or ""
+        if justification.startswith("Fallback rule-based triage"):
+            return True
+    return False
+
+
+def template_report_urgencies() -> set:
+    return {u.strip().lower() for u in settings.COPILOT_TEMPLATE_REPORT_URGENCIES.split(",") if u.strip()}
+
+
+# Share of the run's remaining deadline each node may use; report_agent gets the rest
+STAGE_BUDGET_SHARES = {"triage_agent": 0.5, "research_agent": 0.6}
 
 
 class HealthCopilotGraph:
     """Supervisor-style LangGraph chaining triage, research and report agents."""
 
-    def __init__(self):
+    def __init__(self, checkpointer=None):
+        self.checkpointer = checkpointer
+        run_cache_ttl = min(settings.COPILOT_RUN_CACHE_TTL_SECONDS, settings.WEB_SEARCH_CACHE_TTL_SECONDS)
+        self.run_cache = TTLCache(settings.COPILOT_RUN_CACHE_MAX_ENTRIES, run_cache_ttl, name="copilot_runs")
         self.analyzer = GeminiSymptomAnalyzer()
         self.client = self.analyzer.client
         try:
@@ -67,35 +176,81 @@ class HealthCopilotGraph:
         )
         builder.add_edge("research_agent", "report_agent")
         builder.add_edge("report_agent", END)
-        return builder.compile()
+        return builder.compile(checkpointer=self.checkpointer)
 
     def _route_after_triage(self, state: TriageState) -> str:
         if state.get("location") and self.scraper is not None:
             return "research"
         return "report"
 
+    def _start_speculative_research(self, state: TriageState):
+        """Kick off the doctor search for the locally predicted specialty, if confident."""
+        speculation = _speculative_research.get()
+        if speculation is None or not settings.COPILOT_SPECULATIVE_RESEARCH:
+            return
+        if self._route_after_triage(state) != "research":
+            return
+        prediction = find_matching_specialties.invoke({"symptoms": state["symptom_description"]})
+        top = (prediction.get("specialties") or [{}])[0]
+        # No keyword hits means the matcher fell back to a default; not worth a search
+        if not top.get("matched_keywords"):
+            return
+        speculation["specialty"] = top["specialty"]
+        speculation["task"] = asyncio.create_task(
+            self.scraper.search_doctors(top["specialty"], state["location"], limit=5)
+        )
+
     @traceable(name="copilot_triage_agent")
     async def triage_agent(self, state: TriageState) -> dict:
-        analysis = await self.analyzer.analyze_symptoms(
-            state["symptom_description"], state.get("patient_age")
-        )
+        # Started outside the triage budget so the search keeps the run's full deadline
+        self._start_speculative_research(state)
+        with stage_deadline(STAGE_BUDGET_SHARES["triage_agent"]):
+            analysis = await self.analyzer.analyze_symptoms(
+                state["symptom_description"], state.get("patient_age")
+            )
+        deadline = current_deadline()
+        if deadline is not None and analysis.get("urgency_level") == "critical":
+            deadline.tighten(settings.TRIAGE_CRITICAL_DEADLINE_SECONDS)
         return {"analysis": analysis}
 
     @traceable(name="copilot_research_agent")
     async def research_agent(self, state: TriageState) -> dict:
         analysis = state.get("analysis") or {}
         specialty = analysis.get("primary_specialty", "General Medicine")
+        speculation = _speculative_research.get() or {}
+        task = speculation.pop("task", None)
+        outcome = None
         try:
-            doctors = await self.scraper.search_doctors(specialty, state["location"], limit=5)
-            return {"doctors": doctors or []}
+            with stage_deadline(STAGE_BUDGET_SHARES["research_agent"]):
+                if task is not None and specialty_code(speculation["specialty"]) == specialty_code(specialty):
+                    outcome = "hit"
+                    doctors = await run_with_deadline(task)
+                else:
+                    if task is not None:
+                        outcome = "miss"
+                        logger.info("Speculative research for %s discarded; triage chose %s",
+                                    speculation["specialty"], specialty)
+                        task.cancel()
+                    doctors = await self.scraper.search_doctors(specialty, state["location"], limit=5)
+                if doctors and settings.COPILOT_ENRICH_DOCTORS:
+                    try:
+                        doctors = await run_with_deadline(self.scraper.enrich_doctors(doctors))
+                    except DeadlineExceeded:
+                        logger.info("Doctor enrichment skipped: research deadline reached")
+            return {"doctors": doctors or [], "speculation": outcome}
         except Exception as exc:
             logger.error("Research agent failed: %s", exc)
-            return {"doctors": [], "error": "Doctor research is temporarily unavailable."}
+            return {"doctors": [], "speculation": outcome, "error": "Doctor research is temporarily unavailable."}
 
     @traceable(name="copilot_report_agent")
     async def report_agent(self, state: TriageState) -> dict:
         analysis = state.get("analysis") or {}
         doctors = state.get("doctors") or []
+        # Nothing for the LLM to add beyond the analysis: render it directly
+        if not doctors and analysis.get("urgency_level", "moderate") in template_report_urgencies():
+            return {"report": render_template_report(analysis, location=state.get("location")),
+                    "report_source": "template"}
+
         prompt = f"""You are the report-writing agent of AyuMitraAI's multi-agent health copilot.
 Write a clear, compassionate, patient-friendly summary in Markdown using ONLY the structured data below.
 
@@ -118,20 +273,84 @@ Patient location: {state.get("location") or "Not provided"}
 """
         try:
             report_text = await generate_with_fallback(self.client, prompt)
-            return {"report": report_text}
+            return {"report": report_text, "report_source": "llm"}
         except Exception as exc:
             logger.error("Report agent failed: %s", exc)
-            actions = "\n".join(f"- {a}" for a in analysis.get("recommended_actions", []))
-            fallback = (
-                f"## Summary\n\n{analysis.get('urgency_justification', 'Please consult a doctor.')}\n\n"
-                f"**Recommended specialty:** {analysis.get('primary_specialty', 'General Medicine')}\n\n"
-                f"### What to do next\n{actions or '- Consult a general physician.'}\n\n"
-                "This is not a medical diagnosis."
-            )
-            return {"report": fallback, "error": "Report generation degraded; showing fallback summary."}
+            return {"report": render_template_report(analysis, doctors, state.get("location")),
+                    "report_source": "fallback",
+                    "error": "Report generation degraded; showing fallback summary."}
+
+    @staticmethod
+    def _run_config(run_id: str) -> dict:
+        return {"configurable": {"thread_id": run_id}}
+
+    async def _completed_updates(self, config: dict) -> list:
+        """(node_name, update) pairs already checkpointed for a run, oldest first."""
+        updates = []
+        async for snapshot in self.graph.aget_state_history(config):
+            writes = (snapshot.metadata or {}).get("writes") or {}
+            for node_name, update in writes.items():
+                if node_name != "__start__":
+                    updates.append((node_name, update or {}))
+        return list(reversed(updates))
 
-    async def astream_events(self, state: TriageState):
-        """Yield (node_name, state_update) tuples as the graph executes."""
-        async for chunk in self.graph.astream(state, stream_mode="updates"):
-            for node_name, update in chunk.items():
-                yield node_name, update or {}
+    async def get_run(self, run_id: str) -> Optional[dict]:
+        """Checkpointed state of a run: its values and the nodes still to execute."""
+        if self.checkpointer is None:
+            return None
+        snapshot = await self.graph.aget_state(self._run_config(run_id))
+        if not snapshot.values:
+            return None
+        return {"state": snapshot.values, "next": list(snapshot.next)}
+
+    async def astream_events(self, state: TriageState, run_id: str = None):
+        """
+        Yield (node_name, state_update) tuples as the graph executes. With a
+        checkpointer and a run_id that has been seen before, completed nodes are
+        replayed from storage and the run continues from where it stopped.
+        A new run whose inputs match a cached run replays its updates instead,
+        writing them to the checkpointer node by node.
+        """
+        graph_input = state
+        config = None
+        if self.checkpointer is not None and run_id:
+            config = self._run_config(run_id)
+            snapshot = await self.graph.aget_state(config)
+            if snapshot.values:
+                for node_name, update in await self._completed_updates(config):
+                    yield node_name, update
+                if not snapshot.next:
+                    return
+                logger.info("Resuming copilot run %s at %s", run_id, ", ".join(snapshot.next))
+                # None continues the checkpointed run instead of starting over
+                graph_input = None
+
+        key = run_cache_key(state) if graph_input is not None and self.run_cache.enabled else None
+        cached = self.run_cache.get(key) if key else None
+        if cached is not None:
+            logger.info("Copilot run %s served from the run cache", run_id)
+            if config is not None:
+                # Checkpoint the replayed run as if it had executed, so get_run and resumption find it
+                config = await self.graph.aupdate_state(config, graph_input, as_node="__start__")
+            for node_name, update in cached:
+                if config is not None:
+                    config = await self.graph.aupdate_state(config, update, as_node=node_name)
+                yield node_name, update
+            return
+
+        updates = []
+        speculation = {}
+        _speculative_research.set(speculation)
+        try:
+            async for chunk in self.graph.astream(graph_input, config, stream_mode="updates"):
+                for node_name, update in chunk.items():
+                    updates.append((node_name, update or {}))
+                    yield node_name, update or {}
+            if key and not _is_degraded(updates):
+                self.run_cache.set(key, updates)
+        finally:
+            # A speculative search the graph never consumed (error, cancelled run) is abandoned
+            task = speculation.pop("task", None)
+            if task is not None:
+                task.cancel()
+            _speculative_research.set(None)
@@ -0,0 +1,222 @@
+"""
+Local index of web-scraped doctors for AyuMitraAI.
+
+A background job crawls the top specialty x city combinations
+(WEB_DOCTOR_INGEST_SPECIALTIES x WEB_DOCTOR_INGEST_CITIES) through
+DoctorScraper, dedupes the results and upserts them into the web_doctors
+collection with a fetched_at freshness timestamp. DoctorScraper.search_doctors
+reads this index first, so common searches are answered by one indexed query
+instead of a multi-second Firecrawl scrape; only a miss falls through to the
+search cache and live scraping.
+
+The job is off unless WEB_DOCTOR_INGEST_INTERVAL_HOURS is set, since every
+pass spends Firecrawl quota. A combination whose search fails counts as
+failed in the run stats instead of as an empty result.
+
+With several workers, the scheduled job runs on whichever worker takes the
+lease in web_doctor_ingestion first; the lease lasts one interval, so restarts
+do not trigger an extra crawl.
+
+An indexed doctor counts as fresh for WEB_DOCTOR_INDEX_MAX_AGE_HOURS and is
+deleted by a TTL index after WEB_DOCTOR_INDEX_RETENTION_DAYS.
+
+Run one ingestion pass by hand with:
+
+    python web_doctor_index.py [--specialty Cardiology] [--city Pune]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+sys.path.append(os.path.dirname(__file__))
+from cache import cache_key
+from config import get_settings
+from data_lifecycle import ensure_ttl_index
+from models import specialty_code
+from scrape_cache import normalize_location
+
+logger = logging.getLogger("ayumitra.web_doctor_index")
+settings = get_settings()
+
+COLLECTION = "web_doctors"
+LEASE_COLLECTION = "web_doctor_ingestion"
+INDEXED_FIELDS = ("name", "specialty", "designation", "location", "mobile", "experience", "link", "source",
+                  "qualifications", "fees", "clinic_address")
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def ingestion_combinations() -> List[tuple]:
+    return [(specialty, city)
+            for specialty in _split(settings.WEB_DOCTOR_INGEST_SPECIALTIES)
+            for city in _split(settings.WEB_DOCTOR_INGEST_CITIES)]
+
+
+class WebDoctorIndex:
+    """Read/write access to the web_doctors collection."""
+
+    def __init__(self, db=None):
+        self._db = db
+        self.counters = {"hits": 0, "misses": 0, "errors": 0}
+        self.last_run = None
+
+    @property
+    def collection(self):
+        if self._db is None:
+            from db import get_db
+            self._db = get_db()
+        return self._db[COLLECTION]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [("specialty_code", ASCENDING), ("location_key", ASCENDING), ("fetched_at", DESCENDING)]
+        )
+        await ensure_ttl_index(self.collection, "fetched_at",
+                               timedelta(days=settings.WEB_DOCTOR_INDEX_RETENTION_DAYS), "fetched_at_ttl")
+
+    async def find(self, specialty: str, location: str, limit: int = 5) -> List[dict]:
+        """Fresh indexed doctors for the search, most recently confirmed first; [] on a miss."""
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.WEB_DOCTOR_INDEX_MAX_AGE_HOURS)
+        query = {
+            "specialty_code": specialty_code(specialty),
+            "location_key": normalize_location(location),
+            "fetched_at": {"$gte": cutoff},
+        }
+        projection = {"_id": 0, **{field: 1 for field in INDEXED_FIELDS}}
+        try:
+            doctors = await self.collection.find(query, projection).sort("fetched_at", DESCENDING).to_list(limit)
+        except Exception as exc:
+            self.counters["errors"] += 1
+            logger.warning("Web doctor index read failed: %s", exc)
+            return []
+        self.counters["hits" if doctors else "misses"] += 1
+        return doctors
+
+    async def upsert(self, specialty: str, location: str, doctors: List[dict]) -> int:
+        """Store scraped doctors for (specialty, location), one document per unique name."""
+        now = datetime.now(timezone.utc)
+        code, location_key = specialty_code(specialty), normalize_location(location)
+        ops = {}
+        for doctor in doctors:
+            name_key = " ".join(doctor["name"].lower().split())
+            doc_id = cache_key(code, location_key, name_key)
+            if doc_id in ops:
+                continue
+            fields = {field: doctor[field] for field in INDEXED_FIELDS if doctor.get(field) not in (None, "", [])}
+            ops[doc_id] = UpdateOne(
+                {"_id": doc_id},
+                {"$set": {**fields, "search_specialty": specialty, "specialty_code": code,
+                          "location_key": location_key, "fetched_at": now},
+                 "$setOnInsert": {"first_seen_at": now}},
+                upsert=True,
+            )
+        if ops:
+            await self.collection.bulk_write(list(ops.values()), ordered=False)
+        return len(ops)
+
+    async def ingest(self, scraper, combinations: List[tuple] = None) -> dict:
+        """
+        Crawl each (specialty, city) once, bypassing the search cache so the
+        index gets fresh data. Combinations run one at a time with
+        WEB_DOCTOR_INGEST_PAUSE_SECONDS between them to stay within quota.
+        """
+        combinations = combinations or ingestion_combinations()
+        started = time.monotonic()
+        stored = failed = 0
+        for i, (specialty, city) in enumerate(combinations):
+            if i:
+                await asyncio.sleep(settings.WEB_DOCTOR_INGEST_PAUSE_SECONDS)
+            try:
+                doctors = await scraper._search_doctors_live(specialty, city, settings.WEB_DOCTOR_INGEST_LIMIT,
+                                                             raise_errors=True)
+                if settings.WEB_DOCTOR_INGEST_ENRICH and doctors:
+                    doctors = await scraper.enrich_doctors(doctors)
+                stored += await self.upsert(specialty, city, doctors)
+            except Exception as exc:
+                failed += 1
+                logger.error("Ingesting %s in %s failed: %s", specialty, city, exc)
+        self.last_run = {
+            "finished_at": datetime.now(timezone.utc),
+            "combinations": len(combinations),
+            "failed": failed,
+            "doctors_upserted": stored,
+            "seconds": round(time.monotonic() - started, 1),
+        }
+        logger.info("Web doctor ingestion: %d doctors from %d searches (%d failed)",
+                    stored, len(combinations), failed)
+        return self.last_run
+
+    async def acquire_lease(self, seconds: float) -> bool:
+        """Claim the scheduled ingestion for `seconds`; False if another worker holds it."""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.database[LEASE_COLLECTION].update_one(
+                {"_id": "ingestion", "until": {"$lt": now}},
+                {"$set": {"until": now + timedelta(seconds=seconds), "started_at": now}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+            "last_run": self.last_run,
+        }
+
+
+web_doctor_index = WebDoctorIndex()
+
+
+async def run_ingestion_loop(scraper):
+    """Re-crawl the index every WEB_DOCTOR_INGEST_INTERVAL_HOURS."""
+    interval = settings.WEB_DOCTOR_INGEST_INTERVAL_HOURS * 3600
+    while True:
+        try:
+            if await web_doctor_index.acquire_lease(interval):
+                await web_doctor_index.ingest(scraper)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.error("Web doctor ingestion failed: %s", exc)
+        await asyncio.sleep(interval)
+
+
+async def main(specialties: List[str], cities: List[str]):
+    from db import close_clients
+    from doctor_scraper import DoctorScraper
+    from firecrawl_client import close_firecrawl_app
+
+    combinations = None
+    if specialties or cities:
+        combinations = [(s, c)
+                        for s in specialties or _split(settings.WEB_DOCTOR_INGEST_SPECIALTIES)
+                        for c in cities or _split(settings.WEB_DOCTOR_INGEST_CITIES)]
+    await web_doctor_index.ensure_indexes()
+    result = await web_doctor_index.ingest(DoctorScraper(), combinations)
+    print(f"  {result['doctors_upserted']:,} doctors from {result['combinations']} searches "
+          f"({result['failed']} failed) in {result['seconds']}s")
+    await close_firecrawl_app()
+    close_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl web doctors into the local index.")
+    parser.add_argument("--specialty", action="append", default=[], help="Limit to these specialties")
+    parser.add_argument("--city", action="append", default=[], help="Limit to these cities")
+    args = parser.parse_args()
+    asyncio.run(main(args.specialty, args.city))
@@ -1,4 +1,5 @@
 import React, { useState, useEffect, useRef } from 'react';
+import { postEventStream } from '../utils/sse';
 
 /**
  * AgentTracePanel
@@ -37,45 +38,11 @@ const AgentTracePanel = ({ symptoms, patientAge, patientName, onComplete, onErro
 
   const startStream = async () => {
     try {
-      const token = localStorage.getItem('ayumitra-token');
-      const headers = { 'Content-Type': 'application/json' };
-      if (token) headers['Authorization'] = `Bearer ${token}`;
-
-      const res = await fetch(`${backendUrl}/api/connect-with-doctor/stream`, {
-        method: 'POST',
-        headers,
-        body: JSON.stringify({
-          symptom_description: symptoms,
-          patient_age: patientAge ? parseInt(patientAge) : null,
-          patient_name: patientName || null,
-        }),
-      });
-
-      if (!res.ok) {
-        throw new Error(`HTTP ${res.status}`);
-      }
-
-      const reader = res.body.getReader();
-      const decoder = new TextDecoder();
-      let buffer = '';
-
-      while (true) {
-        const { done, value } = await reader.read();
-        if (done) break;
-
-        buffer += decoder.decode(value, { stream: true });
-        const lines = buffer.split('\n\n');
-        buffer = lines.pop(); // keep incomplete chunk
-
-        for (const chunk of lines) {
-          const line = chunk.replace(/^data:\s*/, '').trim();
-          if (!line) continue;
-          try {
-            const event = JSON.parse(line);
-            handleEvent(event);
-          } catch (_) { /* ignore malformed */ }
-        }
-      }
+      await postEventStream('/connect-with-doctor/stream', {
+        symptom_description: symptoms,
+        patient_age: patientAge ? parseInt(patientAge) : null,
+        patient_name: patientName || null,
+      }, { onEvent: handleEvent, baseUrl: backendUrl });
     } catch (err) {
       setIsError(true);
       addStep({ type: 'error', message: err.message || 'Stream failed' });
@@ -85,6 +52,10 @@ const AgentTracePanel = ({ symptoms, patientAge, patientName, onComplete, onErro
 
   const handleEvent = (event) => {
     switch (event.event) {
+      case 'reset':
+        // The server no longer holds the events we missed; it replays what it has from the start
+        setSteps([]);
+        break;
       case 'agent_start':
         addStep({ type: 'think', agent: event.agent, step: event.step, text: event.thinking });
         break;
@@ -7,6 +7,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '.
 import { Switch } from '../components/ui/switch';
 import { Badge } from '../components/ui/badge';
 import api from '../utils/api';
+import { streamEvents } from '../utils/sse';
 import { toast } from 'sonner';
 import { Stethoscope, Users, CheckCircle, Clock, Plus, Trash2, Power, X, Receipt, Syringe, Bandage } from 'lucide-react';
 import UrgencyBadge from '../components/UrgencyBadge';
@@ -349,9 +350,78 @@ const DoctorDashboard = () => {
     }
   };
 
+  // New requests and status changes are pushed over SSE; poll only while the stream is down
   useEffect(() => {
-    const interval = setInterval(fetchDoctorData, 2000);
-    return () => clearInterval(interval);
+    let cancelled = false;
+    let controller = null;
+    let pollInterval = null;
+    let retryTimer = null;
+    let retryDelay = 1000;
+
+    const startPolling = () => {
+      if (!pollInterval) pollInterval = setInterval(fetchDoctorData, 5000);
+    };
+    const stopPolling = () => {
+      clearInterval(pollInterval);
+      pollInterval = null;
+    };
+
+    const handleEvent = (event) => {
+      switch (event.event) {
+        case 'ready':
+          stopPolling();
+          retryDelay = 1000;
+          fetchDoctorData();
+          break;
+        case 'resync':
+          fetchDoctorData();
+          break;
+        case 'new_request':
+          setRequests(prev => [
+            event.request,
+            ...prev.filter(r => r.request_id !== event.request.request_id),
+          ]);
+          setStats(prev => prev && {
+            ...prev,
+            total_requests: prev.total_requests + 1,
+            pending_requests: prev.pending_requests + 1,
+          });
+          toast.info(`New ${event.request.urgency_level} request from ${event.request.patient_name}`);
+          break;
+        case 'request_update':
+          setRequests(prev => prev.map(r => (
+            r.request_id === event.request_id
+              ? { ...r, status: event.status, assigned_doctor_id: event.assigned_doctor_id ?? r.assigned_doctor_id }
+              : r
+          )));
+          api.get('/doctor/stats').then(res => setStats(res.data)).catch(() => {});
+          break;
+        default:
+          break;
+      }
+    };
+
+    const connect = async () => {
+      controller = new AbortController();
+      try {
+        await streamEvents('/doctor/notifications/stream', { onEvent: handleEvent, signal: controller.signal });
+      } catch (error) {
+        if (cancelled) return;
+        console.error('Notification stream failed:', error);
+      }
+      if (cancelled) return;
+      startPolling();
+      retryTimer = setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, 30000);
+    };
+
+    connect();
+    return () => {
+      cancelled = true;
+      controller?.abort();
+      stopPolling();
+      clearTimeout(retryTimer);
+    };
   }, []);
 
   const toggleOnlineStatus = async () => {
@@ -14,6 +14,7 @@ import {
   Minus,
 } from 'lucide-react';
 import { Button } from '../components/ui/button';
+import { postEventStream } from '../utils/sse';
 
 const API_BASE_URL = process.env.REACT_APP_BACKEND_URL || 'http://127.0.0.1:8000';
 
@@ -176,6 +177,12 @@ const HealthCopilot = () => {
   };
 
   const handleEvent = (evt) => {
+    if (evt.event === 'reset') {
+      // The server no longer holds the events we missed; it replays what it has from the start
+      setStatuses(initialStatuses);
+      setTimeline([]);
+      return;
+    }
     if (evt.event === 'start') {
       setStatuses({
         triage_agent: 'active',
@@ -235,39 +242,11 @@ const HealthCopilot = () => {
     setTimeline([]);
 
     try {
-      const response = await fetch(`${API_BASE_URL}/api/copilot/triage/stream`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          symptom_description: symptoms.trim(),
-          patient_age: age ? Number(age) : null,
-          location: location.trim() || null,
-        }),
-      });
-      if (!response.ok || !response.body) {
-        throw new Error(`Request failed (${response.status})`);
-      }
-      const reader = response.body.getReader();
-      const decoder = new TextDecoder();
-      let buffer = '';
-      // Read the SSE stream chunk by chunk
-      // eslint-disable-next-line no-constant-condition
-      while (true) {
-        const { done, value } = await reader.read();
-        if (done) break;
-        buffer += decoder.decode(value, { stream: true });
-        const parts = buffer.split('\n\n');
-        buffer = parts.pop();
-        parts.forEach((part) => {
-          const line = part.trim();
-          if (!line.startsWith('data:')) return;
-          try {
-            handleEvent(JSON.parse(line.slice(5)));
-          } catch (parseErr) {
-            // Ignore malformed chunks
-          }
-        });
-      }
+      await postEventStream('/copilot/triage/stream', {
+        symptom_description: symptoms.trim(),
+        patient_age: age ? Number(age) : null,
+        location: location.trim() || null,
+      }, { onEvent: handleEvent, baseUrl: API_BASE_URL });
     } catch (err) {
       setError('Could not reach the copilot. Is the backend running?');
     } finally {
@@ -505,7 +484,20 @@ const HealthCopilot = () => {
                   <p className="text-xs text-slate-500 dark:text-slate-400 mt-1">
                     {doc.designation || doc.specialty || doc.specialization || ''}
                   </p>
-                  {(doc.location || doc.city) && (
+                  {(doc.qualifications?.length > 0 || doc.experience) && (
+                    <p className="text-xs text-slate-500 dark:text-slate-400 mt-1">
+                      {[doc.qualifications?.join(', '), doc.experience].filter(Boolean).join(' · ')}
+                    </p>
+                  )}
+                  {doc.fees && (
+                    <p className="text-xs text-slate-500 dark:text-slate-400 mt-1">Consultation fee: {doc.fees}</p>
+                  )}
+                  {doc.clinic_address && (
+                    <p className="flex items-center gap-1 text-xs text-slate-400 mt-2">
+                      <MapPin className="w-3 h-3" /> {doc.clinic_address}
+                    </p>
+                  )}
+                  {!doc.clinic_address && (doc.location || doc.city) && (
                     <p className="flex items-center gap-1 text-xs text-slate-400 mt-2">
                       <MapPin className="w-3 h-3" /> {doc.location || doc.city}
                     </p>
@@ -6,6 +6,7 @@ import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '../co
 import { Label } from '../components/ui/label';
 import { Badge } from '../components/ui/badge';
 import api from '../utils/api';
+import { postEventStream, streamEvents } from '../utils/sse';
 import { toast } from 'sonner';
 import { 
   Stethoscope, Loader2, Phone, MapPin, Clock, CheckCircle, Navigation, 
@@ -39,6 +40,7 @@ const PatientDashboard = () => {
   const [billBreakdown, setBillBreakdown] = useState(null);
   const [triageGuidance, setTriageGuidance] = useState(null); // { actions, warnings, urgency_level, specialty }
   const pollIntervalRef = useRef(null);
+  const statusStreamRef = useRef(null);
 
   // Web search state
   const [webDoctors, setWebDoctors] = useState([]);
@@ -73,7 +75,7 @@ const PatientDashboard = () => {
         setRequestId(savedRequestId);
         setMatchedDoctors(doctors);
         setRequestStatus('pending');
-        startPolling(savedRequestId);
+        watchRequest(savedRequestId);
 
         // Link request if user just logged in/registered
         const token = localStorage.getItem('ayumitra-token');
@@ -90,11 +92,7 @@ const PatientDashboard = () => {
       }
     }
 
-    return () => {
-      if (pollIntervalRef.current) {
-        clearInterval(pollIntervalRef.current);
-      }
-    };
+    return () => stopWatching();
   }, []);
 
   const loadHistory = async () => {
@@ -118,9 +116,7 @@ const PatientDashboard = () => {
   };
 
   const startNewSession = () => {
-    if (pollIntervalRef.current) {
-      clearInterval(pollIntervalRef.current);
-    }
+    stopWatching();
     // Clear persisted session
     localStorage.removeItem('ayumitra_request_id');
     localStorage.removeItem('ayumitra_matched_doctors');
@@ -183,7 +179,83 @@ const PatientDashboard = () => {
       });
     }
     toast.success(`Found ${doctors.length} matching doctor${doctors.length !== 1 ? 's' : ''}!`);
-    startPolling(request_id);
+    watchRequest(request_id);
+  };
+
+  const stopWatching = () => {
+    statusStreamRef.current?.abort();
+    statusStreamRef.current = null;
+    if (pollIntervalRef.current) {
+      clearInterval(pollIntervalRef.current);
+      pollIntervalRef.current = null;
+    }
+  };
+
+  // Returns true once the request has reached a final status
+  const applyRequestStatus = (data) => {
+    setRequestStatus(data.status);
+
+    // Capture triage guidance from status updates if not already set
+    if (!triageGuidance && (data.recommended_actions?.length || data.critical_warnings?.length)) {
+      setTriageGuidance({
+        actions: data.recommended_actions || [],
+        warnings: data.critical_warnings || [],
+        urgency_level: data.urgency_level || 'moderate',
+        specialty: data.primary_specialty || 'General Medicine',
+      });
+    }
+
+    if (data.status === 'accepted' && data.assigned_doctor) {
+      setAssignedDoctor(data.assigned_doctor);
+      if (!assignedDoctor) {
+        toast.success(`Dr. ${data.assigned_doctor.name} accepted!`);
+      }
+    }
+
+    if (data.status === 'completed') {
+      // Clear persisted session once completed
+      localStorage.removeItem('ayumitra_request_id');
+      localStorage.removeItem('ayumitra_matched_doctors');
+      if (data.bill_breakdown) {
+        setBillBreakdown(data.bill_breakdown);
+        setTotalAmount(data.bill_breakdown.total);
+      }
+      setShowPayment(true);
+      toast.success('Consultation completed!');
+      loadHistory();
+      return true;
+    }
+
+    if (data.status === 'rejected') {
+      toast.error('Request declined.');
+      return true;
+    }
+    return false;
+  };
+
+  // Status changes are pushed over SSE; polling is only the fallback when the stream fails
+  const watchRequest = (reqId) => {
+    stopWatching();
+    const controller = new AbortController();
+    statusStreamRef.current = controller;
+    let finished = false;
+
+    streamEvents(`/patient/request-status/${reqId}/stream`, {
+      signal: controller.signal,
+      onEvent: (event) => {
+        if (event.event === 'status') {
+          finished = applyRequestStatus(event);
+        } else if (event.event === 'timeout') {
+          finished = true;
+        }
+      },
+    }).then(() => {
+      if (!finished && !controller.signal.aborted) startPolling(reqId);
+    }).catch((error) => {
+      if (controller.signal.aborted) return;
+      console.error('Status stream failed, falling back to polling:', error);
+      startPolling(reqId);
+    });
   };
 
   const startPolling = (reqId) => {
@@ -194,44 +266,8 @@ const PatientDashboard = () => {
     pollIntervalRef.current = setInterval(async () => {
       try {
         const response = await api.get(`/patient/request-status/${reqId}`);
-        const data = response.data;
-        
-        setRequestStatus(data.status);
-        
-        // Capture triage guidance from polling if not already set
-        if (!triageGuidance && (data.recommended_actions?.length || data.critical_warnings?.length)) {
-          setTriageGuidance({
-            actions: data.recommended_actions || [],
-            warnings: data.critical_warnings || [],
-            urgency_level: data.urgency_level || 'moderate',
-            specialty: data.primary_specialty || 'General Medicine',
-          });
-        }
-
-        if (data.status === 'accepted' && data.assigned_doctor) {
-          setAssignedDoctor(data.assigned_doctor);
-          if (!assignedDoctor) {
-            toast.success(`Dr. ${data.assigned_doctor.name} accepted!`);
-          }
-        }
-        
-        if (data.status === 'completed') {
-          clearInterval(pollIntervalRef.current);
-          // Clear persisted session once completed
-          localStorage.removeItem('ayumitra_request_id');
-          localStorage.removeItem('ayumitra_matched_doctors');
-          if (data.bill_breakdown) {
-            setBillBreakdown(data.bill_breakdown);
-            setTotalAmount(data.bill_breakdown.total);
-          }
-          setShowPayment(true);
-          toast.success('Consultation completed!');
-          loadHistory();
-        }
-        
-        if (data.status === 'rejected') {
+        if (applyRequestStatus(response.data)) {
           clearInterval(pollIntervalRef.current);
-          toast.error('Request declined.');
         }
       } catch (error) {
         console.error('Polling error:', error);
@@ -304,17 +340,29 @@ const PatientDashboard = () => {
     }
 
     setLoadingWebSearch(true);
+    setWebDoctors([]);
+    let found = 0;
+    let failure = null;
+    const handleEvent = (data) => {
+      if (data.event === 'doctors' && data.source === 'web_search') {
+        // Show web doctors as soon as the scrape finishes, without waiting for the rest of the search
+        found = data.doctors.length;
+        setWebDoctors(data.doctors);
+        setShowWebDoctors(true);
+      } else if (data.event === 'error') {
+        failure = data.message;
+      }
+    };
     try {
-      const response = await api.post('/search/doctors/hybrid', {
+      await postEventStream('/search/doctors/hybrid/stream', {
         symptoms: symptomDescription,
         location: 'India', // Default location, could be made dynamic
-        limit: 10
-      });
-
-      const webDoctorsOnly = response.data.doctors.filter(doc => doc.source === 'web_search');
-      setWebDoctors(webDoctorsOnly);
+        limit: 10,
+        specialty: triageGuidance?.specialty
+      }, { onEvent: handleEvent });
+      if (failure) throw new Error(failure);
       setShowWebDoctors(true);
-      toast.success(`Found ${webDoctorsOnly.length} doctors from web search!`);
+      toast.success(`Found ${found} doctors from web search!`);
     } catch (error) {
       toast.error('Failed to search doctors from web');
       console.error('Web search error:', error);
@@ -0,0 +1,84 @@
+import { getToken } from './auth';
+
+const API_BASE_URL = process.env.REACT_APP_BACKEND_URL || 'http://127.0.0.1:8000';
+
+const authHeaders = (extra = {}) => {
+  const headers = { ...extra };
+  const token = getToken();
+  if (token) headers['Authorization'] = `Bearer ${token}`;
+  return headers;
+};
+
+const httpError = (res) => {
+  const error = new Error(`HTTP ${res.status}`);
+  error.status = res.status;
+  return error;
+};
+
+// Splits one SSE frame into its id and data lines; comment lines are heartbeats
+const parseFrame = (frame) => {
+  let id = null;
+  const data = [];
+  frame.split('\n').forEach((line) => {
+    if (line.startsWith('id:')) id = line.slice(3).trim();
+    else if (line.startsWith('data:')) data.push(line.slice(5).trimStart());
+  });
+  return { id, data: data.join('\n') };
+};
+
+const readEvents = async (res, onEvent, onId) => {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    const frames = buffer.split('\n\n');
+    buffer = frames.pop(); // keep incomplete chunk
+
+    for (const frame of frames) {
+      const { id, data } = parseFrame(frame);
+      if (id) onId?.(id);
+      if (!data) continue;
+      try {
+        onEvent(JSON.parse(data));
+      } catch (_) { /* ignore malformed */ }
+    }
+  }
+};
+
+// Reads a Server-Sent Events endpoint with fetch so the auth header can be sent
+// (EventSource cannot set headers). Resolves when the server closes the stream.
+export const streamEvents = async (path, { onEvent, signal, baseUrl = API_BASE_URL }) => {
+  const res = await fetch(`${baseUrl}/api${path}`, { headers: authHeaders(), signal });
+  if (!res.ok) throw httpError(res);
+  await readEvents(res, onEvent);
+};
+
+// POSTs to a resumable stream. If the connection drops mid-stream the request is
+// re-sent with Last-Event-ID and the server replays from its buffer instead of
+// re-running the pipeline.
+export const postEventStream = async (path, body, { onEvent, signal, baseUrl = API_BASE_URL, retries = 3 }) => {
+  let lastEventId = null;
+  for (let attempt = 0; ; attempt += 1) {
+    const headers = authHeaders({ 'Content-Type': 'application/json' });
+    if (lastEventId) headers['Last-Event-ID'] = lastEventId;
+    try {
+      const res = await fetch(`${baseUrl}/api${path}`, {
+        method: 'POST',
+        headers,
+        body: JSON.stringify(body),
+        signal,
+      });
+      if (!res.ok) throw httpError(res);
+      await readEvents(res, onEvent, (id) => { lastEventId = id; });
+      return;
+    } catch (err) {
+      if (signal?.aborted || err.status || !lastEventId || attempt >= retries) throw err;
+      await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** attempt));
+    }
+  }
+};